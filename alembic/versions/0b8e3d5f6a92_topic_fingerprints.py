@@ -0,0 +1,39 @@
+"""topic_fingerprints
+
+Revision ID: 0b8e3d5f6a92
+Revises: f2b6d9e4a157
+Create Date: 2026-10-17 16:20:44.105932
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b8e3d5f6a92'
+down_revision: Union[str, Sequence[str], None] = 'f2b6d9e4a157'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('topic_fingerprints',
+    sa.Column('topic_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('brand_id', sa.String(length=100), nullable=False),
+    sa.Column('topic_text', sa.String(length=1000), nullable=False),
+    sa.Column('signature', sa.LargeBinary(), nullable=False),
+    sa.Column('duplicate_of', postgresql.UUID(as_uuid=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('topic_id')
+    )
+    op.create_index('ix_topic_fingerprints_brand_created', 'topic_fingerprints', ['brand_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_topic_fingerprints_brand_created', table_name='topic_fingerprints')
+    op.drop_table('topic_fingerprints')
@@ -0,0 +1,41 @@
+"""media_objects
+
+Revision ID: 1c4f7a9e2d38
+Revises: 0b8e3d5f6a92
+Create Date: 2026-10-17 18:05:12.480213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c4f7a9e2d38'
+down_revision: Union[str, Sequence[str], None] = '0b8e3d5f6a92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('media_objects',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=500), nullable=False),
+    sa.Column('url', sa.String(length=1500), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256'),
+    sa.UniqueConstraint('url')
+    )
+    op.create_index(op.f('ix_media_objects_last_used_at'), 'media_objects', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_media_objects_last_used_at'), table_name='media_objects')
+    op.drop_table('media_objects')
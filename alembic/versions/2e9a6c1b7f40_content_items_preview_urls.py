@@ -0,0 +1,30 @@
+"""content_items preview urls
+
+Revision ID: 2e9a6c1b7f40
+Revises: 1c4f7a9e2d38
+Create Date: 2026-10-17 19:12:37.906115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e9a6c1b7f40'
+down_revision: Union[str, Sequence[str], None] = '1c4f7a9e2d38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('content_items', sa.Column('preview_url', sa.String(length=1500), nullable=True))
+    op.add_column('content_items', sa.Column('preview_thumbnail_url', sa.String(length=1500), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('content_items', 'preview_thumbnail_url')
+    op.drop_column('content_items', 'preview_url')
@@ -0,0 +1,30 @@
+"""content_items next_attempt_at
+
+Revision ID: 3c5e7a91d2b4
+Revises: 899fe028df00
+Create Date: 2026-10-17 09:12:40.331208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c5e7a91d2b4'
+down_revision: Union[str, Sequence[str], None] = '899fe028df00'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('content_items', sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_content_items_next_attempt_at'), 'content_items', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_content_items_next_attempt_at'), table_name='content_items')
+    op.drop_column('content_items', 'next_attempt_at')
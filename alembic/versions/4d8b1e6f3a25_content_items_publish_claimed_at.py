@@ -0,0 +1,30 @@
+"""content_items publish_claimed_at
+
+Revision ID: 4d8b1e6f3a25
+Revises: 2e9a6c1b7f40
+Create Date: 2026-10-17 21:04:11.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8b1e6f3a25'
+down_revision: Union[str, Sequence[str], None] = '2e9a6c1b7f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('content_items', sa.Column('publish_claimed_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_content_items_publish_claimed_at'), 'content_items', ['publish_claimed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_content_items_publish_claimed_at'), table_name='content_items')
+    op.drop_column('content_items', 'publish_claimed_at')
@@ -0,0 +1,30 @@
+"""content_items media_callback_at
+
+Revision ID: 5a7c2e9d4b16
+Revises: 4d8b1e6f3a25
+Create Date: 2026-10-17 23:12:40.271905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a7c2e9d4b16'
+down_revision: Union[str, Sequence[str], None] = '4d8b1e6f3a25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('content_items', sa.Column('media_callback_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_content_items_media_callback_at'), 'content_items', ['media_callback_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_content_items_media_callback_at'), table_name='content_items')
+    op.drop_column('content_items', 'media_callback_at')
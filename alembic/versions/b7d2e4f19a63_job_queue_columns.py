@@ -0,0 +1,49 @@
+"""job queue columns
+
+Revision ID: b7d2e4f19a63
+Revises: a41f0d6c8e27
+Create Date: 2026-10-17 11:20:03.519447
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f19a63'
+down_revision: Union[str, Sequence[str], None] = 'a41f0d6c8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('jobs', 'content_item_id', existing_type=sa.UUID(), nullable=True)
+    op.add_column('jobs', sa.Column('max_attempts', sa.Integer(), server_default='5', nullable=False))
+    op.add_column('jobs', sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('result', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.add_column('jobs', sa.Column('run_after', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False))
+    op.add_column('jobs', sa.Column('locked_by', sa.String(length=100), nullable=True))
+    op.add_column('jobs', sa.Column('locked_until', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('finished_at', sa.DateTime(), nullable=True))
+    op.add_column('jobs', sa.Column('updated_at', sa.DateTime(), server_default=sa.text("(now() AT TIME ZONE 'utc')"), nullable=False))
+    op.create_index('ix_jobs_status_run_after', 'jobs', ['status', 'run_after'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_run_after', table_name='jobs')
+    op.drop_column('jobs', 'updated_at')
+    op.drop_column('jobs', 'finished_at')
+    op.drop_column('jobs', 'heartbeat_at')
+    op.drop_column('jobs', 'locked_until')
+    op.drop_column('jobs', 'locked_by')
+    op.drop_column('jobs', 'run_after')
+    op.drop_column('jobs', 'result')
+    op.drop_column('jobs', 'payload')
+    op.drop_column('jobs', 'max_attempts')
+    op.alter_column('jobs', 'content_item_id', existing_type=sa.UUID(), nullable=False)
@@ -0,0 +1,32 @@
+"""content_items publish idempotency
+
+Revision ID: c90a3b5d7e12
+Revises: b7d2e4f19a63
+Create Date: 2026-10-17 12:41:27.604518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c90a3b5d7e12'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4f19a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('content_items', sa.Column('publish_idempotency_key', sa.String(length=64), nullable=True))
+    op.add_column('content_items', sa.Column('publish_attempted_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_content_items_publish_idempotency_key'), 'content_items', ['publish_idempotency_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_content_items_publish_idempotency_key'), table_name='content_items')
+    op.drop_column('content_items', 'publish_attempted_at')
+    op.drop_column('content_items', 'publish_idempotency_key')
@@ -0,0 +1,46 @@
+"""llm_call_metrics
+
+Revision ID: e5a1c7f3b820
+Revises: d3f8b2a6c419
+Create Date: 2026-10-17 15:12:08.443170
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a1c7f3b820'
+down_revision: Union[str, Sequence[str], None] = 'd3f8b2a6c419'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('llm_call_metrics',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('call_type', sa.String(length=30), nullable=False),
+    sa.Column('model', sa.String(length=100), nullable=False),
+    sa.Column('brand_id', sa.String(length=100), nullable=True),
+    sa.Column('platform', sa.String(length=50), nullable=True),
+    sa.Column('content_type', sa.String(length=30), nullable=True),
+    sa.Column('input_tokens', sa.Integer(), nullable=True),
+    sa.Column('output_tokens', sa.Integer(), nullable=True),
+    sa.Column('latency_ms', sa.Integer(), nullable=True),
+    sa.Column('cache_hit', sa.Boolean(), nullable=False),
+    sa.Column('ok', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_llm_call_metrics_created_at'), 'llm_call_metrics', ['created_at'], unique=False)
+    op.create_index('ix_llm_call_metrics_brand_created', 'llm_call_metrics', ['brand_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_llm_call_metrics_brand_created', table_name='llm_call_metrics')
+    op.drop_index(op.f('ix_llm_call_metrics_created_at'), table_name='llm_call_metrics')
+    op.drop_table('llm_call_metrics')
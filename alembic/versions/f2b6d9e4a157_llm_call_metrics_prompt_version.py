@@ -0,0 +1,28 @@
+"""llm_call_metrics prompt_version
+
+Revision ID: f2b6d9e4a157
+Revises: e5a1c7f3b820
+Create Date: 2026-10-17 15:48:30.912644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b6d9e4a157'
+down_revision: Union[str, Sequence[str], None] = 'e5a1c7f3b820'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('llm_call_metrics', sa.Column('prompt_version', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('llm_call_metrics', 'prompt_version')
@@ -17,6 +17,7 @@ from app.routers import generation_image
 from app.routers import brand_profiles
 from app.routers.auth import router as auth_router
 from app.routers import admin_users
+from app.routers import jobs
 # Create FastAPI app FIRST
 app = FastAPI(title="AI Marketing System")
 # Enable CORS (required for Next.js frontend)
@@ -52,6 +53,7 @@ app.include_router(generation_image.router)
 app.include_router(brand_profiles.router)
 app.include_router(auth_router)
 app.include_router(admin_users.router)
+app.include_router(jobs.router)
 
 # Health check
 @app.get("/")
@@ -9,4 +9,8 @@ from .session import Session
 from app.models.brand_profile import BrandProfile  
 from .email_token import EmailVerificationToken
 from .password_reset_token import PasswordResetToken
-
+from app.models.rate_limit_bucket import RateLimitBucket
+from app.models.llm_cache_entry import LlmCacheEntry
+from app.models.llm_call_metric import LlmCallMetric
+from app.models.topic_fingerprint import TopicFingerprint
+from app.models.media_object import MediaObject
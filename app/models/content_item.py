@@ -40,8 +40,18 @@ class ContentItem(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     attempt_count: Mapped[int] = mapped_column(Integer, default=0)
+    # retry backoff: publisher skips the item until this time (None = eligible now)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
     buffer_update_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
+    # idempotent publishing: key is stored before any outbound call and reused on retries;
+    # publish_attempted_at set => a send may have landed, reconcile before sending again
+    publish_idempotency_key: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    publish_attempted_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    # set while a publisher worker owns the item (QUEUED); stale claims are swept back to SCHEDULED.
+    # NULL on a QUEUED item means a manual / Make hand-off
+    publish_claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
+
     # ✅ MEDIA SUPPORT (existing columns you already have)
     media_type: Mapped[str | None] = mapped_column(String(20), nullable=True)     # "image" | "video"
     media_url: Mapped[str | None] = mapped_column(String(1500), nullable=True)   # main public URL
@@ -51,3 +61,11 @@ class ContentItem(Base):
     # ✅ NEW columns (now safe because migration added them)
     thumbnail_url: Mapped[str | None] = mapped_column(String(1500), nullable=True)
     media_provider: Mapped[str | None] = mapped_column(String(30), nullable=True)  # "spaces" | "local" | etc
+
+    # WebP derivatives for the UI (services/media_derivatives.py); media_url/thumbnail_url stay the originals for publishing
+    preview_url: Mapped[str | None] = mapped_column(String(1500), nullable=True)
+    preview_thumbnail_url: Mapped[str | None] = mapped_column(String(1500), nullable=True)
+
+    # set when media is dispatched to Make in callback mode, cleared once the item leaves GENERATING;
+    # items still waiting past MAKE_MEDIA_CALLBACK_TTL_SECONDS are failed (routers/media.expire_awaiting_callbacks)
+    media_callback_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, index=True)
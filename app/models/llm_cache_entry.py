@@ -0,0 +1,17 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Text, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class LlmCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    # sha256 of model + prompt template version + instructions + user_input
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    output_text: Mapped[str] = mapped_column(Text, nullable=False)
+
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_hit_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, BigInteger, Boolean, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class LlmCallMetric(Base):
+    __tablename__ = "llm_call_metrics"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+
+    # post | topic_posts | brand_profile | batch
+    call_type: Mapped[str] = mapped_column(String(30), nullable=False)
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    brand_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    platform: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    content_type: Mapped[str | None] = mapped_column(String(30), nullable=True)
+    # prompt template version (A/B comparisons)
+    prompt_version: Mapped[str | None] = mapped_column(String(20), nullable=True)
+
+    input_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    output_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    latency_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    cache_hit: Mapped[bool] = mapped_column(Boolean, default=False)
+    ok: Mapped[bool] = mapped_column(Boolean, default=True)
+
+    __table_args__ = (
+        Index("ix_llm_call_metrics_brand_created", "brand_id", "created_at"),
+    )
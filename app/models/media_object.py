@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Integer, BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class MediaObject(Base):
+    """
+    One content-addressed object in Spaces (see services/media_index.py).
+    """
+    __tablename__ = "media_objects"
+
+    # sha256 of the object bytes; the object key is derived from it
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(500), nullable=False)
+    url: Mapped[str] = mapped_column(String(1500), nullable=False, unique=True)
+    content_type: Mapped[str] = mapped_column(String(100), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    # uploads resolved to this object; recomputed from content_items by the GC pass
+    refcount: Mapped[int] = mapped_column(Integer, default=1)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_used_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlalchemy import String, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = mapped_column(String(150), primary_key=True)  # e.g. "buffer:linkedin"
+    tokens: Mapped[float] = mapped_column(Float, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
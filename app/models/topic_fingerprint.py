@@ -0,0 +1,32 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, LargeBinary, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class TopicFingerprint(Base):
+    """
+    MinHash signature of an ingested topic, used for near-duplicate detection.
+    topic_id is the ContentItem.topic_id shared by the topic's items.
+    """
+    __tablename__ = "topic_fingerprints"
+
+    topic_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    brand_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    topic_text: Mapped[str] = mapped_column(String(1000), nullable=False)
+
+    # packed uint64 MinHash values (see services/topic_dedup.py)
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    # set when the topic was flagged as a near-duplicate at ingest
+    duplicate_of: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_topic_fingerprints_brand_created", "brand_id", "created_at"),
+    )
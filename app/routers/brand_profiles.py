@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import datetime
 from typing import Any
 
@@ -10,6 +11,7 @@ from app.database import get_db
 from app.models.brand_profile import BrandProfile
 from app.services.brand_scraper import scrape_brand_site
 from app.services.brand_profiler import build_brand_profile, summarize_profile
+from app.services.job_queue import enqueue
 
 router = APIRouter(prefix="/brand-profiles", tags=["brand-profiles"])
 
@@ -46,12 +48,14 @@ async def _run_scrape_job(brand_id: str, website_url: str, db_factory):
         # 1) scrape
         res = await scrape_brand_site(website_url)
 
-        # 2) profile
-        profile_json = build_brand_profile(res.raw_text, res.colors, website_url)
+        # 2) profile (blocking OpenAI call + rate-limit wait, kept off the event loop)
+        profile_json = await asyncio.to_thread(
+            build_brand_profile, res.raw_text, res.colors, website_url, brand_id=brand_id
+        )
         profile_summary = summarize_profile(profile_json)
 
         # 3) save
-        bp.pages_scraped = res.pages
+        bp.pages_scraped = res.fetched
         bp.raw_text = res.raw_text
         bp.colors = res.colors
         bp.profile_json = profile_json
@@ -99,6 +103,11 @@ def start_scrape(payload: dict, background: BackgroundTasks, db: Session = Depen
     db.add(bp)
     db.commit()
 
+    # ✅ durable path: a job worker picks it up (survives API restarts, retries on failure)
+    if payload.get("queue"):
+        job = enqueue(db, "scrape_brand", payload={"brand_id": brand_id, "website_url": website_url})
+        return {"ok": True, "brand_id": brand_id, "status": "SCRAPING", "job_id": str(job.id)}
+
     # run async job
     # IMPORTANT: use a fresh Session in background task, not the request one
     from app.database import SessionLocal
@@ -1,21 +1,30 @@
 # backend/app/routers/generation.py
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
 from typing import List, Optional, Any
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
-from app.services.ai_generator import generate_post
-from app.services.state_machine import ensure_transition
+from app.models.job import Job
+from app.services.batch_generation import submit_batch
+from app.services.draft_generation import generate_drafts_concurrently, normalize_content_type
+from app.services.job_queue import LEASE_SECONDS, complete, enqueue, fail, keep_alive
+from app.utils.streaming import event_response, wants_ndjson
 
 router = APIRouter(prefix="/generation", tags=["generation"])
 
+# running stream generations; kept referenced so they finish even if the client disconnects
+_stream_tasks: set[asyncio.Task] = set()
+
 
 class GenerateDraftsRequest(BaseModel):
     content_item_ids: Optional[List[str]] = None
@@ -28,19 +37,66 @@ class GenerateDraftsRequest(BaseModel):
     brand_profile_summary: Optional[str] = None
     brand_profile_json: Optional[Any] = None
 
+    # ✅ run through the job queue instead of inside this request
+    queue: bool = False
 
-def _normalize_content_type(x: Optional[str]) -> Optional[str]:
-    if not x:
-        return None
-    v = str(x).strip().lower()
-    if v in ("text", "image", "video"):
-        return v
-    return None
+    # ✅ return a job handle right away; the batch runs in this API process
+    background: bool = False
 
+    # ✅ skip cached model outputs and force fresh generations
+    bypass_cache: bool = False
 
-@router.post("/text")  # keep same route to avoid breaking frontend
-def generate_drafts(payload: GenerateDraftsRequest, db: Session = Depends(get_db)):
-    wanted_type = _normalize_content_type(payload.content_type)
+    # ✅ one model call per topic, split across its platform/content_type siblings
+    by_topic: bool = False
+
+
+class SubmitBatchRequest(GenerateDraftsRequest):
+    # "openai" | "local" (defaults to BATCH_PROVIDER)
+    provider: Optional[str] = None
+
+
+def _run_batch_job(job_id, worker_id: str, db_factory):
+    """
+    Runs a generate_text_batch job in the background after the response.
+    Progress lands on jobs.result; GET /jobs/{id} to follow it. The lease is
+    heartbeated for the whole run, so job workers only take over if this
+    process dies.
+
+    Plain def on purpose: BackgroundTasks runs it on the threadpool, and the
+    batch gets its own event loop there (like the sync route), so its
+    blocking DB selects and commits never stall the API loop.
+    """
+    db = db_factory()
+    try:
+        job = db.get(Job, job_id)
+        if not job:
+            return
+        p = job.payload or {}
+        with keep_alive(job_id, worker_id):
+            try:
+                progress = asyncio.run(
+                    generate_drafts_concurrently(
+                        db,
+                        p.get("content_item_ids") or [],
+                        brand_id=p.get("brand_id"),
+                        brand_profile_summary=p.get("brand_profile_summary"),
+                        brand_profile_json=p.get("brand_profile_json"),
+                        job=job,
+                        use_cache=not p.get("bypass_cache"),
+                        by_topic=bool(p.get("by_topic")),
+                    )
+                )
+            except Exception as e:
+                db.rollback()
+                fail(db, job, worker_id, str(e))
+                return
+            complete(db, job, worker_id, progress)
+    finally:
+        db.close()
+
+
+def _select_items(db: Session, payload: GenerateDraftsRequest) -> list[ContentItem]:
+    wanted_type = normalize_content_type(payload.content_type)
 
     q = select(ContentItem).where(ContentItem.brand_id == payload.brand_id)
 
@@ -62,69 +118,189 @@ def generate_drafts(payload: GenerateDraftsRequest, db: Session = Depends(get_db
         # default/new
         q = q.where(ContentItem.status == "TOPIC_INGESTED")
 
-    items = db.execute(q).scalars().all()
+    return db.execute(q).scalars().all()
 
-    updated = 0
-    now = datetime.utcnow()
 
-    for it in items:
-        ct = _normalize_content_type(it.content_type) or "text"
+@router.post("/text")  # keep same route to avoid breaking frontend
+def generate_drafts(payload: GenerateDraftsRequest, background: BackgroundTasks, db: Session = Depends(get_db)):
+    items = _select_items(db, payload)
 
-        # safety: only allow the 3 types in this flow
-        if ct not in ("text", "image", "video"):
-            continue
+    # ✅ hand the work to job workers and return right away
+    if payload.queue and payload.by_topic:
+        # one batch job per topic, so each worker makes a single call for the siblings
+        by_topic: dict[Any, list[str]] = {}
+        for it in items:
+            by_topic.setdefault(it.topic_id, []).append(str(it.id))
+        job_ids = []
+        for ids in by_topic.values():
+            job = enqueue(
+                db,
+                "generate_text_batch",
+                payload={
+                    "content_item_ids": ids,
+                    "brand_id": payload.brand_id,
+                    "brand_profile_summary": payload.brand_profile_summary,
+                    "brand_profile_json": payload.brand_profile_json,
+                    "bypass_cache": payload.bypass_cache,
+                    "by_topic": True,
+                },
+                commit=False,
+            )
+            job_ids.append(str(job.id))
+        db.commit()
+        return {"queued": len(job_ids), "job_ids": job_ids}
 
-        # Move to GENERATING
-        try:
-            ensure_transition(it.status, "GENERATING")
-        except Exception:
-            # skip items in invalid state
-            continue
-
-        it.status = "GENERATING"
-        it.updated_at = now
-        it.last_error = None
+    if payload.queue:
+        job_ids = []
+        for it in items:
+            job = enqueue(
+                db,
+                "generate_text",
+                content_item_id=it.id,
+                payload={
+                    "brand_id": payload.brand_id,
+                    "brand_profile_summary": payload.brand_profile_summary,
+                    "brand_profile_json": payload.brand_profile_json,
+                    "bypass_cache": payload.bypass_cache,
+                },
+                commit=False,
+            )
+            job_ids.append(str(job.id))
         db.commit()
+        return {"queued": len(job_ids), "job_ids": job_ids}
 
-        topic_text = (it.title or "").strip() or "Untitled topic"
+    item_ids = [it.id for it in items]
 
+    if payload.background:
+        job = enqueue(
+            db,
+            "generate_text_batch",
+            payload={
+                "content_item_ids": [str(x) for x in item_ids],
+                "brand_id": payload.brand_id,
+                "brand_profile_summary": payload.brand_profile_summary,
+                "brand_profile_json": payload.brand_profile_json,
+                "bypass_cache": payload.bypass_cache,
+                "by_topic": payload.by_topic,
+            },
+            commit=False,
+        )
+        # claimed by this process; if it dies, the lease runs out and a job worker resumes it
+        now = datetime.utcnow()
+        worker_id = f"api:{socket.gethostname()}:{os.getpid()}"
+        job.status = "running"
+        job.attempts = 1
+        job.locked_by = worker_id
+        job.locked_until = now + timedelta(seconds=LEASE_SECONDS)
+        job.heartbeat_at = now
+        db.commit()
+
+        # IMPORTANT: use a fresh Session in background task, not the request one
+        from app.database import SessionLocal
+        background.add_task(_run_batch_job, job.id, worker_id, SessionLocal)
+        return {"job_id": str(job.id), "total": len(item_ids), "status": "running"}
+
+    progress = asyncio.run(
+        generate_drafts_concurrently(
+            db,
+            item_ids,
+            brand_id=payload.brand_id,
+            brand_profile_summary=payload.brand_profile_summary,
+            brand_profile_json=payload.brand_profile_json,
+            use_cache=not payload.bypass_cache,
+            by_topic=payload.by_topic,
+        )
+    )
+    return {"generated": progress["generated"], "failed": progress["failed"]}
+
+
+@router.post("/text/stream")
+async def generate_drafts_stream(payload: GenerateDraftsRequest, request: Request, format: Optional[str] = None):
+    """
+    Streaming variant of /generation/text (SSE, or NDJSON with ?format=ndjson).
+
+    Events:
+      progress  {total, done, generated, failed}   on every batched commit
+      item      {id, status, ...}                  GENERATING, then PENDING_APPROVAL (with caption) or FAILED
+      done      {total, generated, failed}
+      error     {detail}
+    Generation runs on a worker thread with its own loop and session, so a client
+    disconnect doesn't abort it and its DB work never blocks the API loop.
+    """
+    from app.database import SessionLocal
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def _emit(ev):
+        loop.call_soon_threadsafe(queue.put_nowait, ev)
+
+    def _run():
+        # own thread and event loop: the selects and commits block, so they stay off the API loop
+        db = SessionLocal()
         try:
-            result = generate_post(
-                topic_text=topic_text,
-                platform=it.platform,
-                brand_id=payload.brand_id,
-                content_type=ct,
-                brand_profile_summary=payload.brand_profile_summary,
-                brand_profile_json=payload.brand_profile_json,
+            item_ids = [it.id for it in _select_items(db, payload)]
+            return asyncio.run(
+                generate_drafts_concurrently(
+                    db,
+                    item_ids,
+                    brand_id=payload.brand_id,
+                    brand_profile_summary=payload.brand_profile_summary,
+                    brand_profile_json=payload.brand_profile_json,
+                    use_cache=not payload.bypass_cache,
+                    by_topic=payload.by_topic,
+                    on_item=lambda ev: _emit(("item", ev)),
+                    on_progress=lambda pr: _emit(("progress", pr)),
+                )
             )
+        finally:
+            db.close()
 
-            caption = (result.get("body_text") or "").strip()
-            hashtags = (result.get("hashtags") or "").strip()
-            media_prompt = (result.get("media_prompt") or "").strip()
-
-            # ✅ Store prompt INSIDE body_text for image/video
-            if ct in ("image", "video") and media_prompt:
-                # Keep it readable + obvious in approvals UI
-                caption = (
-                    f"{caption}\n\n"
-                    f"---\n"
-                    f"{'IMAGE_PROMPT' if ct == 'image' else 'VIDEO_PROMPT'}:\n"
-                    f"{media_prompt}\n"
-                ).strip()
-
-            it.body_text = caption
-            it.hashtags = hashtags or None
-            it.status = "PENDING_APPROVAL"
-            it.updated_at = now
-            it.last_error = None
-            db.commit()
-
-            updated += 1
+    # events are queued with call_soon_threadsafe before the thread returns, so
+    # the None sentinel below always arrives after the last of them
+    task = asyncio.create_task(asyncio.to_thread(_run))
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+    task.add_done_callback(lambda _: queue.put_nowait(None))
 
+    async def _events():
+        while True:
+            ev = await queue.get()
+            if ev is None:
+                break
+            yield ev
+        try:
+            progress = task.result()
         except Exception as e:
-            it.status = "FAILED"
-            it.last_error = str(e)
-            it.updated_at = now
-            db.commit()
+            yield "error", {"detail": str(e)}
+            return
+        yield "done", {"total": progress["total"], "generated": progress["generated"], "failed": progress["failed"]}
+
+    return event_response(_events(), ndjson=wants_ndjson(request, format))
+
+
+@router.post("/batch")
+def submit_generation_batch(payload: SubmitBatchRequest, db: Session = Depends(get_db)):
+    """
+    Offline mode for large, non-urgent backlogs: all selected items go to the
+    provider batch API in one file. Job workers poll the returned job and
+    apply the drafts when the batch completes.
+    """
+    items = _select_items(db, payload)
+    try:
+        job = submit_batch(
+            db,
+            items,
+            brand_id=payload.brand_id,
+            brand_profile_summary=payload.brand_profile_summary,
+            brand_profile_json=payload.brand_profile_json,
+            provider=payload.provider,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Batch submit failed: {e}")
 
-    return {"generated": updated}
+    if job is None:
+        return {"submitted": 0, "job_id": None}
+    return {"submitted": job.result["total"], "job_id": str(job.id), "batch_id": job.result["batch_id"]}
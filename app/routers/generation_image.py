@@ -3,16 +3,19 @@ from __future__ import annotations
 import os
 import uuid
 from datetime import datetime
-from typing import Any
+from typing import Any, Optional
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
+from app.services.clients import http_client
+from app.services.image_generator import aspect_hint
 from app.services.state_machine import ensure_transition
+from app.services.rate_limiter import acquire
+from app.utils.streaming import event_response, wants_ndjson
 
 router = APIRouter(prefix="/generation", tags=["generation"])
 
@@ -37,6 +40,58 @@ def _require_make_config():
     return url, key
 
 
+def _prepare_item(it: ContentItem) -> tuple[Optional[dict[str, Any]], Optional[dict[str, Any]]]:
+    """
+    Moves one item to GENERATING and builds its Make request.
+    Returns (request, None) or (None, skip_info). The caller commits.
+    """
+    if it.content_type != "image":
+        return None, {"id": str(it.id), "reason": f"Not an image item (content_type={it.content_type})"}
+
+    # We will regenerate even if it was already pending, that's fine.
+    # Force into GENERATING if state machine allows.
+    if it.status not in ("TOPIC_INGESTED", "REJECTED", "DRAFT_READY", "PENDING_APPROVAL"):
+        return None, {"id": str(it.id), "status": it.status, "reason": "Not allowed to generate from this state"}
+
+    # State move: REJECTED -> GENERATING is allowed in your machine
+    # TOPIC_INGESTED -> GENERATING is allowed
+    # DRAFT_READY -> FAILED only (in your map), so we won't use ensure_transition for DRAFT_READY/PENDING_APPROVAL
+    # We'll just set to GENERATING for regeneration.
+    if it.status in ("TOPIC_INGESTED", "REJECTED"):
+        ensure_transition(it.status, "GENERATING")
+    it.status = "GENERATING"
+    it.last_error = None
+    it.updated_at = datetime.utcnow()
+    # media arrives on /media/ingest; expired like any other callback-mode dispatch
+    it.media_callback_at = it.updated_at
+
+    # Prompt strategy (simple and reliable):
+    # Use body_text if present, otherwise title, otherwise topic_id
+    prompt = (it.body_text or it.title or f"Topic {it.topic_id}").strip()
+
+    return {
+        "content_item_id": str(it.id),
+        "brand_id": it.brand_id,
+        "platform": it.platform,
+        "prompt": prompt,
+        # you can use this inside Make to decide size/aspect ratio:
+        "aspect_hint": aspect_hint(it.platform),
+    }, None
+
+
+def _send_to_make(make_url: str, make_key: str, to_send: list[dict[str, Any]]) -> None:
+    headers = {"Content-Type": "application/json", "x-make-apikey": make_key}
+
+    try:
+        acquire("make_media")
+        r = http_client().post(make_url, json={"items": to_send}, headers=headers, timeout=60.0)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Failed to reach Make webhook: {e}")
+
+    if r.status_code >= 400:
+        raise HTTPException(status_code=502, detail=f"Make rejected request: {r.status_code} {r.text}")
+
+
 @router.post("/image")
 def generate_images(
     payload: dict,
@@ -62,55 +117,69 @@ def generate_images(
     skipped: list[dict[str, Any]] = []
 
     for it in items:
-        if it.content_type != "image":
-            skipped.append({"id": str(it.id), "reason": f"Not an image item (content_type={it.content_type})"})
-            continue
-
-        # We will regenerate even if it was already pending, that's fine.
-        # Force into GENERATING if state machine allows.
-        if it.status not in ("TOPIC_INGESTED", "REJECTED", "DRAFT_READY", "PENDING_APPROVAL"):
-            skipped.append({"id": str(it.id), "status": it.status, "reason": "Not allowed to generate from this state"})
-            continue
-
-        # State move: REJECTED -> GENERATING is allowed in your machine
-        # TOPIC_INGESTED -> GENERATING is allowed
-        # DRAFT_READY -> FAILED only (in your map), so we won't use ensure_transition for DRAFT_READY/PENDING_APPROVAL
-        # We'll just set to GENERATING for regeneration.
-        if it.status in ("TOPIC_INGESTED", "REJECTED"):
-            ensure_transition(it.status, "GENERATING")
-        it.status = "GENERATING"
-        it.last_error = None
-        it.updated_at = datetime.utcnow()
-
-        # Prompt strategy (simple and reliable):
-        # Use body_text if present, otherwise title, otherwise topic_id
-        prompt = (it.body_text or it.title or f"Topic {it.topic_id}").strip()
-
-        to_send.append(
-            {
-                "content_item_id": str(it.id),
-                "brand_id": it.brand_id,
-                "platform": it.platform,
-                "prompt": prompt,
-                # you can use this inside Make to decide size/aspect ratio:
-                "aspect_hint": "square" if it.platform in ("instagram", "facebook") else "landscape",
-            }
-        )
+        req, skip = _prepare_item(it)
+        if skip:
+            skipped.append(skip)
+        else:
+            to_send.append(req)
 
     db.commit()
 
     if not to_send:
         return {"sent": 0, "skipped": len(skipped), "skipped_items": skipped}
 
-    headers = {"Content-Type": "application/json", "x-make-apikey": make_key}
+    _send_to_make(make_url, make_key, to_send)
 
-    try:
-        with httpx.Client(timeout=60.0) as client:
-            r = client.post(make_url, json={"items": to_send}, headers=headers)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"Failed to reach Make webhook: {e}")
+    return {"sent": len(to_send), "skipped": len(skipped), "skipped_items": skipped}
 
-    if r.status_code >= 400:
-        raise HTTPException(status_code=502, detail=f"Make rejected request: {r.status_code} {r.text}")
 
-    return {"sent": len(to_send), "skipped": len(skipped), "skipped_items": skipped}
+@router.post("/image/stream")
+def generate_images_stream(payload: dict, request: Request, format: Optional[str] = None):
+    """
+    Streaming variant of /generation/image (SSE, or NDJSON with ?format=ndjson).
+
+    Events:
+      item   {id, status: "GENERATING"} or {id, status: "SKIPPED", reason}
+      done   {sent, skipped}                   once the Make request is accepted
+      error  {detail}
+    Media arrives later through /media/ingest.
+    """
+    make_url, make_key = _require_make_config()
+    uuid_ids = _parse_ids(payload)
+
+    def _events():
+        from app.database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            items = db.execute(select(ContentItem).where(ContentItem.id.in_(uuid_ids))).scalars().all()
+            if not items:
+                yield "error", {"detail": "No items found"}
+                return
+
+            to_send: list[dict[str, Any]] = []
+            skipped = 0
+            for it in items:
+                req, skip = _prepare_item(it)
+                if skip:
+                    skipped += 1
+                    yield "item", {**skip, "status": "SKIPPED"}
+                else:
+                    to_send.append(req)
+            db.commit()
+
+            for req in to_send:
+                yield "item", {"id": req["content_item_id"], "platform": req["platform"], "status": "GENERATING"}
+
+            if to_send:
+                try:
+                    _send_to_make(make_url, make_key, to_send)
+                except HTTPException as e:
+                    yield "error", {"detail": e.detail}
+                    return
+
+            yield "done", {"sent": len(to_send), "skipped": skipped}
+        finally:
+            db.close()
+
+    return event_response(_events(), ndjson=wants_ndjson(request, format))
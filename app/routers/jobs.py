@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import uuid
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, desc
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models.job import Job
+from app.services.job_queue import requeue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_out(job: Job) -> dict[str, Any]:
+    return {
+        "id": str(job.id),
+        "job_type": job.job_type,
+        "content_item_id": str(job.content_item_id) if job.content_item_id else None,
+        "status": job.status,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "last_error": job.last_error,
+        "result": job.result,
+        "run_after": job.run_after.isoformat() if job.run_after else None,
+        "locked_by": job.locked_by,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+    }
+
+
+def _get(db: Session, job_id: str) -> Job:
+    try:
+        jid = uuid.UUID(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    job = db.get(Job, jid)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("")
+def list_jobs(
+    db: Session = Depends(get_db),
+    status: str | None = None,
+    job_type: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+):
+    q = select(Job)
+    if status:
+        q = q.where(Job.status == status)
+    if job_type:
+        q = q.where(Job.job_type == job_type)
+    q = q.order_by(desc(Job.created_at)).limit(limit)
+    return [_job_out(j) for j in db.execute(q).scalars().all()]
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str, db: Session = Depends(get_db)):
+    return _job_out(_get(db, job_id))
+
+
+@router.post("/{job_id}/retry")
+def retry_job(job_id: str, db: Session = Depends(get_db)):
+    job = _get(db, job_id)
+    if job.status not in ("dead", "done"):
+        raise HTTPException(status_code=400, detail=f"Only dead/done jobs can be retried (status={job.status})")
+    requeue(db, job)
+    return _job_out(job)
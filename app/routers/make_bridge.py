@@ -1,22 +1,27 @@
 # backend/app/routers/make_bridge.py
 from __future__ import annotations
 
+import hmac
 import os
 import uuid
 from datetime import datetime
 from typing import Any
-import re
-import httpx
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
+from app.services.clients import http_client
 from app.services.state_machine import ensure_transition
+from app.services.rate_limiter import acquire, RateLimitTimeout
+from app.services.output_parser import strip_markdown
 
 router = APIRouter(prefix="/make", tags=["make"])
 
+# how long a send without a receipt blocks re-sending the same item (unless force=true)
+RECEIPT_WAIT_SECONDS = float(os.getenv("MAKE_RECEIPT_WAIT_SECONDS", "900"))
+
 
 def _parse_ids(payload: dict) -> list[uuid.UUID]:
     ids = payload.get("content_item_ids", [])
@@ -43,6 +48,7 @@ def publish_via_make(payload: dict, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail="MAKE_API_KEY is not set in backend .env")
 
     uuid_ids = _parse_ids(payload)
+    force = bool(payload.get("force"))
 
     items = db.execute(select(ContentItem).where(ContentItem.id.in_(uuid_ids))).scalars().all()
     if not items:
@@ -50,11 +56,26 @@ def publish_via_make(payload: dict, db: Session = Depends(get_db)):
 
     to_send: list[dict[str, Any]] = []
     skipped: list[dict[str, Any]] = []
+    started = datetime.utcnow()
 
     for it in items:
         if it.status != "QUEUED":
             skipped.append({"id": str(it.id), "status": it.status, "reason": "Only QUEUED items can be sent to Make"})
             continue
+        if it.publish_claimed_at is not None:
+            skipped.append({"id": str(it.id), "status": it.status, "reason": "Being published by the publisher worker"})
+            continue
+
+        # ✅ reconciliation: a previous send may still be in flight / unconfirmed
+        if it.publish_attempted_at and not force:
+            age = (started - it.publish_attempted_at).total_seconds()
+            if age < RECEIPT_WAIT_SECONDS:
+                skipped.append({
+                    "id": str(it.id),
+                    "status": it.status,
+                    "reason": f"Awaiting Make receipt for previous send ({int(age)}s ago); pass force=true to resend",
+                })
+                continue
 
         ctype = (it.content_type or "").lower().strip()
 
@@ -98,39 +119,82 @@ def publish_via_make(payload: dict, db: Session = Depends(get_db)):
             skipped.append({"id": str(it.id), "status": it.status, "reason": f"Unsupported content_type: {it.content_type}"})
             continue
 
+        # ✅ stable per-item key, stored before the call so Make can dedupe resends
+        if not it.publish_idempotency_key:
+            it.publish_idempotency_key = uuid.uuid4().hex
+        it.publish_attempted_at = started
+        payload_item["idempotency_key"] = it.publish_idempotency_key
+
         to_send.append(payload_item)
 
     if not to_send:
         return {"sent": 0, "skipped": len(skipped), "skipped_items": skipped}
 
+    # wait for a Make token before recording the attempt, so a timeout here leaves nothing in flight
+    try:
+        acquire("make")
+    except RateLimitTimeout as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    db.commit()
+    sent_ids = {x["content_item_id"] for x in to_send}
+
     headers = {"Content-Type": "application/json", "x-make-apikey": make_api_key}
 
     # --- Call Make and REQUIRE a JSON response with results ---
     try:
-        with httpx.Client(timeout=90.0) as client:
-            r = client.post(make_webhook_url, json={"items": to_send}, headers=headers)
+        r = http_client().post(make_webhook_url, json={"items": to_send}, headers=headers, timeout=90.0)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Failed to reach Make webhook: {e}")
 
     if r.status_code >= 400:
+        # Make refused the batch outright, so nothing is in flight
+        for it in items:
+            if str(it.id) in sent_ids:
+                it.publish_attempted_at = None
+        db.commit()
         raise HTTPException(status_code=502, detail=f"Make rejected request: {r.status_code} {r.text}")
 
     try:
         data = r.json()
     except Exception:
-        # Make may have published successfully but returned empty/non-JSON
-        db.commit()
+        # Make may have published successfully but returned empty/non-JSON.
+        # Items stay QUEUED with publish_attempted_at set, so they are not re-sent
+        # until a receipt arrives on /make/receipts or the wait window passes.
         return {
             "sent": len(to_send),
             "skipped": len(skipped),
             "skipped_items": skipped,
-            "note": "Make returned non-JSON response (publish may still be successful). No publish receipt stored.",
+            "note": "Make returned non-JSON response (publish may still be successful). Awaiting receipt on /make/receipts.",
             "make_raw_text": (r.text or "")[:500],
         }
 
-    results = data.get("results") or []
+    updated_published, updated_failed, missing_in_response = _apply_make_results(
+        [it for it in items if str(it.id) in sent_ids],
+        data.get("results") or [],
+    )
+    db.commit()
+
+    return {
+        "sent": len(to_send),
+        "skipped": len(skipped),
+        "skipped_items": skipped,
+        "published": updated_published,
+        "failed": updated_failed,
+        "missing_in_make_response": missing_in_response,
+        "make_raw": data,  # keep while debugging; remove later if you want
+    }
+
+def _apply_make_results(items: list[ContentItem], results: list[dict[str, Any]]) -> tuple[int, int, list[str]]:
+    """
+    Applies Make publish receipts to items (no commit).
+    A receipt carrying an idempotency_key only counts for the send it belongs to.
+    Returns (published, failed, ids_without_receipt).
+    """
     results_by_id: dict[str, dict[str, Any]] = {}
     for row in results:
+        if not isinstance(row, dict):
+            continue
         cid = str(row.get("content_item_id") or "").strip()
         if cid:
             results_by_id[cid] = row
@@ -142,14 +206,16 @@ def publish_via_make(payload: dict, db: Session = Depends(get_db)):
 
     for it in items:
         sid = str(it.id)
-        if sid not in {x["content_item_id"] for x in to_send}:
-            continue  # skipped earlier
-
         row = results_by_id.get(sid)
         if not row:
             missing_in_response.append(sid)
             continue
 
+        key = (row.get("idempotency_key") or "").strip()
+        if key and it.publish_idempotency_key and key != it.publish_idempotency_key:
+            missing_in_response.append(sid)
+            continue
+
         ok = bool(row.get("ok"))
         if ok:
             published_url = (row.get("published_url") or "").strip() or None
@@ -175,28 +241,50 @@ def publish_via_make(payload: dict, db: Session = Depends(get_db)):
             it.updated_at = now
             updated_failed += 1
 
+        # receipt received: nothing in flight any more
+        it.publish_attempted_at = None
+
         # attempt_count tracking
         if hasattr(it, "attempt_count") and it.attempt_count is not None:
             it.attempt_count += 1
 
-    db.commit()
+    return updated_published, updated_failed, missing_in_response
 
-    return {
-        "sent": len(to_send),
-        "skipped": len(skipped),
-        "skipped_items": skipped,
-        "published": updated_published,
-        "failed": updated_failed,
-        "missing_in_make_response": missing_in_response,
-        "make_raw": data,  # keep while debugging; remove later if you want
-    }
 
-def strip_markdown(s: str) -> str:
-    if not s:
-        return s
-    s = re.sub(r"\*\*(.*?)\*\*", r"\1", s)   # **bold**
-    s = re.sub(r"\*(.*?)\*", r"\1", s)       # *italic*
-    s = re.sub(r"`(.*?)`", r"\1", s)         # `code`
-    return s
+@router.post("/receipts")
+def make_receipts(
+    payload: dict,
+    db: Session = Depends(get_db),
+    x_make_apikey: str | None = Header(default=None),
+):
+    """
+    Make calls this with publish results when /make/publish didn't get them inline:
+      {"results": [{"content_item_id": "...", "idempotency_key": "...", "ok": true, "published_url": "..."}]}
+    """
+    make_api_key = (os.getenv("MAKE_API_KEY") or "").strip()
+    if not make_api_key or not x_make_apikey or not hmac.compare_digest(x_make_apikey, make_api_key):
+        raise HTTPException(status_code=401, detail="Invalid Make API key")
+
+    results = payload.get("results") or []
+    if not isinstance(results, list) or not results:
+        raise HTTPException(status_code=400, detail="results must be a non-empty list")
+    if not all(isinstance(row, dict) for row in results):
+        raise HTTPException(status_code=400, detail="results must be a list of objects")
+
+    ids: list[uuid.UUID] = []
+    for row in results:
+        try:
+            ids.append(uuid.UUID(str(row.get("content_item_id"))))
+        except Exception:
+            continue
+
+    # only items still waiting on a publish outcome take receipts
+    items = db.execute(
+        select(ContentItem).where(ContentItem.id.in_(ids)).where(ContentItem.status == "QUEUED")
+    ).scalars().all()
+
+    published, failed, missing = _apply_make_results(list(items), results)
+    db.commit()
+    return {"published": published, "failed": failed, "ignored": len(results) - published - failed}
 
 
@@ -1,24 +1,49 @@
 # backend/app/routers/media.py
 from __future__ import annotations
 
+import asyncio
 import base64
+import hashlib
+import hmac
+import json
 import os
+import time
 import uuid
-from datetime import datetime
-from typing import Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Any, Iterator, List, Optional
 
-import httpx
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
+from app.services.clients import http_client
 from app.services.state_machine import ensure_transition
-from app.services.spaces_storage import upload_bytes_to_spaces
+from app.services import spaces_storage
+from app.services.spaces_storage import upload_many_to_spaces
+from app.services.rate_limiter import acquire
+from app.services.job_queue import enqueue
+from app.services.media_derivatives import queue_for_item as queue_derivatives
+from app.utils.streaming import event_response, wants_ndjson
 
 router = APIRouter(prefix="/media", tags=["media"])
 
+# max Make media webhook calls in flight per /media/generate request
+MAKE_MEDIA_CONCURRENCY = int(os.getenv("MAKE_MEDIA_CONCURRENCY", "4"))
+MAKE_MEDIA_TIMEOUT = float(os.getenv("MAKE_MEDIA_TIMEOUT_SECONDS", "120"))
+# callback mode: Make only has to acknowledge, the media arrives on /media/ingest
+MAKE_MEDIA_ACK_TIMEOUT = float(os.getenv("MAKE_MEDIA_ACK_TIMEOUT_SECONDS", "15"))
+MAKE_MEDIA_CALLBACK_TTL_SECONDS = int(os.getenv("MAKE_MEDIA_CALLBACK_TTL_SECONDS", str(6 * 3600)))
+# direct uploads: files above the threshold get a multipart upload with PART_SIZE parts
+UPLOAD_MULTIPART_THRESHOLD = int(os.getenv("MEDIA_UPLOAD_MULTIPART_THRESHOLD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_PART_SIZE = max(5 * 1024 * 1024, int(os.getenv("MEDIA_UPLOAD_PART_SIZE_BYTES", str(64 * 1024 * 1024))))
+UPLOAD_MAX_BYTES = int(os.getenv("MEDIA_UPLOAD_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# running stream dispatches; kept referenced so they finish even if the client disconnects
+_stream_tasks: set[asyncio.Task] = set()
+
 
 def _parse_ids(payload: dict) -> List[uuid.UUID]:
     one = payload.get("content_item_id")
@@ -53,6 +78,9 @@ def _apply_make_result_to_item(
       - media_url
       OR
       - file_base64 + mime_type (backend uploads to Spaces)
+
+    For video, prefer /media/uploads + /media/uploads/complete: Make uploads
+    straight to Spaces and base64 bytes never go through the API.
     """
     media_type = (make_data.get("media_type") or item.content_type or "").strip().lower()  # image|video
     media_url = (make_data.get("media_url") or "").strip() or None
@@ -73,29 +101,28 @@ def _apply_make_result_to_item(
             raise ValueError("file_base64 is not valid base64")
 
         ext = (make_data.get("filename_ext") or ("png" if mime == "image/png" else "bin")).strip()
+        files = [{"content": raw, "content_type": mime, "key_prefix": f"content/{media_type or 'media'}", "filename_ext": ext}]
 
-        uploaded_media_url = upload_bytes_to_spaces(
-            content=raw,
-            content_type=mime,
-            key_prefix=f"content/{media_type or 'media'}",
-            filename_ext=ext,
-        )
-
-        # optional thumbnail
+        # optional thumbnail, uploaded alongside the media
         t_b64 = (make_data.get("thumbnail_base64") or "").strip()
         t_mime = (make_data.get("thumbnail_mime_type") or "").strip()
         if t_b64 and t_mime:
             try:
-                t_raw = base64.b64decode(t_b64)
-                t_ext = (make_data.get("thumbnail_ext") or "jpg").strip()
-                uploaded_thumb_url = upload_bytes_to_spaces(
-                    content=t_raw,
-                    content_type=t_mime,
-                    key_prefix="content/thumbnails",
-                    filename_ext=t_ext,
-                )
+                files.append({
+                    "content": base64.b64decode(t_b64),
+                    "content_type": t_mime,
+                    "key_prefix": "content/thumbnails",
+                    "filename_ext": (make_data.get("thumbnail_ext") or "jpg").strip(),
+                })
             except Exception:
-                uploaded_thumb_url = None
+                pass
+
+        outcomes = upload_many_to_spaces(files)
+        if not outcomes[0].ok:
+            raise RuntimeError(outcomes[0].error)
+        uploaded_media_url = outcomes[0].url
+        if len(outcomes) > 1 and outcomes[1].ok:
+            uploaded_thumb_url = outcomes[1].url
 
     final_media_url = media_url or uploaded_media_url
     final_thumb_url = thumb_url or uploaded_thumb_url
@@ -112,18 +139,32 @@ def _apply_make_result_to_item(
     return final_media_url, final_thumb_url
 
 
-@router.post("/generate")
-def generate_media_for_items(payload: dict, db: Session = Depends(get_db)) -> dict[str, Any]:
-    """
-    UI calls this to generate media.
-    NO callback endpoint required.
+def _callback_secret() -> bytes:
+    secret = (os.getenv("MAKE_CALLBACK_SECRET") or os.getenv("MAKE_API_KEY") or "").strip()
+    if not secret:
+        raise HTTPException(status_code=500, detail="MAKE_CALLBACK_SECRET (or MAKE_API_KEY) is not set in backend .env")
+    return secret.encode("utf-8")
 
-    Backend will:
-      - set item -> GENERATING
-      - call Make webhook (MAKE_MEDIA_WEBHOOK_URL)
-      - Make returns JSON with media_url (or base64)
-      - backend saves media_url and moves item -> PENDING_APPROVAL
+
+def _callback_token(item_id: str, issued_at: Optional[int] = None) -> str:
+    """
+    "<issued_at>.<hex hmac-sha256(secret, item_id.issued_at)>", echoed back by Make on /media/ingest.
     """
+    ts = int(issued_at if issued_at is not None else time.time())
+    mac = hmac.new(_callback_secret(), f"{item_id}.{ts}".encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"{ts}.{mac}"
+
+
+def _verify_callback_token(item_id: str, token: str) -> bool:
+    ts, _, _mac = (token or "").partition(".")
+    if not ts.isdigit():
+        return False
+    if time.time() - int(ts) > MAKE_MEDIA_CALLBACK_TTL_SECONDS:
+        return False
+    return hmac.compare_digest(_callback_token(item_id, int(ts)), token)
+
+
+def _require_make_media_config() -> tuple[str, str]:
     make_url = (os.getenv("MAKE_MEDIA_WEBHOOK_URL") or "").strip()
     if not make_url:
         raise HTTPException(status_code=500, detail="MAKE_MEDIA_WEBHOOK_URL is not set in backend .env")
@@ -132,96 +173,607 @@ def generate_media_for_items(payload: dict, db: Session = Depends(get_db)) -> di
     if not make_api_key:
         raise HTTPException(status_code=500, detail="MAKE_API_KEY is not set in backend .env")
 
+    return make_url, make_api_key
+
+
+def _make_request_body(it: ContentItem, ct: str, callback_url: Optional[str] = None) -> dict[str, Any]:
+    body = {
+        "content_item_id": str(it.id),
+        "brand_id": it.brand_id,
+        "platform": it.platform,
+        "content_type": ct,
+        "status": it.status,
+        "prompt": (it.body_text or it.title or "").strip() or "Generate a social media visual for this post.",
+    }
+    if callback_url:
+        body["callback_url"] = callback_url
+        body["callback_token"] = _callback_token(body["content_item_id"])
+    return body
+
+
+def _mark_generating(it: ContentItem, now: datetime) -> Optional[str]:
+    """
+    Moves an image/video item to GENERATING (caller commits).
+    Returns the content type, or None if the item is not media.
+    """
+    ct = (it.content_type or "").lower().strip()
+    if ct not in ("image", "video"):
+        return None
+    try:
+        ensure_transition(it.status, "GENERATING")
+    except Exception:
+        pass
+    it.status = "GENERATING"
+    it.updated_at = now
+    it.last_error = None
+    it.media_callback_at = None
+    return ct
+
+
+def _call_make(make_url: str, make_api_key: str, body: dict[str, Any], timeout: float) -> tuple[int, str]:
+    """
+    One Make media webhook call; no DB access, safe to run on a worker thread.
+    Returns (status_code, response text).
+    """
+    acquire("make_media")
+    r = http_client().post(
+        make_url,
+        json=body,
+        headers={
+            "Content-Type": "application/json",
+            "x-make-apikey": make_api_key,
+        },
+        timeout=timeout,
+    )
+    return r.status_code, r.text
+
+
+def _finish_item(
+    it: ContentItem,
+    outcome: Optional[tuple[int, str]],
+    err: Optional[Exception],
+    now: datetime,
+    callback: bool = False,
+    db: Optional[Session] = None,
+) -> tuple[bool, bool, Optional[str]]:
+    """
+    Applies a Make call outcome to a GENERATING item (caller commits).
+    Returns (sent, updated, skip_reason). In callback mode any 2xx is an
+    acknowledgement (Make's default webhook reply is plain-text "Accepted");
+    unless the body is JSON carrying media, the item stays GENERATING for /media/ingest.
+    """
+    def _fail(reason: str):
+        it.status = "FAILED"
+        it.last_error = reason
+        it.updated_at = now
+        it.media_callback_at = None
+
+    if err is not None:
+        _fail(f"Make exception: {err}")
+        return False, False, str(err)
+
+    status_code, text = outcome
+    if status_code >= 300:
+        _fail(f"Make webhook error {status_code}: {text}")
+        return False, False, it.last_error
+
+    if callback:
+        try:
+            make_data = json.loads(text) if text else {}
+        except ValueError:
+            make_data = {}
+        if not isinstance(make_data, dict) or not (make_data.get("media_url") or make_data.get("file_base64")):
+            return True, False, None
+    else:
+        try:
+            make_data = json.loads(text) if text else {}
+            if not isinstance(make_data, dict):
+                raise ValueError("Make response must be JSON object")
+        except Exception as e:
+            _fail(f"Make exception: {e}")
+            return True, False, str(e)
+
+    reason = _apply_media(it, make_data, now, db=db)
+    return True, reason is None, reason
+
+
+def _apply_media(it: ContentItem, make_data: dict, now: datetime, db: Optional[Session] = None) -> Optional[str]:
+    """
+    Stores Make's media on a GENERATING item and moves it to PENDING_APPROVAL,
+    or marks it FAILED (caller commits). Returns the failure reason, if any.
+    With db, also queues the item's WebP derivatives.
+    """
+    it.media_callback_at = None
+    # Apply result to item (media_url or base64)
+    try:
+        _apply_make_result_to_item(it, make_data)
+    except Exception as e:
+        it.status = "FAILED"
+        it.last_error = f"Bad Make response: {e}"
+        it.updated_at = now
+        return it.last_error
+
+    # Move -> PENDING_APPROVAL
+    try:
+        ensure_transition("GENERATING", "PENDING_APPROVAL")
+    except Exception:
+        pass
+    it.status = "PENDING_APPROVAL"
+    it.updated_at = now
+    it.last_error = None
+    if db is not None:
+        queue_derivatives(db, it)
+    return None
+
+
+def expire_awaiting_callbacks(db: Session, ttl_seconds: float = MAKE_MEDIA_CALLBACK_TTL_SECONDS) -> int:
+    """
+    Fails items dispatched in callback mode that are still GENERATING after
+    the callback token lifetime (caller commits). Past that, Make's token is
+    rejected by /media/ingest anyway, so the item would otherwise wait forever;
+    FAILED shows it in the UI and it can be dispatched again. Only items with
+    media_callback_at set are touched, so inline dispatches, generate_media
+    jobs and text generation are never swept up.
+    """
+    now = datetime.utcnow()
+    q = (
+        select(ContentItem)
+        .where(ContentItem.status == "GENERATING")
+        .where(ContentItem.media_callback_at < now - timedelta(seconds=ttl_seconds))
+        .with_for_update(skip_locked=True)
+    )
+    items = db.execute(q).scalars().all()
+    for it in items:
+        ensure_transition(it.status, "FAILED")
+        it.status = "FAILED"
+        it.last_error = f"No media from Make within {int(ttl_seconds)}s; dispatch again to retry"
+        it.updated_at = now
+        it.media_callback_at = None
+    return len(items)
+
+
+def _generate_media_for_item(
+    db: Session,
+    it: ContentItem,
+    make_url: str,
+    make_api_key: str,
+    now: datetime,
+) -> tuple[bool, bool, Optional[str]]:
+    """
+    Runs one item through the Make media webhook and commits the outcome.
+    Returns (sent, updated, skip_reason).
+    """
+    ct = _mark_generating(it, now)
+    if ct is None:
+        return False, False, f"Not image/video: {it.content_type}"
+    db.commit()
+
+    # Call Make and WAIT for response
+    outcome, err = None, None
+    try:
+        outcome = _call_make(make_url, make_api_key, _make_request_body(it, ct), MAKE_MEDIA_TIMEOUT)
+    except Exception as e:
+        err = e
+    result = _finish_item(it, outcome, err, now, db=db)
+    db.commit()
+    return result
+
+
+def dispatch_media(
+    db: Session,
+    items: list[ContentItem],
+    make_url: str,
+    make_api_key: str,
+    *,
+    concurrency: int = MAKE_MEDIA_CONCURRENCY,
+    callback_url: Optional[str] = None,
+) -> Iterator[tuple[str, bool, bool, Optional[str], ContentItem]]:
+    """
+    Sends items to the Make media webhook with at most `concurrency` calls in
+    flight. Yields (item_id, sent, updated, skip_reason, item) as each call
+    finishes, in completion order.
+
+    All items move to GENERATING in one commit up front. Only the HTTP calls
+    run on worker threads; results are applied and committed on the caller's
+    thread, so the session is never shared.
+
+    With callback_url set, Make is expected to acknowledge right away and
+    POST the finished media to /media/ingest later; items are stamped with
+    media_callback_at and stay GENERATING until then, or until
+    expire_awaiting_callbacks() (job workers, expire_media_callbacks script)
+    fails them after MAKE_MEDIA_CALLBACK_TTL_SECONDS.
+    """
+    now = datetime.utcnow()
+    calls: list[tuple[ContentItem, str, dict[str, Any]]] = []
+    skipped: list[tuple[ContentItem, str, str]] = []
+    for it in items:
+        ct = _mark_generating(it, now)
+        if ct is None:
+            skipped.append((it, str(it.id), f"Not image/video: {it.content_type}"))
+            continue
+        if callback_url:
+            it.media_callback_at = now
+        calls.append((it, str(it.id), _make_request_body(it, ct, callback_url)))
+    db.commit()
+
+    for it, item_id, reason in skipped:
+        yield item_id, False, False, reason, it
+    if not calls:
+        return
+
+    timeout = MAKE_MEDIA_ACK_TIMEOUT if callback_url else MAKE_MEDIA_TIMEOUT
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(calls)))) as pool:
+        futures = {
+            pool.submit(_call_make, make_url, make_api_key, body, timeout): (it, item_id)
+            for it, item_id, body in calls
+        }
+        for fut in as_completed(futures):
+            it, item_id = futures[fut]
+            try:
+                outcome, err = fut.result(), None
+            except Exception as e:
+                outcome, err = None, e
+            sent, updated, reason = _finish_item(it, outcome, err, datetime.utcnow(), callback=bool(callback_url), db=db)
+            db.commit()
+            yield item_id, sent, updated, reason, it
+
+
+@router.post("/generate")
+def generate_media_for_items(payload: dict, request: Request, db: Session = Depends(get_db)) -> dict[str, Any]:
+    """
+    UI calls this to generate media.
+
+    Backend will:
+      - set items -> GENERATING
+      - call Make webhook (MAKE_MEDIA_WEBHOOK_URL), up to MAKE_MEDIA_CONCURRENCY at once
+      - Make returns JSON with media_url (or base64)
+      - backend saves media_url and moves item -> PENDING_APPROVAL
+
+    With {"callback": true} Make only has to acknowledge; each request carries
+    callback_url + callback_token and Make POSTs the result to /media/ingest
+    later, so this returns as soon as every item is dispatched.
+
+    With {"queue": true} each item becomes a generate_media job and the call returns right away.
+    """
+    make_url, make_api_key = _require_make_media_config()
+
     ids = _parse_ids(payload)
 
     items = db.execute(select(ContentItem).where(ContentItem.id.in_(ids))).scalars().all()
     if not items:
         raise HTTPException(status_code=404, detail="No items found")
 
-    now = datetime.utcnow()
+    if payload.get("queue"):
+        job_ids = []
+        skipped_q: list[dict[str, Any]] = []
+        for it in items:
+            if (it.content_type or "").lower().strip() not in ("image", "video"):
+                skipped_q.append({"id": str(it.id), "reason": f"Not image/video: {it.content_type}"})
+                continue
+            job = enqueue(db, "generate_media", content_item_id=it.id, commit=False)
+            job_ids.append(str(job.id))
+        db.commit()
+        return {"queued": len(job_ids), "job_ids": job_ids, "skipped": len(skipped_q), "skipped_items": skipped_q}
+
+    callback_url = _ingest_url(request) if payload.get("callback") else None
+
     sent = 0
     updated = 0
     skipped: list[dict[str, Any]] = []
 
-    for it in items:
-        ct = (it.content_type or "").lower().strip()
-        if ct not in ("image", "video"):
-            skipped.append({"id": str(it.id), "reason": f"Not image/video: {it.content_type}"})
-            continue
+    for item_id, was_sent, was_updated, reason, _ in dispatch_media(db, list(items), make_url, make_api_key, callback_url=callback_url):
+        sent += int(was_sent)
+        updated += int(was_updated)
+        if reason:
+            skipped.append({"id": item_id, "reason": reason})
 
-        # Move -> GENERATING
-        try:
-            ensure_transition(it.status, "GENERATING")
-        except Exception:
-            pass
-        it.status = "GENERATING"
+    out = {"sent": sent, "updated": updated, "skipped": len(skipped), "skipped_items": skipped}
+    if callback_url:
+        out["awaiting_callback"] = sent - updated
+    return out
+
+
+def _ingest_url(request: Request) -> str:
+    return (os.getenv("MAKE_MEDIA_CALLBACK_URL") or "").strip() or str(request.url_for("ingest_media"))
+
+
+def _authorize_make_item(item_id: str, token: Optional[str], make_apikey: Optional[str]) -> None:
+    """
+    Make may act on an item with that item's callback token or with MAKE_API_KEY.
+    """
+    if token and _verify_callback_token(item_id, token):
+        return
+    expected = (os.getenv("MAKE_API_KEY") or "").strip()
+    if expected and make_apikey and hmac.compare_digest(make_apikey, expected):
+        return
+    raise HTTPException(status_code=401, detail="Invalid callback token")
+
+
+def _upload_prefix(item_id: str, kind: str, media_type: str) -> str:
+    # keys are namespaced per item so a completion can only attach that item's objects
+    if kind == "thumbnail":
+        return f"content/thumbnails/{item_id}"
+    return f"content/{media_type or 'media'}/{item_id}"
+
+
+def _non_negative_int(payload: dict, field: str) -> int:
+    raw = payload.get(field)
+    if raw is None or raw == "":
+        return 0
+    if isinstance(raw, bool):
+        raise HTTPException(status_code=400, detail=f"{field} must be a non-negative integer")
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"{field} must be a non-negative integer")
+    if value < 0 or (isinstance(raw, float) and raw != value):
+        raise HTTPException(status_code=400, detail=f"{field} must be a non-negative integer")
+    return value
+
+
+def _load_make_item(db: Session, payload: dict, x_callback_token: Optional[str], x_make_apikey: Optional[str]) -> ContentItem:
+    item_id = str(payload.get("content_item_id") or "").strip()
+    if not item_id:
+        raise HTTPException(status_code=400, detail="content_item_id is required")
+    _authorize_make_item(item_id, (payload.get("callback_token") or x_callback_token or "").strip(), x_make_apikey)
+    try:
+        it = db.get(ContentItem, uuid.UUID(item_id))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid content_item_id")
+    if not it:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return it
+
+
+@router.post("/ingest")
+def ingest_media(
+    payload: dict,
+    db: Session = Depends(get_db),
+    x_callback_token: str | None = Header(default=None),
+    x_make_apikey: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Make calls this when a callback-mode generation finishes:
+      {"content_item_id": "...", "callback_token": "...", "media_url": "..."}
+      (or file_base64 + mime_type, as for the inline response)
+      {"content_item_id": "...", "callback_token": "...", "error": "..."} on failure
+
+    The token (body or X-Callback-Token header) is the one sent with the
+    request; it is bound to the item and expires after
+    MAKE_MEDIA_CALLBACK_TTL_SECONDS. Requests without a token (e.g. after
+    /generation/image) authenticate with the x-make-apikey header instead.
+    Only GENERATING items take results, so redelivered callbacks are no-ops.
+    """
+    it = _load_make_item(db, payload, x_callback_token, x_make_apikey)
+    item_id = str(it.id)
+    if it.status != "GENERATING":
+        return {"applied": False, "id": item_id, "status": it.status}
+
+    now = datetime.utcnow()
+    error = (payload.get("error") or "").strip()
+    if error:
+        it.status = "FAILED"
+        it.last_error = f"Make error: {error}"
         it.updated_at = now
-        it.last_error = None
-        db.commit()
+        it.media_callback_at = None
+    else:
+        _apply_media(it, payload, now, db=db)
+    db.commit()
+
+    return {
+        "applied": it.status == "PENDING_APPROVAL",
+        "id": item_id,
+        "status": it.status,
+        "media_url": it.media_url,
+        "thumbnail_url": it.thumbnail_url,
+        "last_error": it.last_error,
+    }
+
+
+@router.post("/uploads")
+def create_media_upload(
+    payload: dict,
+    db: Session = Depends(get_db),
+    x_callback_token: str | None = Header(default=None),
+    x_make_apikey: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Issues a presigned Spaces upload for one content item so Make can upload
+    the file directly instead of sending file_base64 through the API:
+      {"content_item_id": "...", "callback_token": "...", "mime_type": "video/mp4",
+       "filename_ext": "mp4", "size": 734003200, "kind": "media" | "thumbnail"}
+
+    Small files get one presigned PUT url (send the returned headers with it).
+    Files over MEDIA_UPLOAD_MULTIPART_THRESHOLD_BYTES, or {"parts": n}, get a
+    multipart upload: PUT part i to part_urls[i-1] and keep each ETag.
+    Then call /media/uploads/complete with the key (and upload_id + parts).
+    """
+    it = _load_make_item(db, payload, x_callback_token, x_make_apikey)
+
+    mime = (payload.get("mime_type") or "").strip()
+    if not mime:
+        raise HTTPException(status_code=400, detail="mime_type is required")
+    kind = (payload.get("kind") or "media").strip().lower()
+    if kind not in ("media", "thumbnail"):
+        raise HTTPException(status_code=400, detail="kind must be media or thumbnail")
+
+    size = _non_negative_int(payload, "size")
+    if size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large (max {UPLOAD_MAX_BYTES} bytes)")
+
+    ext = (payload.get("filename_ext") or mime.split("/")[-1] or "bin").strip().lstrip(".")
+    media_type = (it.content_type or "").strip().lower()
+    obj_key = spaces_storage.new_object_key(_upload_prefix(str(it.id), kind, media_type), ext)
+
+    parts = _non_negative_int(payload, "parts")
+    if not parts and size > UPLOAD_MULTIPART_THRESHOLD:
+        parts = -(-size // UPLOAD_PART_SIZE)
+
+    try:
+        if parts > 1:
+            upload = spaces_storage.presign_multipart(obj_key, mime, min(parts, 10000))
+            upload["part_size"] = UPLOAD_PART_SIZE
+        else:
+            upload = spaces_storage.presign_put(obj_key, mime)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"key": obj_key, "public_url": spaces_storage.public_url(obj_key), **upload}
+
+
+@router.post("/uploads/complete")
+def complete_media_upload(
+    payload: dict,
+    db: Session = Depends(get_db),
+    x_callback_token: str | None = Header(default=None),
+    x_make_apikey: str | None = Header(default=None),
+) -> dict[str, Any]:
+    """
+    Attaches a directly uploaded object to its item:
+      {"content_item_id": "...", "callback_token": "...", "key": "...",
+       "upload_id": "...", "parts": [{"PartNumber": 1, "ETag": "..."}],   # multipart only
+       "thumbnail_key": "...", "media_caption": "..."}                     # optional
+
+    Finishes the multipart upload if there is one, checks the object with a
+    HEAD request (exists, non-empty, under the size cap) and moves the item
+    GENERATING -> PENDING_APPROVAL. The file itself never passes through the API.
+    """
+    it = _load_make_item(db, payload, x_callback_token, x_make_apikey)
+    item_id = str(it.id)
+    media_type = (it.content_type or "").strip().lower()
 
-        prompt = (it.body_text or it.title or "").strip() or "Generate a social media visual for this post."
+    obj_key = (payload.get("key") or "").strip()
+    if not obj_key.startswith(_upload_prefix(item_id, "media", media_type) + "/"):
+        raise HTTPException(status_code=400, detail="key does not belong to this item")
 
-        # Call Make and WAIT for response
-        try:
-            with httpx.Client(timeout=120.0) as client:
-                r = client.post(
-                    make_url,
-                    json={
-                        "content_item_id": str(it.id),
-                        "brand_id": it.brand_id,
-                        "platform": it.platform,
-                        "content_type": ct,
-                        "status":it.status,
-                        "prompt": prompt,
-                    },
-                    headers={
-                        "Content-Type": "application/json",
-                        "x-make-apikey": make_api_key,
-                    },
-                )
-
-            if r.status_code >= 300:
-                it.status = "FAILED"
-                it.last_error = f"Make webhook error {r.status_code}: {r.text}"
-                it.updated_at = now
-                db.commit()
-                skipped.append({"id": str(it.id), "reason": it.last_error})
-                continue
+    thumb_key = (payload.get("thumbnail_key") or "").strip() or None
+    if thumb_key and not thumb_key.startswith(_upload_prefix(item_id, "thumbnail", media_type) + "/"):
+        raise HTTPException(status_code=400, detail="thumbnail_key does not belong to this item")
 
-            sent += 1
+    upload_id = (payload.get("upload_id") or "").strip()
+    if upload_id:
+        parts = payload.get("parts") or []
+        try:
+            spaces_storage.complete_multipart(
+                obj_key,
+                upload_id,
+                [{"PartNumber": int(p["PartNumber"]), "ETag": str(p["ETag"])} for p in parts],
+            )
+        except (KeyError, TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="parts must be [{PartNumber, ETag}, ...]")
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Could not complete multipart upload: {e}")
+
+    head = spaces_storage.head_object(obj_key)
+    if head is None:
+        raise HTTPException(status_code=400, detail="Object has not been uploaded")
+    if head["size"] <= 0 or head["size"] > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=400, detail=f"Uploaded object has invalid size {head['size']}")
+
+    if thumb_key and spaces_storage.head_object(thumb_key) is None:
+        thumb_key = None
+
+    if it.status != "GENERATING":
+        return {"applied": False, "id": item_id, "status": it.status}
+
+    reason = _apply_media(
+        it,
+        {
+            "media_url": spaces_storage.public_url(obj_key),
+            "thumbnail_url": spaces_storage.public_url(thumb_key) if thumb_key else None,
+            "media_type": payload.get("media_type"),
+            "media_caption": payload.get("media_caption"),
+        },
+        datetime.utcnow(),
+        db=db,
+    )
+    db.commit()
+
+    return {
+        "applied": reason is None,
+        "id": item_id,
+        "status": it.status,
+        "media_url": it.media_url,
+        "thumbnail_url": it.thumbnail_url,
+        "size": head["size"],
+        "content_type": head["content_type"],
+        "last_error": reason,
+    }
+
+
+@router.post("/generate/stream")
+async def generate_media_stream(payload: dict, request: Request, format: Optional[str] = None):
+    """
+    Streaming variant of /media/generate (SSE, or NDJSON with ?format=ndjson).
+    Items are dispatched concurrently, so item events arrive in completion order.
+
+    Events:
+      item   {id, status: "GENERATING"} for every media item before dispatch, then
+             {id, status, media_url, thumbnail_url, last_error} once it is applied
+      done   {sent, updated, skipped}
+      error  {detail}
+    The dispatch runs on a worker thread with its own session and always runs to
+    completion, so a client disconnect never leaves Make results unapplied.
+    """
+    from app.database import SessionLocal
 
-            make_data = r.json() if r.text else {}
-            if not isinstance(make_data, dict):
-                raise ValueError("Make response must be JSON object")
+    make_url, make_api_key = _require_make_media_config()
+    ids = _parse_ids(payload)
+    callback_url = _ingest_url(request) if payload.get("callback") else None
 
-            # Apply result to item (media_url or base64)
-            try:
-                _apply_make_result_to_item(it, make_data)
-            except Exception as e:
-                it.status = "FAILED"
-                it.last_error = f"Bad Make response: {e}"
-                it.updated_at = now
-                db.commit()
-                skipped.append({"id": str(it.id), "reason": it.last_error})
-                continue
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
 
-            # Move -> PENDING_APPROVAL
-            try:
-                ensure_transition(it.status, "PENDING_APPROVAL")
-            except Exception:
-                pass
-            it.status = "PENDING_APPROVAL"
-            it.updated_at = now
-            it.last_error = None
-            db.commit()
-            updated += 1
+    def _emit(ev):
+        loop.call_soon_threadsafe(queue.put_nowait, ev)
 
+    def _run():
+        db = SessionLocal()
+        try:
+            items = db.execute(select(ContentItem).where(ContentItem.id.in_(ids))).scalars().all()
+            sent = updated = skipped = 0
+
+            for it in items:
+                if (it.content_type or "").lower().strip() in ("image", "video"):
+                    _emit(("item", {"id": str(it.id), "platform": it.platform, "status": "GENERATING"}))
+
+            for item_id, was_sent, was_updated, reason, it in dispatch_media(
+                db, list(items), make_url, make_api_key, callback_url=callback_url
+            ):
+                sent += int(was_sent)
+                updated += int(was_updated)
+                skipped += int(bool(reason))
+
+                _emit(("item", {
+                    "id": item_id,
+                    "status": it.status if (was_sent or was_updated or it.status == "FAILED") else "SKIPPED",
+                    "media_url": it.media_url,
+                    "thumbnail_url": it.thumbnail_url,
+                    "last_error": reason,
+                }))
+
+            return {"sent": sent, "updated": updated, "skipped": skipped}
+        finally:
+            db.close()
+
+    # events are queued with call_soon_threadsafe before the thread returns, so
+    # the None sentinel below always arrives after the last of them
+    task = asyncio.create_task(asyncio.to_thread(_run))
+    _stream_tasks.add(task)
+    task.add_done_callback(_stream_tasks.discard)
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    async def _events():
+        while True:
+            ev = await queue.get()
+            if ev is None:
+                break
+            yield ev
+        try:
+            totals = task.result()
         except Exception as e:
-            it.status = "FAILED"
-            it.last_error = f"Make exception: {e}"
-            it.updated_at = now
-            db.commit()
-            skipped.append({"id": str(it.id), "reason": str(e)})
-            continue
+            yield "error", {"detail": str(e)}
+            return
+        yield "done", totals
 
-    return {"sent": sent, "updated": updated, "skipped": len(skipped), "skipped_items": skipped}
+    return event_response(_events(), ndjson=wants_ndjson(request, format))
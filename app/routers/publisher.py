@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import select, asc
+from sqlalchemy import select, asc, or_
 from datetime import datetime, timezone
 
 from app.database import get_db
@@ -17,6 +17,7 @@ def due(db: Session = Depends(get_db), limit: int = Query(20, ge=1, le=200)):
         .where(ContentItem.status == "SCHEDULED")
         .where(ContentItem.scheduled_at.isnot(None))
         .where(ContentItem.scheduled_at <= now)
+        .where(or_(ContentItem.next_attempt_at.is_(None), ContentItem.next_attempt_at <= now))
         .order_by(asc(ContentItem.scheduled_at))
         .limit(limit)
     )
@@ -7,6 +7,7 @@ import uuid
 from app.database import get_db
 from app.models.content_item import ContentItem
 from app.services.state_machine import ensure_transition
+from app.services.due_scheduler import notify_due_changed
 
 router = APIRouter(prefix="/publishing", tags=["publishing"])
 
@@ -38,10 +39,14 @@ def mark_published(payload: dict, db: Session = Depends(get_db)):
         if it.status != "QUEUED":
             skipped.append({"id": str(it.id), "status": it.status, "reason": "Only QUEUED items can be published"})
             continue
+        if it.publish_claimed_at is not None:
+            skipped.append({"id": str(it.id), "status": it.status, "reason": "Being published by the publisher worker"})
+            continue
 
         ensure_transition(it.status, "PUBLISHED")
         it.status = "PUBLISHED"
         it.published_at = datetime.utcnow()
+        it.publish_attempted_at = None
         if published_url:
             it.published_url = published_url
         moved += 1
@@ -65,11 +70,15 @@ def undo_queued(payload: dict, db: Session = Depends(get_db)):
         if it.status != "QUEUED":
             skipped.append({"id": str(it.id), "status": it.status, "reason": "Only QUEUED items can be reverted"})
             continue
+        if it.publish_claimed_at is not None:
+            skipped.append({"id": str(it.id), "status": it.status, "reason": "Being published by the publisher worker"})
+            continue
 
         ensure_transition(it.status, "SCHEDULED")
         it.status = "SCHEDULED"
         moved += 1
 
+    notify_due_changed(db, items)
     db.commit()
     return {"reverted": moved, "skipped": len(skipped), "skipped_items": skipped}
 
@@ -94,9 +103,11 @@ def retry_failed(payload: dict, db: Session = Depends(get_db)):
         ensure_transition(it.status, "SCHEDULED")
         it.status = "SCHEDULED"
         it.last_error = None
+        it.next_attempt_at = None  # manual retry skips any remaining backoff
         # attempt_count exists in your DB now — ensure model has it too
         it.attempt_count = (it.attempt_count or 0) + 1
         moved += 1
 
+    notify_due_changed(db, items)
     db.commit()
     return {"retried": moved, "skipped": len(skipped), "skipped_items": skipped}
@@ -7,6 +7,7 @@ import uuid
 from app.database import get_db
 from app.models.content_item import ContentItem
 from app.services.state_machine import ensure_transition
+from app.services.due_scheduler import notify_due_changed
 
 router = APIRouter(prefix="/schedule", tags=["schedule"])
 
@@ -46,7 +47,9 @@ def bulk_schedule(payload: dict, db: Session = Depends(get_db)):
         it.scheduled_at = dt
         it.status = "SCHEDULED"
         it.last_error = None  # clear previous publish error
+        it.next_attempt_at = None
         # do not change attempt_count here
 
+    notify_due_changed(db, items)
     db.commit()
     return {"scheduled": len(items), "scheduled_at": dt.isoformat()}
\ No newline at end of file
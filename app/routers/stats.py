@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from app.database import get_db
+from app.services.llm_metrics import GROUP_COLUMNS, flush as flush_llm_metrics
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
@@ -34,3 +37,47 @@ def overview(db: Session = Depends(get_db)):
         "by_brand": by_brand,
     }
 
+
+@router.get("/llm")
+def llm_calls(
+    hours: int = Query(24, ge=1, le=24 * 90),
+    group_by: str = Query("call_type,platform,content_type"),
+    brand_id: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Latency percentiles and token totals of model calls, grouped by any of:
+    call_type, model, prompt_version, brand_id, platform, content_type, cache_hit.
+    """
+    cols = [c.strip() for c in group_by.split(",") if c.strip()]
+    bad = [c for c in cols if c not in GROUP_COLUMNS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Cannot group by: {', '.join(bad)}")
+
+    # flush this process's buffered rows so the numbers include them
+    flush_llm_metrics()
+
+    select_cols = "".join(f"{c}, " for c in cols)
+    group_clause = f"GROUP BY {', '.join(cols)}" if cols else ""
+    brand_clause = "AND brand_id = :brand_id" if brand_id else ""
+
+    rows = db.execute(text(f"""
+        SELECT {select_cols}
+               COUNT(*)::int AS calls,
+               SUM(CASE WHEN cache_hit THEN 1 ELSE 0 END)::int AS cache_hits,
+               SUM(CASE WHEN ok THEN 0 ELSE 1 END)::int AS errors,
+               COALESCE(SUM(input_tokens), 0)::bigint AS input_tokens,
+               COALESCE(SUM(output_tokens), 0)::bigint AS output_tokens,
+               ROUND(AVG(input_tokens) FILTER (WHERE NOT cache_hit))::int AS avg_input_tokens,
+               percentile_cont(0.5) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE NOT cache_hit) AS p50_ms,
+               percentile_cont(0.9) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE NOT cache_hit) AS p90_ms,
+               percentile_cont(0.99) WITHIN GROUP (ORDER BY latency_ms) FILTER (WHERE NOT cache_hit) AS p99_ms,
+               MAX(latency_ms) FILTER (WHERE NOT cache_hit) AS max_ms
+        FROM llm_call_metrics
+        WHERE created_at >= now() at time zone 'utc' - make_interval(hours => :hours)
+        {brand_clause}
+        {group_clause}
+        ORDER BY p90_ms DESC NULLS LAST;
+    """), {"hours": hours, "brand_id": brand_id}).mappings().all()
+
+    return {"hours": hours, "group_by": cols, "rows": rows}
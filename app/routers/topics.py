@@ -4,11 +4,14 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
+from app.services.topic_dedup import THRESHOLD, TopicIndex, get_index, publish, register_topic, signature
 
 router = APIRouter(prefix="/topics", tags=["topics"])
 
@@ -23,14 +26,22 @@ def create_topics(payload: dict, db: Session = Depends(get_db)):
         "topics": ["..."],
         "brand_id": "neuroflow-ai",
         "platforms": ["facebook","instagram","linkedin"],
-        "content_types": ["text","image","video"]
+        "content_types": ["text","image","video"],
+        "on_duplicate": "flag"   # optional: "flag" | "merge" | "allow"
       }
+
+    Near-duplicates of existing topics of the brand (or of earlier topics in
+    the same request) are detected with MinHash/LSH:
+      flag  -> items are created, duplicates are listed in the response
+      merge -> no items are created for the duplicate; it maps to the existing topic_id
+      allow -> no check (topics are still fingerprinted for later checks)
     """
 
     topics = payload.get("topics") or []
     brand_id = (payload.get("brand_id") or "neuroflow-ai").strip()
     platforms = payload.get("platforms") or []
     content_types = payload.get("content_types") or []
+    on_duplicate = (payload.get("on_duplicate") or "flag").strip().lower()
 
     if not isinstance(topics, list) or len(topics) == 0:
         raise HTTPException(status_code=400, detail="topics must be a non-empty list")
@@ -39,6 +50,9 @@ def create_topics(payload: dict, db: Session = Depends(get_db)):
     if not isinstance(content_types, list) or len(content_types) == 0:
         raise HTTPException(status_code=400, detail="content_types must be a non-empty list")
 
+    if on_duplicate not in ("flag", "merge", "allow"):
+        raise HTTPException(status_code=400, detail="on_duplicate must be flag, merge or allow")
+
     allowed_types = {"text", "image", "video"}
 
     for ct in content_types:
@@ -47,6 +61,11 @@ def create_topics(payload: dict, db: Session = Depends(get_db)):
 
     created = 0
     now = datetime.utcnow()
+    duplicates: list[dict] = []
+    index = get_index(db, brand_id) if on_duplicate != "allow" else None
+    # this request's topics: checked against like the shared index, but only
+    # published to it after the commit below succeeds
+    staged = TopicIndex()
 
     for t in topics:
         topic_text = (t or "").strip()
@@ -54,6 +73,25 @@ def create_topics(payload: dict, db: Session = Depends(get_db)):
             continue
 
         topic_id = uuid.uuid4()  # we use a UUID for topic_id grouping
+        sig = signature(topic_text)
+        match = None
+
+        if index is not None:
+            hits = index.query(sig, limit=1) + staged.query(sig, limit=1)
+            match = max(hits, key=lambda m: m.similarity, default=None)
+            if match:
+                duplicates.append({
+                    "topic": topic_text,
+                    "duplicate_of": str(match.topic_id),
+                    "existing_topic": match.topic_text,
+                    "similarity": round(match.similarity, 3),
+                    "merged": on_duplicate == "merge",
+                })
+                if on_duplicate == "merge":
+                    continue
+
+        register_topic(db, brand_id, topic_id, topic_text, sig, duplicate_of=match.topic_id if match else None)
+        staged.add(topic_id, sig, topic_text)
 
         for platform in platforms:
             for ct in content_types:
@@ -83,4 +121,26 @@ def create_topics(payload: dict, db: Session = Depends(get_db)):
                 created += 1
 
     db.commit()
-    return {"content_items_created": created}
+    publish(brand_id, staged)
+    return {"content_items_created": created, "duplicates": duplicates}
+
+
+@router.get("/similar")
+def similar_topics(
+    brand_id: str,
+    text: str,
+    limit: int = Query(5, ge=1, le=50),
+    threshold: Optional[float] = Query(None, ge=0.0, le=1.0),
+    db: Session = Depends(get_db),
+):
+    """
+    Existing topics of the brand that are near-duplicates of `text`.
+    """
+    index = get_index(db, brand_id.strip())
+    matches = index.query(signature(text), THRESHOLD if threshold is None else threshold, limit)
+    return {
+        "items": [
+            {"topic_id": str(m.topic_id), "topic_text": m.topic_text, "similarity": round(m.similarity, 3)}
+            for m in matches
+        ]
+    }
@@ -0,0 +1,47 @@
+"""
+Queues media_derivatives jobs for items that have media but no WebP
+previews yet (see services/media_derivatives.py); the job workers do the work.
+
+Usage:
+  python -m app.scripts.backfill_media_derivatives
+  python -m app.scripts.backfill_media_derivatives --brand-id neuroflow-ai --limit 200
+"""
+import argparse
+
+from sqlalchemy import or_, select
+
+from app.database import SessionLocal
+from app.models.content_item import ContentItem
+from app.services.job_queue import enqueue
+from app.services.media_derivatives import JOB_TYPE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Queue WebP derivative generation for existing media")
+    parser.add_argument("--brand-id", default=None)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        q = (
+            select(ContentItem.id)
+            .where(ContentItem.preview_url.is_(None))
+            .where(or_(ContentItem.media_url.is_not(None), ContentItem.thumbnail_url.is_not(None)))
+            .order_by(ContentItem.updated_at.desc())
+            .limit(args.limit)
+        )
+        if args.brand_id:
+            q = q.where(ContentItem.brand_id == args.brand_id)
+
+        ids = db.execute(q).scalars().all()
+        for item_id in ids:
+            enqueue(db, JOB_TYPE, content_item_id=item_id, commit=False)
+        db.commit()
+        print(f"queued {len(ids)} {JOB_TYPE} jobs")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
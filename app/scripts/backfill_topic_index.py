@@ -0,0 +1,60 @@
+"""
+Fingerprints topics that were ingested before near-duplicate detection existed
+(one row per distinct content_items.topic_id), so they show up in /topics/similar.
+
+Usage:
+  python -m app.scripts.backfill_topic_index
+  python -m app.scripts.backfill_topic_index --brand-id neuroflow-ai
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal
+from app.models.content_item import ContentItem
+from app.models.topic_fingerprint import TopicFingerprint
+from app.services.topic_dedup import pack, signature
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill topic_fingerprints from content_items")
+    parser.add_argument("--brand-id", default=None)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        q = (
+            select(ContentItem.topic_id, ContentItem.brand_id, func.min(ContentItem.title))
+            .where(~ContentItem.topic_id.in_(select(TopicFingerprint.topic_id)))
+            .group_by(ContentItem.topic_id, ContentItem.brand_id)
+        )
+        if args.brand_id:
+            q = q.where(ContentItem.brand_id == args.brand_id)
+
+        added = 0
+        for topic_id, brand_id, title in db.execute(q).all():
+            text = (title or "").strip()
+            if not text:
+                continue
+            db.add(TopicFingerprint(
+                topic_id=topic_id,
+                brand_id=brand_id,
+                topic_text=text[:1000],
+                signature=pack(signature(text)),
+                # stamped now, not with the items' age: running processes top up
+                # their indexes by created_at and would never look that far back
+                created_at=datetime.utcnow(),
+            ))
+            added += 1
+            if added % args.batch_size == 0:
+                db.commit()
+        db.commit()
+        print(f"[topics] fingerprinted {added} topic(s)", flush=True)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
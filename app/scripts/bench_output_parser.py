@@ -0,0 +1,100 @@
+"""
+Microbenchmark: single-pass output_parser vs the old per-label split parser,
+and strip_markdown (precompiled passes) vs the old re.sub calls. Both new
+functions are checked against the old ones first, including nested markup.
+
+Usage:
+  python -m app.scripts.bench_output_parser
+  python -m app.scripts.bench_output_parser --sizes 1,16,256 --repeat 5
+"""
+import argparse
+import re
+import timeit
+
+from app.services.output_parser import parse_output, strip_markdown
+
+_LABELS = ["CAPTION:", "HASHTAGS:", "IMAGE_PROMPT:", "VIDEO_CONCEPT:", "THUMBNAIL_PROMPT:"]
+
+
+def legacy_parse_output(text: str, content_type: str = "text") -> dict:
+    text = (text or "").strip()
+
+    def extract_block(label: str) -> str:
+        marker = f"{label}:"
+        if marker not in text:
+            return ""
+        after = text.split(marker, 1)[1]
+        for nxt in _LABELS:
+            if nxt != marker and nxt in after:
+                after = after.split(nxt, 1)[0]
+        return after.strip()
+
+    out = {"body_text": extract_block("CAPTION"), "hashtags": " ".join(extract_block("HASHTAGS").split())}
+    if content_type == "video":
+        out["media_prompt"] = f"VIDEO_CONCEPT: {extract_block('VIDEO_CONCEPT')}\nTHUMBNAIL_PROMPT: {extract_block('THUMBNAIL_PROMPT')}"
+    return out
+
+
+def legacy_strip_markdown(s: str) -> str:
+    s = re.sub(r"\*\*(.*?)\*\*", r"\1", s)
+    s = re.sub(r"\*(.*?)\*", r"\1", s)
+    s = re.sub(r"`(.*?)`", r"\1", s)
+    return s
+
+
+# nesting and overlap, where a combined single-pass regex would differ
+MD_CASES = [
+    "***Big news***",
+    "**Use `pip`** now",
+    "*a **b** c*",
+    "`**code**`",
+    "**a*b**c*",
+    "*`x`* and **`y`**",
+    "** spaced ** * x * ``",
+    "unclosed **bold and *italic",
+    "****",
+    "a*b`c*d`e",
+]
+
+
+def sample_output(paragraphs: int) -> str:
+    para = "We **ship** faster with *real* automation, not `magic`. Clear hook, value and a CTA.\n"
+    return (
+        "CAPTION:\n" + para * paragraphs
+        + "\nHASHTAGS:\n#ai #automation #growth\n"
+        + "\nVIDEO_CONCEPT:\n" + para * max(1, paragraphs // 4)
+        + "THUMBNAIL_PROMPT:\nA bold thumbnail with the brand colors\n"
+    )
+
+
+def _best(fn, repeat: int, number: int) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the model-output parser")
+    parser.add_argument("--sizes", default="1,8,64,512", help="comma-separated caption sizes in paragraphs")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for case in MD_CASES:
+        assert legacy_strip_markdown(case) == strip_markdown(case), case
+
+    print(f"{'paragraphs':>10} {'bytes':>9} {'parse old us':>13} {'parse new us':>13} {'md old us':>10} {'md new us':>10}")
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        text = sample_output(n)
+        assert legacy_parse_output(text, "video") == parse_output(text, "video")
+        assert legacy_strip_markdown(text) == strip_markdown(text)
+
+        number = max(1, 20000 // (n + 1))
+        print(
+            f"{n:>10} {len(text):>9} "
+            f"{_best(lambda: legacy_parse_output(text, 'video'), args.repeat, number):>13.1f} "
+            f"{_best(lambda: parse_output(text, 'video'), args.repeat, number):>13.1f} "
+            f"{_best(lambda: legacy_strip_markdown(text), args.repeat, number):>10.1f} "
+            f"{_best(lambda: strip_markdown(text), args.repeat, number):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
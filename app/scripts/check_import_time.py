@@ -0,0 +1,59 @@
+"""
+Startup budget check: imports a module in a fresh interpreter with
+`python -X importtime` and fails if the cumulative time is over budget.
+
+Prints the slowest imports so a regression (e.g. a router pulling openai or
+boto3 in at module level again) is easy to spot.
+
+Usage:
+  python -m app.scripts.check_import_time
+  python -m app.scripts.check_import_time --module app.main --budget-ms 1500 --top 15
+"""
+import argparse
+import subprocess
+import sys
+
+
+def import_times(module: str) -> list[tuple[int, int, str]]:
+    """
+    [(self_us, cumulative_us, name)] for every module imported by `import <module>`.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cum_us), name.rstrip()))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing a module exceeds a time budget")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = sum(self_us for self_us, _, _ in rows) / 1000
+
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    for self_us, cum_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>9.1f} {cum_us / 1000:>9.1f}  {name}")
+
+    print(f"\nimport {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    if total_ms > args.budget_ms:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Fails media items still waiting on a Make callback after the callback token
+expired (see routers/media.expire_awaiting_callbacks). The job workers sweep
+on every poll, so this is only needed when no workers are running.
+
+Usage:
+  python -m app.scripts.expire_media_callbacks
+  python -m app.scripts.expire_media_callbacks --ttl-seconds 7200
+"""
+import argparse
+
+from app.database import SessionLocal
+from app.routers.media import MAKE_MEDIA_CALLBACK_TTL_SECONDS, expire_awaiting_callbacks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail media items whose Make callback never arrived")
+    parser.add_argument("--ttl-seconds", type=float, default=MAKE_MEDIA_CALLBACK_TTL_SECONDS)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        n = expire_awaiting_callbacks(db, args.ttl_seconds)
+        db.commit()
+        print(f"[media] expired {n} item(s) awaiting a callback", flush=True)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Deletes content-addressed media objects that no content item uses any more
+(see services/media_index.py).
+
+Usage:
+  python -m app.scripts.gc_media --dry-run
+  python -m app.scripts.gc_media --grace-hours 168
+"""
+import argparse
+
+from app.services.media_index import GC_GRACE_HOURS, gc
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Garbage-collect orphaned media objects")
+    parser.add_argument("--grace-hours", type=float, default=GC_GRACE_HOURS)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="report what would be deleted, change nothing")
+    args = parser.parse_args()
+
+    print(gc(grace_hours=args.grace_hours, batch_size=args.batch_size, dry_run=args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Pool of job-queue worker processes (see app/services/job_queue.py).
+
+Each worker claims one job at a time with SELECT ... FOR UPDATE SKIP LOCKED,
+keeps its lease alive with a heartbeat thread while the handler runs, then
+completes, retries (with backoff) or dead-letters the job. Between jobs it
+also fails media items whose Make callback never arrived.
+
+Usage:
+  python -m app.scripts.run_job_workers --workers 4
+  python -m app.scripts.run_job_workers --workers 2 --types generate_text,generate_media
+"""
+import argparse
+import multiprocessing as mp
+import os
+import signal
+import socket
+
+from app.database import SessionLocal
+from app.routers.media import expire_awaiting_callbacks
+from app.services import job_handlers  # noqa: F401  (registers handlers)
+from app.services.job_queue import claim, keep_alive, reap_expired, run_job
+
+
+def _worker_loop(worker_no: int, job_types: list[str] | None, poll_seconds: float, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_no}"
+
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            reap_expired(db)
+            expire_awaiting_callbacks(db)
+            db.commit()
+            job = claim(db, worker_id, job_types)
+            if job is None:
+                db.close()
+                stop.wait(poll_seconds)
+                continue
+
+            with keep_alive(job.id, worker_id):
+                print(f"[{worker_id}] running {job.job_type} {job.id} (attempt {job.attempts})", flush=True)
+                run_job(db, job, worker_id)
+                print(f"[{worker_id}] {job.job_type} {job.id} -> {job.status}", flush=True)
+        except Exception as e:
+            print(f"[{worker_id}] error: {e}", flush=True)
+            stop.wait(poll_seconds)
+        finally:
+            db.close()
+
+
+def _spawn(worker_no: int, args, stop) -> mp.Process:
+    p = mp.Process(
+        target=_worker_loop,
+        args=(worker_no, args.types, args.poll_seconds, stop),
+        name=f"jobs-{worker_no}",
+        daemon=True,
+    )
+    p.start()
+    return p
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run job-queue workers")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("JOB_WORKERS", "2")))
+    parser.add_argument("--poll-seconds", type=float, default=float(os.getenv("JOB_POLL_SECONDS", "2")))
+    parser.add_argument("--types", type=lambda s: [x.strip() for x in s.split(",") if x.strip()], default=None,
+                        help="comma-separated job types to handle (default: all)")
+    args = parser.parse_args()
+
+    stop = mp.Event()
+
+    def _shutdown(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    workers = {n: _spawn(n, args, stop) for n in range(max(1, args.workers))}
+    print(f"[jobs] started {len(workers)} worker(s)", flush=True)
+
+    while not stop.is_set():
+        for n, p in list(workers.items()):
+            if not p.is_alive():
+                print(f"[jobs] worker {n} exited with {p.exitcode}, restarting", flush=True)
+                workers[n] = _spawn(n, args, stop)
+        stop.wait(1.0)
+
+    # let running jobs finish; their leases expire and get reclaimed if they don't
+    for p in workers.values():
+        p.join(timeout=60)
+        if p.is_alive():
+            p.terminate()
+    print("[jobs] stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Long-running publisher: a supervisor process that keeps N worker processes alive.
+
+Each worker claims due items with SELECT ... FOR UPDATE SKIP LOCKED (see
+publisher_worker.claim_due), so several daemons can run side by side, on one
+host or across pods, without double-publishing. A claim is a lease: if a
+worker dies mid-batch, the next claim_due moves its items back to SCHEDULED
+once PUBLISHER_CLAIM_LEASE_SECONDS has passed.
+
+With --async each worker sends its batch concurrently over one pooled HTTP
+client (publisher_worker.publish_due_async), capped per platform by
+PUBLISHER_CONCURRENCY / PUBLISHER_CONCURRENCY_<PLATFORM>.
+
+With --listen workers stop polling: each keeps a DueScheduler heap of upcoming
+scheduled_at values, fed by Postgres LISTEN/NOTIFY, and sleeps until the next
+item is due. The heap is rebuilt every PUBLISHER_RESCAN_SECONDS as a safety net,
+after releasing stale claims. --listen publishes synchronously and cannot be
+combined with --async.
+
+Usage:
+  python -m app.scripts.run_publisher_daemon --workers 4 --batch-size 20 --poll-seconds 10
+  python -m app.scripts.run_publisher_daemon --workers 2 --batch-size 200 --async
+  python -m app.scripts.run_publisher_daemon --workers 2 --listen
+"""
+import argparse
+import asyncio
+import multiprocessing as mp
+import os
+import signal
+import time
+
+from app.database import SessionLocal
+from app.services.buffer_client import close_async_client
+from app.services.due_scheduler import DueScheduler
+from app.services.publisher_worker import publish_due, publish_due_async, release_stale_claims
+
+
+def _worker_loop(worker_no: int, batch_size: int, poll_seconds: float, stop):
+    # the supervisor handles Ctrl+C; workers exit via the stop event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    while not stop.is_set():
+        db = SessionLocal()
+        try:
+            res = publish_due(db, limit=batch_size)
+        except Exception as e:
+            print(f"[publisher-{worker_no}] error: {e}", flush=True)
+            res = {"due": 0}
+        finally:
+            db.close()
+
+        if res.get("due"):
+            print(f"[publisher-{worker_no}] {res}", flush=True)
+            # a full batch usually means more is waiting, go again right away
+            if res["due"] >= batch_size:
+                continue
+
+        stop.wait(poll_seconds)
+
+
+async def _async_worker_loop(worker_no: int, batch_size: int, poll_seconds: float, stop):
+    # one event loop per worker so the pooled Buffer client survives across batches
+    try:
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                res = await publish_due_async(db, limit=batch_size)
+            except Exception as e:
+                print(f"[publisher-{worker_no}] error: {e}", flush=True)
+                res = {"due": 0}
+            finally:
+                db.close()
+
+            if res.get("due"):
+                print(f"[publisher-{worker_no}] {res}", flush=True)
+                if res["due"] >= batch_size:
+                    continue
+
+            await asyncio.to_thread(stop.wait, poll_seconds)
+    finally:
+        await close_async_client()
+
+
+def _run_async_worker(worker_no: int, batch_size: int, poll_seconds: float, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_async_worker_loop(worker_no, batch_size, poll_seconds, stop))
+
+
+def _listen_worker_loop(worker_no: int, batch_size: int, rescan_seconds: float, stop):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    sched = DueScheduler()
+    sched.listen()
+    next_rescan = 0.0
+
+    try:
+        while not stop.is_set():
+            if time.monotonic() >= next_rescan:
+                db = SessionLocal()
+                try:
+                    # the heap only sees SCHEDULED rows, so put dead workers' claims back first
+                    release_stale_claims(db)
+                    db.commit()
+                    sched.load(db)
+                finally:
+                    db.close()
+                next_rescan = time.monotonic() + rescan_seconds
+
+            if sched.pop_due():
+                # drain everything that is due right now, a batch at a time
+                while not stop.is_set():
+                    db = SessionLocal()
+                    try:
+                        res = publish_due(db, limit=batch_size)
+                    except Exception as e:
+                        print(f"[publisher-{worker_no}] error: {e}", flush=True)
+                        res = {"due": 0}
+                    finally:
+                        db.close()
+                    if res.get("due"):
+                        print(f"[publisher-{worker_no}] {res}", flush=True)
+                    if res.get("due", 0) < batch_size:
+                        break
+                continue
+
+            # sleep until the next item is due, a NOTIFY arrives, or the rescan;
+            # cap it so the stop event is still checked every few seconds
+            timeout = next_rescan - time.monotonic()
+            until_next = sched.seconds_until_next()
+            if until_next is not None:
+                timeout = min(timeout, until_next)
+            sched.wait(max(0.0, min(timeout, 5.0)))
+    finally:
+        sched.close()
+
+
+def _spawn(worker_no: int, args, stop) -> mp.Process:
+    if args.listen:
+        target, extra = _listen_worker_loop, args.rescan_seconds
+    elif args.use_async:
+        target, extra = _run_async_worker, args.poll_seconds
+    else:
+        target, extra = _worker_loop, args.poll_seconds
+
+    p = mp.Process(
+        target=target,
+        args=(worker_no, args.batch_size, extra, stop),
+        name=f"publisher-{worker_no}",
+        daemon=True,
+    )
+    p.start()
+    return p
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Buffer publisher as a supervised multi-worker daemon")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PUBLISHER_WORKERS", "2")))
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("PUBLISHER_BATCH_SIZE", "20")))
+    parser.add_argument("--poll-seconds", type=float, default=float(os.getenv("PUBLISHER_POLL_SECONDS", "10")))
+    parser.add_argument("--async", dest="use_async", action="store_true", help="send each batch concurrently")
+    parser.add_argument("--listen", action="store_true", help="wake on LISTEN/NOTIFY + due times instead of polling")
+    parser.add_argument("--rescan-seconds", type=float, default=float(os.getenv("PUBLISHER_RESCAN_SECONDS", "300")))
+    args = parser.parse_args()
+    if args.listen and args.use_async:
+        parser.error("--listen cannot be combined with --async")
+
+    stop = mp.Event()
+
+    def _shutdown(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+
+    workers = {n: _spawn(n, args, stop) for n in range(max(1, args.workers))}
+    print(f"[publisher] started {len(workers)} worker(s)", flush=True)
+
+    # supervise: restart any worker that dies until we are asked to stop
+    while not stop.is_set():
+        for n, p in list(workers.items()):
+            if not p.is_alive():
+                print(f"[publisher] worker {n} exited with {p.exitcode}, restarting", flush=True)
+                workers[n] = _spawn(n, args, stop)
+        stop.wait(1.0)
+
+    for p in workers.values():
+        p.join(timeout=30)
+        if p.is_alive():
+            p.terminate()
+    print("[publisher] stopped", flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,119 +1,228 @@
+from __future__ import annotations
+
 import os
-import json
-from typing import Dict, Any, Optional
+import re
+import time
+from typing import TYPE_CHECKING, Dict, Any, Optional
+
+from app.services import llm_cache, llm_metrics, prompt_templates
+from app.services.clients import openai_client
+from app.services.output_parser import parse_output
+from app.services.rate_limiter import acquire, acquire_async
 
-from openai import OpenAI
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
 
-def _safe_list(x):
-    if not x:
-        return []
-    if isinstance(x, list):
-        return x
-    return [x]
+def __getattr__(name: str):
+    # `client` used to be built at import; keep it importable, but lazy
+    if name == "client":
+        return openai_client()
+    raise AttributeError(name)
+
+
+def new_async_client() -> AsyncOpenAI:
+    """
+    AsyncOpenAI pools connections per event loop, so batch runners create one
+    per run (async with new_async_client() as aclient) and pass it down.
+    """
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 
 def _brand_context_block(
     brand_id: str,
     brand_profile_summary: Optional[str] = None,
     brand_profile_json: Optional[dict[str, Any]] = None,
+    prompt_version: Optional[str] = None,
 ) -> str:
     """
     Turn scraped profile into a short, usable prompt block.
     Keep it concise, otherwise the model will ramble.
+    Memoized per brand-profile hash (see prompt_templates).
+    """
+    return prompt_templates.brand_context_block(brand_id, brand_profile_summary, brand_profile_json, prompt_version)
+
+
+def build_instructions(platform: str, brand_id: str, content_type: str, prompt_version: Optional[str] = None) -> str:
+    return prompt_templates.instructions_for(platform, brand_id, content_type, prompt_version)
+
+
+def build_prompt(
+    topic_text: str,
+    platform: str,
+    brand_id: str,
+    content_type: str = "text",
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+    prompt_version: Optional[str] = None,
+) -> tuple[str, str]:
+    """
+    Returns (instructions, user_input) for one post.
+    """
+    instructions = build_instructions(platform, brand_id, content_type, prompt_version)
+    brand_ctx = _brand_context_block(brand_id, brand_profile_summary, brand_profile_json, prompt_version)
+
+    # ✅ Ask for a strict, parseable output (prevents messy splits)
+    # We return as labeled blocks.
+    tpl = prompt_templates.get_template(prompt_version)
+    user_input = tpl.user_input.format(brand_ctx=brand_ctx, topic_text=topic_text).strip()
+
+    return instructions, user_input
+
+
+_VARIANT_RE = re.compile(r"^=+\s*VARIANT:\s*([\w-]+)\s*/\s*(text|image|video)\s*=+\s*$", re.MULTILINE | re.IGNORECASE)
+
+
+def build_topic_prompt(
+    topic_text: str,
+    brand_id: str,
+    variants: list[tuple[str, str]],
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+    prompt_version: Optional[str] = None,
+) -> tuple[str, str]:
+    """
+    One prompt for every (platform, content_type) variant of a topic, so the
+    brand context block is sent once instead of once per sibling item.
+    """
+    instructions = prompt_templates.topic_instructions_for(brand_id, tuple(variants), prompt_version)
+    brand_ctx = _brand_context_block(brand_id, brand_profile_summary, brand_profile_json, prompt_version)
+
+    tpl = prompt_templates.get_template(prompt_version)
+    user_input = tpl.topic_user_input.format(
+        brand_ctx=brand_ctx,
+        topic_text=topic_text,
+        sections=prompt_templates.topic_sections(variants, prompt_version),
+    ).strip()
+
+    return instructions, user_input
+
+
+def parse_topic_output(text: str, variants: list[tuple[str, str]]) -> Dict[tuple[str, str], Dict[str, str]]:
+    """
+    Splits a build_topic_prompt() response into {(platform, content_type): parse_output(...)}.
+    Variants the model left out are missing from the result.
     """
-    tone_tags = []
-    services = []
-    audiences = []
-    positioning = []
-    cta_style = None
-    colors = []
-
-    if isinstance(brand_profile_json, dict):
-        tone_tags = _safe_list((brand_profile_json.get("tone") or {}).get("tags"))
-        services = _safe_list(brand_profile_json.get("products_services"))
-        audiences = _safe_list(brand_profile_json.get("audiences"))
-        positioning = _safe_list((brand_profile_json.get("positioning") or {}).get("value_props"))
-        cta_style = brand_profile_json.get("cta_style")
-        colors = _safe_list(brand_profile_json.get("colors"))
-
-    # Keep it short but strong
-    block = f"""
-BRAND CONTEXT (use this to avoid generic writing):
-Brand: {brand_id}
-
-Brand summary:
-{brand_profile_summary or "(No summary provided)"}
-
-Tone tags: {", ".join([str(x) for x in tone_tags]) if tone_tags else "(not provided)"}
-Target audiences: {", ".join([str(x) for x in audiences]) if audiences else "(not provided)"}
-Products/Services: {", ".join([str(x) for x in services]) if services else "(not provided)"}
-Positioning / Value props: {", ".join([str(x) for x in positioning]) if positioning else "(not provided)"}
-CTA style/examples: {json.dumps(cta_style, ensure_ascii=False) if cta_style else "(not provided)"}
-Brand colors: {", ".join([str(x) for x in colors]) if colors else "(not provided)"}
-""".strip()
-
-    return block
-
-
-def build_instructions(platform: str, brand_id: str, content_type: str) -> str:
-    base = f"""
-You are a senior social media copywriter for {brand_id}.
-Write ORIGINAL, non-generic marketing content based on the topic and brand context.
-No fluff. Clear hook + value + CTA.
-Avoid vague claims. Be concrete.
-""".strip()
-
-    # Platform style
-    if platform == "linkedin":
-        style = """
-LinkedIn style:
-- professional, insight-driven
-- 120–220 words
-- include 3–5 bullet points if helpful
-- no hashtags OR max 3 hashtags at the end
-""".strip()
-    elif platform in ("facebook", "instagram"):
-        style = """
-Facebook/Instagram style:
-- punchy, short-form
-- 60–150 words
-- strong first line hook
-- include 5–12 relevant hashtags at the end (not spam)
-""".strip()
-    else:
-        style = "Generic social style. Keep it clear and direct."
-
-    # Content-type specific behavior
-    if content_type == "text":
-        ctype = """
-Content type: TEXT
-Return a caption and hashtags only.
-""".strip()
-    elif content_type == "image":
-        ctype = """
-Content type: IMAGE
-Return:
-1) caption
-2) hashtags
-3) IMAGE_PROMPT (a single detailed prompt for generating the image that matches the caption + brand style)
-""".strip()
-    elif content_type == "video":
-        ctype = """
-Content type: VIDEO
-Return:
-1) caption
-2) hashtags
-3) VIDEO_CONCEPT (short concept: scene + camera + on-screen text + duration)
-4) THUMBNAIL_PROMPT (prompt for a thumbnail image)
-""".strip()
-    else:
-        ctype = "Return caption and hashtags."
-
-    return "\n\n".join([base, style, ctype]).strip()
+    text = text or ""
+    wanted = set(variants)
+    matches = list(_VARIANT_RE.finditer(text))
+
+    out: Dict[tuple[str, str], Dict[str, str]] = {}
+    for i, m in enumerate(matches):
+        key = (m.group(1).lower(), m.group(2).lower())
+        if key not in wanted or key in out:
+            continue
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        parsed = parse_output(text[m.end():end], key[1])
+        if parsed.get("body_text"):
+            out[key] = parsed
+    return out
+
+
+def _complete(
+    instructions: str,
+    user_input: str,
+    *,
+    use_cache: bool,
+    store: bool = True,
+    prompt_version: Optional[str] = None,
+    **tags: Any,
+) -> tuple[str, str, bool]:
+    """
+    One Responses call behind the result cache, the rate limiter and the metrics log.
+    tags: call_type, brand_id, platform, content_type.
+    Returns (output_text, cache_key, from_cache).
+    """
+    version = prompt_templates.get_template(prompt_version).version
+    tags["prompt_version"] = version
+    # the raw output is cached, so parser changes apply to cached results too
+    key = llm_cache.fingerprint(instructions, user_input, MODEL, version)
+    started = time.perf_counter()
+
+    output_text = llm_cache.get(key) if use_cache else None
+    if output_text is not None:
+        llm_metrics.record(model=MODEL, latency_ms=(time.perf_counter() - started) * 1000, cache_hit=True, **tags)
+        return output_text, key, True
+
+    acquire("openai")
+    started = time.perf_counter()
+    try:
+        resp = openai_client().responses.create(
+            model=MODEL,
+            instructions=instructions,
+            input=user_input,
+        )
+    except Exception:
+        llm_metrics.record(model=MODEL, latency_ms=(time.perf_counter() - started) * 1000, ok=False, **tags)
+        raise
+
+    input_tokens, output_tokens = llm_metrics.usage_of(resp)
+    llm_metrics.record(
+        model=MODEL,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        **tags,
+    )
+
+    output_text = resp.output_text or ""
+    if store:
+        llm_cache.put(key, MODEL, output_text)
+    return output_text, key, False
+
+
+async def _complete_async(
+    instructions: str,
+    user_input: str,
+    *,
+    aclient: AsyncOpenAI,
+    use_cache: bool,
+    store: bool = True,
+    prompt_version: Optional[str] = None,
+    **tags: Any,
+) -> tuple[str, str, bool]:
+    """
+    Async twin of _complete().
+    """
+    version = prompt_templates.get_template(prompt_version).version
+    tags["prompt_version"] = version
+    key = llm_cache.fingerprint(instructions, user_input, MODEL, version)
+    started = time.perf_counter()
+
+    output_text = await llm_cache.get_async(key) if use_cache else None
+    if output_text is not None:
+        llm_metrics.record(model=MODEL, latency_ms=(time.perf_counter() - started) * 1000, cache_hit=True, **tags)
+        return output_text, key, True
+
+    await acquire_async("openai")
+    started = time.perf_counter()
+    try:
+        resp = await aclient.responses.create(
+            model=MODEL,
+            instructions=instructions,
+            input=user_input,
+        )
+    except Exception:
+        llm_metrics.record(model=MODEL, latency_ms=(time.perf_counter() - started) * 1000, ok=False, **tags)
+        raise
+
+    input_tokens, output_tokens = llm_metrics.usage_of(resp)
+    llm_metrics.record(
+        model=MODEL,
+        latency_ms=(time.perf_counter() - started) * 1000,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        **tags,
+    )
+
+    output_text = resp.output_text or ""
+    if store:
+        await llm_cache.put_async(key, MODEL, output_text)
+    return output_text, key, False
 
 
 def generate_post(
@@ -123,6 +232,8 @@ def generate_post(
     content_type: str = "text",
     brand_profile_summary: Optional[str] = None,
     brand_profile_json: Optional[dict[str, Any]] = None,
+    use_cache: bool = True,
+    prompt_version: Optional[str] = None,
 ) -> Dict[str, str]:
     """
     Returns:
@@ -131,74 +242,89 @@ def generate_post(
         "hashtags": "...",
         "media_prompt": "...optional..."
       }
+    use_cache=False skips the result cache lookup (the fresh output is still stored).
     """
-    instructions = build_instructions(platform, brand_id, content_type)
-    brand_ctx = _brand_context_block(brand_id, brand_profile_summary, brand_profile_json)
-
-    # ✅ Ask for a strict, parseable output (prevents messy splits)
-    # We return as labeled blocks.
-    user_input = f"""
-{brand_ctx}
+    instructions, user_input = build_prompt(
+        topic_text, platform, brand_id, content_type, brand_profile_summary, brand_profile_json, prompt_version
+    )
 
-TOPIC:
-{topic_text}
+    output_text, _, _ = _complete(
+        instructions,
+        user_input,
+        use_cache=use_cache,
+        prompt_version=prompt_version,
+        call_type="post",
+        brand_id=brand_id,
+        platform=platform,
+        content_type=content_type,
+    )
+    return parse_output(output_text, content_type)
 
-OUTPUT FORMAT (MUST FOLLOW EXACTLY):
-CAPTION:
-<caption text>
 
-HASHTAGS:
-<hashtags line, either empty or starting with #>
+async def generate_post_async(
+    topic_text: str,
+    platform: str,
+    brand_id: str,
+    content_type: str = "text",
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+    *,
+    aclient: AsyncOpenAI,
+    use_cache: bool = True,
+    prompt_version: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Async twin of generate_post(); aclient comes from new_async_client().
+    """
+    instructions, user_input = build_prompt(
+        topic_text, platform, brand_id, content_type, brand_profile_summary, brand_profile_json, prompt_version
+    )
 
-IF IMAGE, ALSO INCLUDE:
-IMAGE_PROMPT:
-<prompt>
+    output_text, _, _ = await _complete_async(
+        instructions,
+        user_input,
+        aclient=aclient,
+        use_cache=use_cache,
+        prompt_version=prompt_version,
+        call_type="post",
+        brand_id=brand_id,
+        platform=platform,
+        content_type=content_type,
+    )
+    return parse_output(output_text, content_type)
 
-IF VIDEO, ALSO INCLUDE:
-VIDEO_CONCEPT:
-<concept>
-THUMBNAIL_PROMPT:
-<prompt>
-""".strip()
 
-    resp = client.responses.create(
-        model=MODEL,
-        instructions=instructions,
-        input=user_input,
+async def generate_topic_posts_async(
+    topic_text: str,
+    brand_id: str,
+    variants: list[tuple[str, str]],
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+    *,
+    aclient: AsyncOpenAI,
+    use_cache: bool = True,
+    prompt_version: Optional[str] = None,
+) -> Dict[tuple[str, str], Dict[str, str]]:
+    """
+    One model call for all (platform, content_type) variants of a topic.
+    Returns {(platform, content_type): {"body_text", "hashtags", "media_prompt"?}}.
+    """
+    instructions, user_input = build_topic_prompt(
+        topic_text, brand_id, variants, brand_profile_summary, brand_profile_json, prompt_version
     )
 
-    text = (resp.output_text or "").strip()
-
-    # ✅ Parse labeled blocks robustly
-    def extract_block(label: str) -> str:
-        marker = f"{label}:"
-        if marker not in text:
-            return ""
-        after = text.split(marker, 1)[1]
-        # stop at next known label
-        for nxt in ["CAPTION:", "HASHTAGS:", "IMAGE_PROMPT:", "VIDEO_CONCEPT:", "THUMBNAIL_PROMPT:"]:
-            if nxt != marker and nxt in after:
-                after = after.split(nxt, 1)[0]
-        return after.strip()
-
-    caption = extract_block("CAPTION")
-    hashtags = extract_block("HASHTAGS")
-
-    media_prompt = ""
-    if content_type == "image":
-        media_prompt = extract_block("IMAGE_PROMPT")
-    elif content_type == "video":
-        concept = extract_block("VIDEO_CONCEPT")
-        thumb = extract_block("THUMBNAIL_PROMPT")
-        # keep as one field for now (frontend can display later)
-        media_prompt = f"VIDEO_CONCEPT: {concept}\nTHUMBNAIL_PROMPT: {thumb}".strip()
-
-    # Final cleanup
-    caption = caption.strip()
-    hashtags = " ".join([h.strip() for h in hashtags.split() if h.strip()]).strip()
-
-    out: Dict[str, str] = {"body_text": caption, "hashtags": hashtags}
-    if media_prompt:
-        out["media_prompt"] = media_prompt
-
-    return out
+    output_text, key, cached = await _complete_async(
+        instructions,
+        user_input,
+        aclient=aclient,
+        use_cache=use_cache,
+        store=False,
+        prompt_version=prompt_version,
+        call_type="topic_posts",
+        brand_id=brand_id,
+    )
+    results = parse_topic_output(output_text, variants)
+    # a partial answer is not worth replaying from the cache
+    if not cached and len(results) == len(set(variants)):
+        await llm_cache.put_async(key, MODEL, output_text)
+    return results
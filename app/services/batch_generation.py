@@ -0,0 +1,358 @@
+"""
+Offline draft generation through a provider batch API.
+
+submit_batch() writes one request per TOPIC_INGESTED item to a JSONL file,
+hands it to a BatchProvider and records a "generate_text_offline" job. Job
+workers poll that job (RetryLater until the provider is done) and then apply
+every result to its ContentItem in a single transaction.
+
+Providers:
+  openai -> OpenAI Batch API (/v1/responses, 24h completion window)
+  local  -> files under BATCH_DIR; results are read from <batch_id>.output.jsonl
+            once something (a test, a script) writes them
+"""
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.content_item import ContentItem
+from app.models.job import Job
+from app.services import llm_cache, llm_metrics, prompt_templates
+from app.services.ai_generator import MODEL, build_prompt, parse_output
+from app.services.clients import openai_client
+from app.services.draft_generation import compose_body_text, normalize_content_type
+from app.services.job_queue import enqueue
+from app.services.state_machine import ensure_transition
+
+BATCH_DIR = Path(os.getenv("BATCH_DIR", "tmp_batches"))
+BATCH_PROVIDER = os.getenv("BATCH_PROVIDER", "openai").strip().lower()
+POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "300"))
+JOB_TYPE = "generate_text_offline"
+
+
+class BatchProvider(ABC):
+    """
+    Minimal batch API surface. status() returns one of
+    "in_progress" | "completed" | "failed".
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def submit(self, input_path: Path) -> str:
+        """
+        Hands the input file to the provider; it is deleted once this returns.
+        """
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        ...
+
+    @abstractmethod
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        """
+        {custom_id: {"output_text": str} or {"error": str}}
+        """
+
+    def cleanup(self, batch_id: str) -> None:
+        """
+        Drops provider-side files once the batch's results are applied. Best effort.
+        """
+
+
+def _response_text(body: dict[str, Any]) -> str:
+    # Responses API object: output[] -> message -> content[] -> output_text
+    if body.get("output_text"):
+        return body["output_text"]
+    parts = []
+    for out in body.get("output") or []:
+        for c in out.get("content") or []:
+            if c.get("type") == "output_text" and c.get("text"):
+                parts.append(c["text"])
+    return "".join(parts)
+
+
+def _parse_result_lines(lines) -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        row = json.loads(line)
+        cid = row.get("custom_id")
+        if not cid:
+            continue
+        resp = row.get("response") or {}
+        if row.get("error") or (resp.get("status_code") or 200) >= 400:
+            err = row.get("error") or (resp.get("body") or {}).get("error") or f"status {resp.get('status_code')}"
+            out[cid] = {"error": json.dumps(err) if not isinstance(err, str) else err}
+        else:
+            body = resp.get("body") or {}
+            out[cid] = {"output_text": _response_text(body), "usage": body.get("usage")}
+    return out
+
+
+class OpenAIBatchProvider(BatchProvider):
+    name = "openai"
+
+    def __init__(self, client=None):
+        self.client = client or openai_client()
+
+    def submit(self, input_path: Path) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        st = self.client.batches.retrieve(batch_id).status
+        if st == "completed":
+            return "completed"
+        if st in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "in_progress"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        out: dict[str, dict[str, Any]] = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                out.update(_parse_result_lines(self.client.files.content(file_id).text.splitlines()))
+        return out
+
+    def cleanup(self, batch_id: str) -> None:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.input_file_id, batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            try:
+                self.client.files.delete(file_id)
+            except Exception as e:
+                print(f"[batch_generation] could not delete {file_id} of {batch_id}: {e}")
+
+
+class LocalFileBatchProvider(BatchProvider):
+    """
+    File-based stand-in: the input is copied to BATCH_DIR/<batch_id>.input.jsonl and
+    the batch completes when BATCH_DIR/<batch_id>.output.jsonl exists (same line
+    format as the OpenAI batch output).
+    """
+
+    name = "local"
+
+    def __init__(self, root: Path = BATCH_DIR):
+        self.root = Path(root)
+
+    def _path(self, batch_id: str, kind: str) -> Path:
+        return self.root / f"{batch_id}.{kind}.jsonl"
+
+    def submit(self, input_path: Path) -> str:
+        self.root.mkdir(parents=True, exist_ok=True)
+        batch_id = f"local_{uuid.uuid4().hex}"
+        self._path(batch_id, "input").write_bytes(Path(input_path).read_bytes())
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        if self._path(batch_id, "failed").exists():
+            return "failed"
+        return "completed" if self._path(batch_id, "output").exists() else "in_progress"
+
+    def results(self, batch_id: str) -> dict[str, dict[str, Any]]:
+        with open(self._path(batch_id, "output"), encoding="utf-8") as f:
+            return _parse_result_lines(f)
+
+    def cleanup(self, batch_id: str) -> None:
+        for kind in ("input", "output", "failed"):
+            self._path(batch_id, kind).unlink(missing_ok=True)
+
+
+PROVIDERS = {
+    "openai": OpenAIBatchProvider,
+    "local": LocalFileBatchProvider,
+}
+
+
+def get_provider(name: Optional[str] = None) -> BatchProvider:
+    name = (name or BATCH_PROVIDER).strip().lower()
+    cls = PROVIDERS.get(name)
+    if cls is None:
+        raise ValueError(f"Unknown batch provider: {name}")
+    return cls()
+
+
+def submit_batch(
+    db: Session,
+    items: list[ContentItem],
+    *,
+    brand_id: str,
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[Any] = None,
+    provider: Optional[str] = None,
+) -> Optional[Job]:
+    """
+    Moves items to GENERATING, submits one batch for all of them and returns the
+    polling job (None if no item was eligible).
+    """
+    prov = get_provider(provider)
+    prompt_version = prompt_templates.get_template().version
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    input_path = BATCH_DIR / f"{uuid.uuid4().hex}.jsonl"
+
+    now = datetime.utcnow()
+    item_ids: list[str] = []
+    with open(input_path, "w", encoding="utf-8") as f:
+        for it in items:
+            ct = normalize_content_type(it.content_type) or "text"
+            try:
+                ensure_transition(it.status, "GENERATING")
+            except Exception:
+                continue
+
+            instructions, user_input = build_prompt(
+                (it.title or "").strip() or "Untitled topic",
+                it.platform,
+                brand_id,
+                ct,
+                brand_profile_summary,
+                brand_profile_json,
+                prompt_version,
+            )
+            f.write(json.dumps({
+                "custom_id": str(it.id),
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": {"model": MODEL, "instructions": instructions, "input": user_input},
+            }, ensure_ascii=False) + "\n")
+
+            it.status = "GENERATING"
+            it.updated_at = now
+            it.last_error = None
+            item_ids.append(str(it.id))
+
+    if not item_ids:
+        db.rollback()
+        input_path.unlink(missing_ok=True)
+        return None
+
+    # nothing is committed until the provider has accepted the batch
+    try:
+        batch_id = prov.submit(input_path)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        # the provider has its own copy now (or never will)
+        input_path.unlink(missing_ok=True)
+
+    job = enqueue(
+        db,
+        JOB_TYPE,
+        payload={
+            "provider": prov.name,
+            "batch_id": batch_id,
+            "content_item_ids": item_ids,
+            "brand_id": brand_id,
+            "brand_profile_summary": brand_profile_summary,
+            "brand_profile_json": brand_profile_json,
+            "prompt_version": prompt_version,
+        },
+        run_after=now,
+        commit=False,
+    )
+    job.result = {"batch_id": batch_id, "total": len(item_ids), "state": "in_progress"}
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def apply_batch_results(db: Session, job: Job, results: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """
+    Applies provider results to the job's items in one transaction.
+    Items that left GENERATING in the meantime are left alone.
+    """
+    p = job.payload or {}
+    ids = [uuid.UUID(x) for x in p.get("content_item_ids") or []]
+    items = db.execute(select(ContentItem).where(ContentItem.id.in_(ids))).scalars().all()
+    prompt_version = prompt_templates.get_template(p.get("prompt_version")).version
+
+    now = datetime.utcnow()
+    generated = failed = skipped = 0
+    for it in items:
+        if it.status != "GENERATING":
+            skipped += 1
+            continue
+
+        ct = normalize_content_type(it.content_type) or "text"
+        res = results.get(str(it.id)) or {"error": "No result returned by batch"}
+        output_text = res.get("output_text") or ""
+        parsed = parse_output(output_text, ct) if output_text else {}
+
+        # no per-call latency for batch requests; tokens come from the output file
+        input_tokens, output_tokens = llm_metrics.usage_of(res)
+        llm_metrics.record(
+            "batch",
+            MODEL,
+            brand_id=it.brand_id,
+            platform=it.platform,
+            content_type=ct,
+            prompt_version=prompt_version,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            ok="error" not in res,
+        )
+
+        if parsed.get("body_text"):
+            caption, hashtags = compose_body_text(ct, parsed)
+            it.body_text = caption
+            it.hashtags = hashtags or None
+            it.status = "PENDING_APPROVAL"
+            it.last_error = None
+            generated += 1
+
+            instructions, user_input = build_prompt(
+                (it.title or "").strip() or "Untitled topic",
+                it.platform,
+                p.get("brand_id"),
+                ct,
+                p.get("brand_profile_summary"),
+                p.get("brand_profile_json"),
+                prompt_version,
+            )
+            llm_cache.put(llm_cache.fingerprint(instructions, user_input, MODEL, prompt_version), MODEL, output_text)
+        else:
+            it.status = "FAILED"
+            it.last_error = res.get("error") or "Empty batch output"
+            failed += 1
+        it.updated_at = now
+
+    db.commit()
+    llm_metrics.flush()
+    return {"generated": generated, "failed": failed, "skipped": skipped}
+
+
+def fail_batch_items(db: Session, job: Job, error: str) -> int:
+    p = job.payload or {}
+    ids = [uuid.UUID(x) for x in p.get("content_item_ids") or []]
+    items = db.execute(
+        select(ContentItem).where(ContentItem.id.in_(ids), ContentItem.status == "GENERATING")
+    ).scalars().all()
+    now = datetime.utcnow()
+    for it in items:
+        it.status = "FAILED"
+        it.last_error = error
+        it.updated_at = now
+    db.commit()
+    return len(items)
@@ -2,16 +2,24 @@ from __future__ import annotations
 
 import json
 import os
+import time
 from typing import Any
 
-from openai import OpenAI
+from app.services import llm_metrics
+from app.services.clients import openai_client
+from app.services.rate_limiter import acquire
 
 
-def build_brand_profile(raw_text: str, colors: list[str] | None, website_url: str) -> dict[str, Any]:
+def build_brand_profile(
+    raw_text: str,
+    colors: list[str] | None,
+    website_url: str,
+    brand_id: str | None = None,
+) -> dict[str, Any]:
     """
     Returns a structured JSON profile.
     """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY", "").strip())
+    client = openai_client()
     model = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
 
     schema_hint = {
@@ -62,10 +70,27 @@ SCRAPE TEXT:
 {raw_text[:120000]}
 """
 
-    r = client.responses.create(
-        model=model,
-        input=prompt,
-        temperature=0.4,
+    acquire("openai")
+    started = time.perf_counter()
+    try:
+        r = client.responses.create(
+            model=model,
+            input=prompt,
+            temperature=0.4,
+        )
+    except Exception:
+        llm_metrics.record("brand_profile", model, brand_id=brand_id,
+                           latency_ms=(time.perf_counter() - started) * 1000, ok=False)
+        raise
+
+    input_tokens, output_tokens = llm_metrics.usage_of(r)
+    llm_metrics.record(
+        "brand_profile",
+        model,
+        brand_id=brand_id,
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        latency_ms=(time.perf_counter() - started) * 1000,
     )
 
     text = (r.output_text or "").strip()
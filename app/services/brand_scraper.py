@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import os
 import re
-from dataclasses import dataclass
-from typing import Any
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
 from urllib.parse import urljoin, urlparse
 
 import httpx
@@ -13,12 +17,21 @@ from readability import Document
 
 HEX_RE = re.compile(r"#[0-9a-fA-F]{3,8}\b")
 
+# pages are fetched concurrently, at most this many at once per host
+PER_HOST_CONCURRENCY = int(os.getenv("SCRAPE_PER_HOST_CONCURRENCY", "4"))
+# whole-scrape budget; pages still in flight are dropped and the rest returned
+DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "30"))
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+HTTP2 = importlib.util.find_spec("h2") is not None
+
 
 @dataclass
 class ScrapeResult:
     pages: list[str]
     raw_text: str
     colors: list[str]
+    fetched: list[str] = field(default_factory=list)
+    timed_out: bool = False
 
 
 def _normalize_url(u: str) -> str:
@@ -83,42 +96,84 @@ def _extract_colors(html: str) -> list[str]:
     return out[:20]
 
 
-async def scrape_brand_site(website_url: str, timeout_s: float = 20.0) -> ScrapeResult:
+def _parse_page(html: str) -> tuple[str, list[str]]:
+    # CPU-bound (readability + lxml); runs on a worker thread so fetches keep flowing
+    return _extract_readable_text(html), _extract_colors(html)
+
+
+async def scrape_brand_site(
+    website_url: str,
+    timeout_s: float = 20.0,
+    deadline_s: Optional[float] = None,
+) -> ScrapeResult:
+    """
+    Fetches the key pages concurrently (PER_HOST_CONCURRENCY per host, HTTP/2
+    when available) and returns whatever finished within deadline_s
+    (default SCRAPE_DEADLINE_SECONDS), so a profile takes about as long as
+    the slowest page rather than the sum of all of them.
+    """
     base = _normalize_url(website_url)
     if not base:
         raise ValueError("website_url is empty")
 
     pages = _pick_key_pages(base)
-
-    texts: list[str] = []
-    all_colors: set[str] = set()
+    deadline_s = DEADLINE_SECONDS if deadline_s is None else deadline_s
+    started = time.monotonic()
 
     headers = {
         "User-Agent": "NeuroflowMarketingBot/1.0 (brand profiling; contact: support@yourdomain.com)"
     }
-
-    async with httpx.AsyncClient(timeout=timeout_s, follow_redirects=True, headers=headers) as client:
-        for url in pages:
-            # avoid offsite redirects causing noise
-            try:
+    host_limits: dict[str, asyncio.Semaphore] = {}
+
+    async def _fetch(client: httpx.AsyncClient, url: str) -> Optional[tuple[str, str, list[str]]]:
+        host = urlparse(url).netloc
+        sem = host_limits.setdefault(host, asyncio.Semaphore(max(1, PER_HOST_CONCURRENCY)))
+        # avoid offsite redirects causing noise
+        try:
+            async with sem:
                 r = await client.get(url)
-                final_url = str(r.url)
-                if not _same_site(base, final_url):
-                    continue
-                html = r.text or ""
-            except Exception:
-                continue
-
-            txt = _extract_readable_text(html)
-            if txt:
-                texts.append(f"URL: {final_url}\n{txt}")
-
-            for c in _extract_colors(html):
-                all_colors.add(c)
+            final_url = str(r.url)
+            if not _same_site(base, final_url):
+                return None
+            html = r.text or ""
+        except Exception:
+            return None
+
+        txt, colors = await asyncio.to_thread(_parse_page, html)
+        return final_url, txt, colors
+
+    limits = httpx.Limits(max_connections=len(pages), max_keepalive_connections=len(pages))
+    async with httpx.AsyncClient(
+        timeout=timeout_s, follow_redirects=True, headers=headers, http2=HTTP2, limits=limits,
+    ) as client:
+        tasks = [asyncio.create_task(_fetch(client, url)) for url in pages]
+        _, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline_s - (time.monotonic() - started)))
+        for t in pending:
+            t.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    # keep candidate-page order so the profile text reads home -> about -> ...
+    texts: list[str] = []
+    fetched: list[str] = []
+    all_colors: set[str] = set()
+    for t in tasks:
+        if t.cancelled() or t.exception() is not None or t.result() is None:
+            continue
+        final_url, txt, colors = t.result()
+        if final_url in fetched:
+            # e.g. /service redirecting to /services
+            continue
+        fetched.append(final_url)
+        if txt:
+            texts.append(f"URL: {final_url}\n{txt}")
+        all_colors.update(colors)
 
     raw_text = "\n\n---\n\n".join(texts).strip()
     return ScrapeResult(
         pages=pages,
         raw_text=raw_text[:200000],  # hard cap to avoid giant payloads
         colors=sorted(list(all_colors))[:20],
+        fetched=fetched,
+        timed_out=bool(pending),
     )
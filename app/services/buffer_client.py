@@ -1,22 +1,55 @@
 import os
 import requests
+import httpx
 
 BUFFER_API = "https://api.bufferapp.com/1"
 TOKEN = os.getenv("BUFFER_ACCESS_TOKEN")
 
+# keep-alive pool sizing for the async path (one client per event loop)
+MAX_CONNECTIONS = int(os.getenv("BUFFER_MAX_CONNECTIONS", "20"))
+
+_session: requests.Session | None = None
+_async_client: httpx.AsyncClient | None = None
+
 class BufferError(Exception):
     pass
 
-def _headers():
+def _headers(idempotency_key: str | None = None):
     if not TOKEN:
         raise BufferError("BUFFER_ACCESS_TOKEN not set")
-    return {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    headers = {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
+    if idempotency_key:
+        headers["Idempotency-Key"] = idempotency_key
+    return headers
 
-def create_update(profile_id: str, text: str, scheduled_at_iso: str | None = None):
+def _http() -> requests.Session:
+    # reuse one pooled session instead of a fresh connection per update
+    global _session
+    if _session is None:
+        _session = requests.Session()
+    return _session
+
+def get_async_client() -> httpx.AsyncClient:
     """
-    Creates a Buffer update (post).
-    scheduled_at_iso: if None -> Buffer may post immediately or use defaults depending on endpoint.
+    Shared pooled AsyncClient for concurrent publishing.
+    Call close_async_client() when the event loop that uses it is done.
     """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            base_url=BUFFER_API,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+    return _async_client
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def _payload(profile_id: str, text: str, scheduled_at_iso: str | None) -> dict:
     if not profile_id:
         raise BufferError("Missing Buffer profile_id")
 
@@ -29,8 +62,74 @@ def create_update(profile_id: str, text: str, scheduled_at_iso: str | None = Non
     if scheduled_at_iso:
         payload["scheduled_at"] = scheduled_at_iso
 
-    resp = requests.post(f"{BUFFER_API}/updates/create.json", headers=_headers(), json=payload, timeout=30)
+    return payload
+
+def create_update(profile_id: str, text: str, scheduled_at_iso: str | None = None, idempotency_key: str | None = None):
+    """
+    Creates a Buffer update (post).
+    scheduled_at_iso: if None -> Buffer may post immediately or use defaults depending on endpoint.
+    idempotency_key: sent as Idempotency-Key; Buffer may ignore it, so callers
+    also reconcile with find_update() before retrying.
+    """
+    payload = _payload(profile_id, text, scheduled_at_iso)
+
+    resp = _http().post(f"{BUFFER_API}/updates/create.json", headers=_headers(idempotency_key), json=payload, timeout=30)
     if resp.status_code >= 400:
         raise BufferError(f"Buffer error {resp.status_code}: {resp.text}")
 
     return resp.json()
+
+async def create_update_async(profile_id: str, text: str, scheduled_at_iso: str | None = None, idempotency_key: str | None = None):
+    """
+    Async twin of create_update() that goes through the shared pooled client.
+    """
+    payload = _payload(profile_id, text, scheduled_at_iso)
+
+    resp = await get_async_client().post("/updates/create.json", headers=_headers(idempotency_key), json=payload)
+    if resp.status_code >= 400:
+        raise BufferError(f"Buffer error {resp.status_code}: {resp.text}")
+
+    return resp.json()
+
+def _match_update(resp, want: str) -> dict | None:
+    if resp.status_code >= 400:
+        raise BufferError(f"Buffer error {resp.status_code}: {resp.text}")
+
+    for u in resp.json().get("updates") or []:
+        if (u.get("text") or "").strip() == want:
+            return u
+    return None
+
+def find_update(profile_id: str, text: str) -> dict | None:
+    """
+    Looks for an existing pending or sent update on this profile with the same text.
+    Used to reconcile an attempt whose outcome we never saw (e.g. a timeout).
+    """
+    want = (text or "").strip()
+    for kind in ("pending", "sent"):
+        resp = _http().get(
+            f"{BUFFER_API}/profiles/{profile_id}/updates/{kind}.json",
+            headers=_headers(),
+            params={"count": 100},
+            timeout=30,
+        )
+        found = _match_update(resp, want)
+        if found:
+            return found
+    return None
+
+async def find_update_async(profile_id: str, text: str) -> dict | None:
+    """
+    Async twin of find_update() that goes through the shared pooled client.
+    """
+    want = (text or "").strip()
+    for kind in ("pending", "sent"):
+        resp = await get_async_client().get(
+            f"/profiles/{profile_id}/updates/{kind}.json",
+            headers=_headers(),
+            params={"count": 100},
+        )
+        found = _match_update(resp, want)
+        if found:
+            return found
+    return None
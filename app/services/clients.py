@@ -0,0 +1,144 @@
+"""
+Lazily created, cached clients for external services.
+
+Nothing here is imported or built until first use, so importing a router or
+running a one-shot script does not pay for openai/boto3/resend setup, and a
+missing env var only fails the call that needs it. Clients are cached per
+configuration and are safe to share across threads.
+
+Async httpx clients are bound to an event loop, so async_http_client() caches
+one per running loop instead of one per process.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import weakref
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import OpenAI
+
+_lock = threading.Lock()
+_cache: dict[tuple, Any] = {}
+
+
+def _cached(key: tuple, build):
+    client = _cache.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _cache.get(key)
+        if client is None:
+            client = _cache[key] = build()
+    return client
+
+
+def _required(name: str) -> str:
+    v = os.getenv(name, "").strip()
+    if not v:
+        raise RuntimeError(f"{name} is not set")
+    return v
+
+
+def openai_client() -> "OpenAI":
+    api_key = os.getenv("OPENAI_API_KEY", "").strip() or None
+
+    def build():
+        from openai import OpenAI
+        return OpenAI(api_key=api_key)
+
+    return _cached(("openai", api_key), build)
+
+
+# boto3 clients are thread-safe; size their connection pool for parallel part
+# and batch uploads (urllib3 otherwise keeps only 10 connections per host)
+STORAGE_MAX_POOL_CONNECTIONS = int(os.getenv("STORAGE_MAX_POOL_CONNECTIONS", "32"))
+STORAGE_MAX_ATTEMPTS = int(os.getenv("STORAGE_MAX_ATTEMPTS", "5"))
+
+
+def _boto_s3(endpoint: str, key: str, secret: str, region: Optional[str] = None):
+    import boto3
+    from botocore.client import Config
+
+    return boto3.session.Session().client(
+        "s3",
+        region_name=region,
+        endpoint_url=endpoint,
+        aws_access_key_id=key,
+        aws_secret_access_key=secret,
+        config=Config(
+            signature_version="s3v4",
+            max_pool_connections=STORAGE_MAX_POOL_CONNECTIONS,
+            retries={"max_attempts": STORAGE_MAX_ATTEMPTS, "mode": "adaptive"},
+            tcp_keepalive=True,
+            connect_timeout=10,
+            read_timeout=120,
+        ),
+    )
+
+
+def spaces_client():
+    """
+    boto3 S3 client for DigitalOcean Spaces (DO_SPACES_* env).
+    """
+    key = _required("DO_SPACES_KEY")
+    secret = _required("DO_SPACES_SECRET")
+    endpoint = _required("DO_SPACES_ENDPOINT")
+    region = os.getenv("DO_SPACES_REGION", "fra1").strip()
+
+    return _cached(("spaces", endpoint, region, key), lambda: _boto_s3(endpoint, key, secret, region))
+
+
+def s3_client():
+    """
+    boto3 S3 client for the generic S3_* env (services/storage.py).
+    """
+    endpoint = _required("S3_ENDPOINT")
+    key = _required("S3_ACCESS_KEY_ID")
+    secret = _required("S3_SECRET_ACCESS_KEY")
+
+    return _cached(("s3", endpoint, key), lambda: _boto_s3(endpoint, key, secret))
+
+
+def http_client() -> "httpx.Client":
+    """
+    Shared sync httpx client (keep-alive pool). Pass timeout= per request.
+    """
+    def build():
+        import httpx
+        return httpx.Client(timeout=30.0)
+
+    return _cached(("httpx",), build)
+
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def async_http_client() -> "httpx.AsyncClient":
+    """
+    Shared httpx.AsyncClient for the running event loop.
+    """
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _async_clients[loop] = httpx.AsyncClient(timeout=30.0)
+    return client
+
+
+def resend_module():
+    """
+    The resend SDK with its api key set (RESEND_API_KEY).
+    """
+    api_key = _required("RESEND_API_KEY")
+
+    def build():
+        import resend
+        resend.api_key = api_key
+        return resend
+
+    return _cached(("resend", api_key), build)
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.content_item import ContentItem
+from app.models.job import Job
+from app.services.ai_generator import (
+    generate_post,
+    generate_post_async,
+    generate_topic_posts_async,
+    new_async_client,
+)
+from app.services.state_machine import ensure_transition
+
+# max concurrent model calls per batch
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "8"))
+# flush finished drafts to the DB every N items or every few seconds, whichever comes first
+COMMIT_EVERY = int(os.getenv("GENERATION_COMMIT_EVERY", "10"))
+COMMIT_INTERVAL_SECONDS = float(os.getenv("GENERATION_COMMIT_INTERVAL_SECONDS", "2"))
+
+
+def normalize_content_type(x: Optional[str]) -> Optional[str]:
+    if not x:
+        return None
+    v = str(x).strip().lower()
+    if v in ("text", "image", "video"):
+        return v
+    return None
+
+
+def compose_body_text(ct: str, result: dict) -> tuple[str, str]:
+    """
+    Turns a generate_post() result into (body_text, hashtags) for storage.
+    """
+    caption = (result.get("body_text") or "").strip()
+    hashtags = (result.get("hashtags") or "").strip()
+    media_prompt = (result.get("media_prompt") or "").strip()
+
+    # ✅ Store prompt INSIDE body_text for image/video
+    if ct in ("image", "video") and media_prompt:
+        # Keep it readable + obvious in approvals UI
+        caption = (
+            f"{caption}\n\n"
+            f"---\n"
+            f"{'IMAGE_PROMPT' if ct == 'image' else 'VIDEO_PROMPT'}:\n"
+            f"{media_prompt}\n"
+        ).strip()
+
+    return caption, hashtags
+
+
+def generate_item_draft(
+    db: Session,
+    it: ContentItem,
+    *,
+    brand_id: str,
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[Any] = None,
+    now: Optional[datetime] = None,
+    use_cache: bool = True,
+    resume: bool = False,
+) -> bool:
+    """
+    Generates one draft: item -> GENERATING -> PENDING_APPROVAL (or FAILED).
+    Returns True if a draft was stored, False if skipped or failed.
+    Shared by /generation/text and the generate_text job; resume=True also
+    takes an item already in GENERATING (left there by a crashed attempt).
+    """
+    now = now or datetime.utcnow()
+    ct = normalize_content_type(it.content_type) or "text"
+
+    # safety: only allow the 3 types in this flow
+    if ct not in ("text", "image", "video"):
+        return False
+
+    # Move to GENERATING
+    if not (resume and it.status == "GENERATING"):
+        try:
+            ensure_transition(it.status, "GENERATING")
+        except Exception:
+            # skip items in invalid state
+            return False
+
+    it.status = "GENERATING"
+    it.updated_at = now
+    it.last_error = None
+    db.commit()
+
+    topic_text = (it.title or "").strip() or "Untitled topic"
+
+    try:
+        result = generate_post(
+            topic_text=topic_text,
+            platform=it.platform,
+            brand_id=brand_id,
+            content_type=ct,
+            brand_profile_summary=brand_profile_summary,
+            brand_profile_json=brand_profile_json,
+            use_cache=use_cache,
+        )
+
+        caption, hashtags = compose_body_text(ct, result)
+
+        it.body_text = caption
+        it.hashtags = hashtags or None
+        it.status = "PENDING_APPROVAL"
+        it.updated_at = now
+        it.last_error = None
+        db.commit()
+        return True
+
+    except Exception as e:
+        it.status = "FAILED"
+        it.last_error = str(e)
+        it.updated_at = now
+        db.commit()
+        return False
+
+
+def _apply_result(it: ContentItem, ct: str, result: Optional[dict], err: Optional[Exception], now: datetime) -> bool:
+    if err is None and result is not None:
+        caption, hashtags = compose_body_text(ct, result)
+        it.body_text = caption
+        it.hashtags = hashtags or None
+        it.status = "PENDING_APPROVAL"
+        it.last_error = None
+        it.updated_at = now
+        return True
+
+    it.status = "FAILED"
+    it.last_error = str(err) if err else "Generation failed"
+    it.updated_at = now
+    return False
+
+
+async def generate_drafts_concurrently(
+    db: Session,
+    item_ids: list[uuid.UUID],
+    *,
+    brand_id: str,
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[Any] = None,
+    concurrency: int = GENERATION_CONCURRENCY,
+    job: Optional[Job] = None,
+    resume: bool = False,
+    on_progress: Optional[Callable[[dict[str, int]], None]] = None,
+    use_cache: bool = True,
+    by_topic: bool = False,
+    on_item: Optional[Callable[[dict[str, Any]], None]] = None,
+) -> dict[str, int]:
+    """
+    Concurrent draft generation for a batch of items.
+
+    - all eligible items move to GENERATING in one commit
+    - up to `concurrency` model calls run at once (AsyncOpenAI)
+    - results are flushed in batched commits instead of two commits per item
+    - if `job` is given, progress is written to job.result on every flush;
+      the caller keeps the lease alive (job_queue.keep_alive), so a crashed
+      run can be picked up by a job worker
+    - resume=True also takes items already in GENERATING (left by a crashed run)
+    - use_cache=False forces fresh model calls instead of cached outputs
+    - by_topic=True makes one model call per topic_id for all its sibling
+      items (platform x content_type) and splits the answer across them;
+      variants missing from that answer fall back to a per-item call
+    - on_item, if given, is called with a small dict each time an item moves
+      to GENERATING, PENDING_APPROVAL or FAILED (used by the streaming endpoints)
+
+    Selects and commits are blocking Session calls made on the running loop,
+    so give it a loop of its own (asyncio.run on a worker thread), never the
+    API server's.
+    """
+    items = db.execute(select(ContentItem).where(ContentItem.id.in_(item_ids))).scalars().all()
+    now = datetime.utcnow()
+
+    work: list[tuple[ContentItem, str, str, str]] = []
+    # read before the commit below expires the items (touching them would reload each row)
+    topic_ids: list[Any] = []
+    ids: dict[ContentItem, str] = {}
+    for it in items:
+        ct = normalize_content_type(it.content_type) or "text"
+        if ct not in ("text", "image", "video"):
+            continue
+        if not (resume and it.status == "GENERATING"):
+            try:
+                ensure_transition(it.status, "GENERATING")
+            except Exception:
+                continue
+        it.status = "GENERATING"
+        it.updated_at = now
+        it.last_error = None
+        work.append((it, ct, it.platform, (it.title or "").strip() or "Untitled topic"))
+        topic_ids.append(it.topic_id)
+        ids[it] = str(it.id)
+
+    progress = {"total": len(work), "done": 0, "generated": 0, "failed": 0}
+
+    def _flush():
+        if job is not None:
+            job.result = dict(progress)
+        db.commit()
+        if on_progress:
+            on_progress(dict(progress))
+
+    _flush()
+    if not work:
+        return progress
+
+    if on_item:
+        for it, ct, platform, _ in work:
+            on_item({"id": ids[it], "platform": platform, "content_type": ct, "status": "GENERATING"})
+
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _item_call(it: ContentItem, ct: str, platform: str, topic_text: str):
+        try:
+            result = await generate_post_async(
+                topic_text=topic_text,
+                platform=platform,
+                brand_id=brand_id,
+                content_type=ct,
+                brand_profile_summary=brand_profile_summary,
+                brand_profile_json=brand_profile_json,
+                aclient=aclient,
+                use_cache=use_cache,
+            )
+            return it, ct, result, None
+        except Exception as e:
+            return it, ct, None, e
+
+    async def _one(it: ContentItem, ct: str, platform: str, topic_text: str):
+        async with sem:
+            return [await _item_call(it, ct, platform, topic_text)]
+
+    async def _topic(group: list[tuple[ContentItem, str, str, str]]):
+        topic_text = group[0][3]
+        variants = list(dict.fromkeys(((platform or "").lower(), ct) for _, ct, platform, _ in group))
+        async with sem:
+            try:
+                results = await generate_topic_posts_async(
+                    topic_text,
+                    brand_id,
+                    variants,
+                    brand_profile_summary,
+                    brand_profile_json,
+                    aclient=aclient,
+                    use_cache=use_cache,
+                )
+            except Exception as e:
+                return [(it, ct, None, e) for it, ct, _, _ in group]
+
+        # fallbacks for variants the answer missed take their own slots (after
+        # the topic call has given its slot back), concurrently with each other
+        out = []
+        missing = []
+        for it, ct, platform, text in group:
+            result = results.get(((platform or "").lower(), ct))
+            if result:
+                out.append((it, ct, result, None))
+            else:
+                missing.append(_one(it, ct, platform, text))
+        for rows in await asyncio.gather(*missing):
+            out.extend(rows)
+        return out
+
+    if by_topic:
+        groups: dict[tuple[Any, str], list[tuple[ContentItem, str, str, str]]] = {}
+        for topic_id, w in zip(topic_ids, work):
+            groups.setdefault((topic_id, w[3]), []).append(w)
+        calls = [_topic(g) if len(g) > 1 else _one(*g[0]) for g in groups.values()]
+    else:
+        calls = [_one(*w) for w in work]
+
+    pending = 0
+    last_flush = time.monotonic()
+
+    async with new_async_client() as aclient:
+        for fut in asyncio.as_completed(calls):
+            for it, ct, result, err in await fut:
+                ok = _apply_result(it, ct, result, err, datetime.utcnow())
+                if on_item:
+                    on_item({
+                        "id": ids[it],
+                        "content_type": ct,
+                        "status": it.status,
+                        "body_text": it.body_text if ok else None,
+                        "hashtags": it.hashtags if ok else None,
+                        "last_error": it.last_error,
+                    })
+                progress["done"] += 1
+                progress["generated" if ok else "failed"] += 1
+                pending += 1
+
+            if pending >= COMMIT_EVERY or time.monotonic() - last_flush >= COMMIT_INTERVAL_SECONDS:
+                _flush()
+                pending = 0
+                last_flush = time.monotonic()
+
+    _flush()
+    return progress
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import heapq
+import json
+import select as _select
+from datetime import datetime, timezone
+from typing import Iterable
+
+from sqlalchemy import select, text
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.content_item import ContentItem
+
+# Postgres NOTIFY channel used whenever items (re-)enter SCHEDULED
+CHANNEL = "content_items_due"
+
+# NOTIFY payloads must stay under 8000 bytes; keep well below that
+_MAX_PAYLOAD = 7000
+
+
+def _as_utc_naive(dt: datetime | None) -> datetime | None:
+    # content_items timestamps are naive UTC; normalize aware values to match
+    if dt is None:
+        return None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _due_at(scheduled_at: datetime | None, next_attempt_at: datetime | None) -> datetime | None:
+    # an item is due at its scheduled time, or later if it is backing off after a failure
+    scheduled_at = _as_utc_naive(scheduled_at)
+    next_attempt_at = _as_utc_naive(next_attempt_at)
+    if scheduled_at is None:
+        return None
+    if next_attempt_at is not None and next_attempt_at > scheduled_at:
+        return next_attempt_at
+    return scheduled_at
+
+
+def notify_due_changed(db: Session, items: Iterable[ContentItem]) -> None:
+    """
+    Tells listening publishers that these items are (re-)scheduled.
+    NOTIFY is transactional, so listeners only hear about it after db.commit().
+    """
+    rows: list[dict] = []
+    for it in items:
+        at = _due_at(it.scheduled_at, it.next_attempt_at)
+        if it.status == "SCHEDULED" and at is not None:
+            rows.append({"id": str(it.id), "at": at.isoformat()})
+
+    chunk: list[dict] = []
+    for row in rows:
+        chunk.append(row)
+        if len(json.dumps(chunk)) > _MAX_PAYLOAD:
+            last = chunk.pop()
+            db.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": CHANNEL, "payload": json.dumps(chunk)})
+            chunk = [last]
+    if chunk:
+        db.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": CHANNEL, "payload": json.dumps(chunk)})
+
+
+class DueScheduler:
+    """
+    In-memory min-heap of upcoming scheduled_at values.
+
+    load() seeds the heap from the DB once, listen() subscribes to CHANNEL so
+    /schedule/bulk and /publishing/retry-failed keep it current, and wait()
+    sleeps until the next item is due or a notification arrives. The heap only
+    decides *when* to wake up; claiming still goes through publisher_worker, so
+    stale entries are harmless.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, str]] = []
+        self._latest: dict[str, datetime] = {}
+        self._conn = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def push(self, item_id: str, at: datetime) -> None:
+        at = _as_utc_naive(at)
+        if at is None:
+            return
+        self._latest[item_id] = at
+        heapq.heappush(self._heap, (at, item_id))
+
+    def load(self, db: Session) -> int:
+        rows = db.execute(
+            select(ContentItem.id, ContentItem.scheduled_at, ContentItem.next_attempt_at)
+            .where(ContentItem.status == "SCHEDULED")
+            .where(ContentItem.scheduled_at.isnot(None))
+        ).all()
+
+        self._heap = []
+        self._latest = {}
+        for item_id, scheduled_at, next_attempt_at in rows:
+            self._latest[str(item_id)] = _due_at(scheduled_at, next_attempt_at)
+        self._heap = [(at, item_id) for item_id, at in self._latest.items()]
+        heapq.heapify(self._heap)
+        return len(self._heap)
+
+    def _drop_stale(self) -> None:
+        # an id can be pushed more than once; only its latest time counts
+        while self._heap and self._latest.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def seconds_until_next(self, now: datetime | None = None) -> float | None:
+        self._drop_stale()
+        if not self._heap:
+            return None
+        now = now or datetime.utcnow()
+        return max(0.0, (self._heap[0][0] - now).total_seconds())
+
+    def pop_due(self, now: datetime | None = None) -> int:
+        """
+        Removes every entry that is due and returns how many there were.
+        """
+        now = now or datetime.utcnow()
+        popped = 0
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, item_id = heapq.heappop(self._heap)
+            self._latest.pop(item_id, None)
+            popped += 1
+            self._drop_stale()
+        return popped
+
+    def listen(self) -> None:
+        raw = engine.raw_connection()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL};")
+        self._conn = raw
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                # don't hand a LISTENing autocommit connection back to the pool
+                self._conn.invalidate()
+            finally:
+                self._conn = None
+
+    def wait(self, timeout: float | None) -> int:
+        """
+        Blocks until a notification arrives or timeout elapses.
+        Returns the number of heap entries added from notifications.
+        """
+        if self._conn is None:
+            raise RuntimeError("DueScheduler.listen() must be called before wait()")
+
+        conn = self._conn.driver_connection
+        ready, _, _ = _select.select([conn], [], [], timeout)
+        if not ready:
+            return 0
+
+        conn.poll()
+        added = 0
+        while conn.notifies:
+            note = conn.notifies.pop(0)
+            try:
+                rows = json.loads(note.payload or "[]")
+            except ValueError:
+                continue
+            for row in rows:
+                try:
+                    self.push(row["id"], datetime.fromisoformat(row["at"]))
+                    added += 1
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return added
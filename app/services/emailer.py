@@ -1,6 +1,7 @@
 from __future__ import annotations
 import os
-import resend
+
+from app.services.clients import resend_module
 
 RESEND_API_KEY = os.getenv("RESEND_API_KEY", "").strip()
 MAIL_FROM = os.getenv("MAIL_FROM", "").strip()
@@ -13,7 +14,7 @@ def _require():
 
 def send_verify_email(to_email: str, verify_url: str):
     _require()
-    resend.api_key = RESEND_API_KEY
+    resend = resend_module()
 
     subject = "Verify your NeuroFlow account"
     html = f"""
@@ -1,62 +1,48 @@
 # backend/app/services/image_generator.py
 from __future__ import annotations
 
+import io
+import multiprocessing
 import os
-import uuid
-import mimetypes
-from typing import Tuple, Optional
-
-import boto3
-from botocore.client import Config
-
-
-def _spaces_client():
-    key = os.getenv("DO_SPACES_KEY", "").strip()
-    secret = os.getenv("DO_SPACES_SECRET", "").strip()
-    endpoint = os.getenv("DO_SPACES_ENDPOINT", "").strip()
-    region = os.getenv("DO_SPACES_REGION", "fra1").strip()
-
-    if not key or not secret or not endpoint:
-        raise RuntimeError("Missing DO_SPACES_KEY / DO_SPACES_SECRET / DO_SPACES_ENDPOINT in backend .env")
-
-    session = boto3.session.Session()
-    return session.client(
-        "s3",
-        region_name=region,
-        endpoint_url=endpoint,
-        aws_access_key_id=key,
-        aws_secret_access_key=secret,
-        config=Config(signature_version="s3v4"),
-    )
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
 
+from app.services.spaces_storage import upload_many_to_spaces
 
-def _upload_file_to_spaces(local_path: str, key: str) -> str:
-    bucket = os.getenv("DO_SPACES_BUCKET", "").strip()
-    public_base = os.getenv("DO_SPACES_PUBLIC_BASE", "").strip()
+# output sizes per aspect; Make gets the same names as aspect_hint
+SIZES: Dict[str, Tuple[int, int]] = {
+    "square": (1080, 1080),
+    "landscape": (1200, 628),
+    "portrait": (1080, 1350),
+}
+SQUARE_PLATFORMS = ("instagram", "facebook")
 
-    if not bucket:
-        raise RuntimeError("Missing DO_SPACES_BUCKET in backend .env")
-    if not public_base:
-        raise RuntimeError("Missing DO_SPACES_PUBLIC_BASE in backend .env")
+# rendering + PNG encoding is CPU-bound, so it runs in worker processes
+RENDER_WORKERS = max(1, int(os.getenv("IMAGE_RENDER_WORKERS", str(min(4, os.cpu_count() or 1)))))
 
-    content_type, _ = mimetypes.guess_type(local_path)
-    content_type = content_type or "application/octet-stream"
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
 
-    client = _spaces_client()
-    client.upload_file(
-        local_path,
-        bucket,
-        key,
-        ExtraArgs={
-            "ACL": "public-read",
-            "ContentType": content_type,
-        },
-    )
 
-    return f"{public_base.rstrip('/')}/{key}"
+def aspect_hint(platform: Optional[str]) -> str:
+    return "square" if (platform or "").lower() in SQUARE_PLATFORMS else "landscape"
 
 
-def _make_placeholder_png(output_path: str, text: str) -> None:
+def render_pool() -> ProcessPoolExecutor:
+    """
+    Process pool shared by all Pillow work (rendering, derivatives).
+    Workers are spawned, not forked: the pool is created lazily inside
+    threaded servers and workers, where fork can copy a held lock and deadlock.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _draw_placeholder(text: str):
     """
     Placeholder image generator (fast unblock).
     Requires: pip install pillow
@@ -70,8 +56,72 @@ def _make_placeholder_png(output_path: str, text: str) -> None:
     draw.text((40, 40), msg, fill=(40, 40, 40))
     draw.rectangle([40, 120, 984, 984], outline=(140, 140, 140), width=4)
     draw.text((60, 150), "Placeholder (swap with real image model later)", fill=(90, 90, 90))
+    return img
+
+
+def render_variants(text: str, variants: Tuple[str, ...]) -> Dict[str, bytes]:
+    """
+    Draws the image once and encodes every requested size to PNG in memory.
+    Top-level so it can run in a worker process.
+    """
+    from PIL import ImageOps
+
+    base = _draw_placeholder(text)
+    out: Dict[str, bytes] = {}
+    for name in variants:
+        size = SIZES[name]
+        img = base if base.size == size else ImageOps.fit(base, size, centering=(0.5, 0.0))
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", optimize=False, compress_level=6)
+        out[name] = buf.getvalue()
+    return out
+
+
+def submit_render(text: str, variants: Iterable[str]) -> "Future[Dict[str, bytes]]":
+    """
+    Queues render_variants on the process pool; await with .result() or
+    asyncio.wrap_future().
+    """
+    variants = tuple(dict.fromkeys(variants))
+    unknown = [v for v in variants if v not in SIZES]
+    if unknown:
+        raise ValueError(f"Unknown image variants: {unknown}")
+    return render_pool().submit(render_variants, text, variants)
+
 
-    img.save(output_path, format="PNG")
+def generate_image_variants_and_store(
+    prompt: str,
+    brand_id: str,
+    platform: str,
+    content_item_id: str,
+    variants: Optional[Iterable[str]] = None,
+) -> Dict[str, str]:
+    """
+    Renders all size variants in one worker call and uploads them concurrently.
+    Returns {variant: media_url}. Nothing touches the local disk.
+    With media dedup on (the default) objects get content-addressed keys and
+    the per-item key_prefix below only applies when MEDIA_DEDUP_ENABLED=0.
+    Store every URL you keep on the item (media_url, or media_urls for extra
+    variants): media_index.gc() deletes objects nothing references once
+    MEDIA_GC_GRACE_HOURS have passed.
+    """
+    variants = tuple(variants or (aspect_hint(platform),))
+    rendered = submit_render(prompt, variants).result()
+
+    names = list(rendered)
+    outcomes = upload_many_to_spaces(
+        {
+            "content": rendered[name],
+            "content_type": "image/png",
+            "key_prefix": f"generated/{brand_id}/{platform}/{content_item_id}/{name}",
+            "filename_ext": "png",
+        }
+        for name in names
+    )
+    failed = [f"{name}: {o.error}" for name, o in zip(names, outcomes) if not o.ok]
+    if failed:
+        raise RuntimeError(f"Image upload failed ({'; '.join(failed)})")
+    return {name: o.url for name, o in zip(names, outcomes)}
 
 
 def generate_image_and_store(
@@ -82,28 +132,11 @@ def generate_image_and_store(
 ) -> Tuple[str, str]:
     """
     Returns: (media_url, media_mime)
-    Generates an image (placeholder) then uploads to Spaces.
+    Generates an image (placeholder) for the platform's aspect and uploads it to Spaces.
     """
-    tmp_dir = os.path.join(os.getcwd(), "tmp_media")
-    os.makedirs(tmp_dir, exist_ok=True)
-
-    filename = f"{content_item_id}_{uuid.uuid4().hex}.png"
-    local_path = os.path.join(tmp_dir, filename)
-
-    # Generate (placeholder)
-    _make_placeholder_png(local_path, prompt)
-
-    # Upload
-    key = f"generated/{brand_id}/{platform}/{filename}"
-    media_url = _upload_file_to_spaces(local_path, key)
-
-    # Cleanup
-    try:
-        os.remove(local_path)
-    except Exception:
-        pass
-
-    return media_url, "image/png"
+    hint = aspect_hint(platform)
+    urls = generate_image_variants_and_store(prompt, brand_id, platform, content_item_id, variants=(hint,))
+    return urls[hint], "image/png"
 
 
 # ✅ This is the missing function your router imports.
@@ -0,0 +1,131 @@
+"""
+Handlers for the Postgres-backed job queue (see job_queue.py).
+
+Importing this module registers them. Router helpers are imported inside the
+handlers so worker processes only load what the job they run needs.
+"""
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.models.content_item import ContentItem
+from app.models.job import Job
+from app.services.job_queue import RetryLater, handler
+
+
+def _item(db: Session, job: Job) -> ContentItem:
+    it = db.get(ContentItem, job.content_item_id) if job.content_item_id else None
+    if not it:
+        raise ValueError(f"Content item not found: {job.content_item_id}")
+    return it
+
+
+def _cleanup_batch(prov, batch_id: str) -> None:
+    # the results are committed by now; leftover files must not fail the job
+    try:
+        prov.cleanup(batch_id)
+    except Exception as e:
+        print(f"[jobs] batch {batch_id} cleanup failed: {e}", flush=True)
+
+
+@handler("generate_text")
+def run_generate_text(db: Session, job: Job) -> dict[str, Any]:
+    from app.services.draft_generation import generate_item_draft
+
+    it = _item(db, job)
+    p = job.payload or {}
+    ok = generate_item_draft(
+        db,
+        it,
+        brand_id=p.get("brand_id") or it.brand_id,
+        brand_profile_summary=p.get("brand_profile_summary"),
+        brand_profile_json=p.get("brand_profile_json"),
+        use_cache=not p.get("bypass_cache"),
+        # a retry of this job finds the item where the crashed attempt left it
+        resume=(job.attempts or 0) > 1,
+    )
+    # a FAILED item is a final outcome for this job, not a reason to retry it
+    return {"generated": ok, "status": it.status, "last_error": it.last_error}
+
+
+@handler("generate_text_batch")
+def run_generate_text_batch(db: Session, job: Job) -> dict[str, Any]:
+    from app.services.draft_generation import generate_drafts_concurrently
+
+    p = job.payload or {}
+    # resume=True: items a crashed run left in GENERATING are picked up again
+    return asyncio.run(
+        generate_drafts_concurrently(
+            db,
+            p.get("content_item_ids") or [],
+            brand_id=p.get("brand_id"),
+            brand_profile_summary=p.get("brand_profile_summary"),
+            brand_profile_json=p.get("brand_profile_json"),
+            job=job,
+            resume=True,
+            use_cache=not p.get("bypass_cache"),
+            by_topic=bool(p.get("by_topic")),
+        )
+    )
+
+
+@handler("generate_text_offline")
+def run_generate_text_offline(db: Session, job: Job) -> dict[str, Any]:
+    from app.services.batch_generation import POLL_SECONDS, apply_batch_results, fail_batch_items, get_provider
+
+    p = job.payload or {}
+    batch_id = p.get("batch_id")
+    prov = get_provider(p.get("provider"))
+
+    state = prov.status(batch_id)
+    if state == "in_progress":
+        raise RetryLater(POLL_SECONDS, {"batch_id": batch_id, "total": len(p.get("content_item_ids") or []), "state": state})
+    if state == "failed":
+        failed = fail_batch_items(db, job, f"Batch {batch_id} failed at provider")
+        _cleanup_batch(prov, batch_id)
+        return {"batch_id": batch_id, "state": state, "failed": failed}
+
+    summary = apply_batch_results(db, job, prov.results(batch_id))
+    _cleanup_batch(prov, batch_id)
+    return {"batch_id": batch_id, "state": state, **summary}
+
+
+
+@handler("generate_media")
+def run_generate_media(db: Session, job: Job) -> dict[str, Any]:
+    from app.routers.media import _generate_media_for_item, _require_make_media_config
+
+    it = _item(db, job)
+    make_url, make_api_key = _require_make_media_config()
+    sent, updated, reason = _generate_media_for_item(db, it, make_url, make_api_key, datetime.utcnow())
+    return {"sent": sent, "updated": updated, "reason": reason, "status": it.status}
+
+
+@handler("media_derivatives")
+def run_media_derivatives(db: Session, job: Job) -> dict[str, Any]:
+    from app.services.media_derivatives import generate_for_item
+
+    it = _item(db, job)
+    result = generate_for_item(db, it, force=bool((job.payload or {}).get("force")))
+    db.commit()
+    return result
+
+
+@handler("scrape_brand")
+def run_scrape_brand(db: Session, job: Job) -> dict[str, Any]:
+    from app.database import SessionLocal
+    from app.routers.brand_profiles import _run_scrape_job
+
+    p = job.payload or {}
+    brand_id = (p.get("brand_id") or "").strip()
+    website_url = (p.get("website_url") or "").strip()
+    if not brand_id or not website_url:
+        raise ValueError("scrape_brand needs brand_id and website_url")
+
+    asyncio.run(_run_scrape_job(brand_id, website_url, SessionLocal))
+    return {"brand_id": brand_id}
+
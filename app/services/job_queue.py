@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import random
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterable, Iterator
+
+from sqlalchemy import select, update, and_, or_, asc
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.job import Job
+
+LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "1800"))
+
+class RetryLater(Exception):
+    """
+    Raised by a handler that is waiting on something external (e.g. a provider
+    batch). The job is requeued after `delay` seconds without using up an attempt.
+    """
+
+    def __init__(self, delay: float, result: dict[str, Any] | None = None):
+        super().__init__(f"retry in {delay}s")
+        self.delay = delay
+        self.result = result
+
+
+# job_type -> handler(db, job) -> optional result dict
+HANDLERS: dict[str, Callable[[Session, Job], dict[str, Any] | None]] = {}
+
+
+def handler(job_type: str):
+    """
+    Registers a job handler:
+
+        @handler("generate_text")
+        def run(db, job): ...
+    """
+    def deco(fn):
+        HANDLERS[job_type] = fn
+        return fn
+    return deco
+
+
+def enqueue(
+    db: Session,
+    job_type: str,
+    *,
+    content_item_id: uuid.UUID | str | None = None,
+    payload: dict[str, Any] | None = None,
+    run_after: datetime | None = None,
+    max_attempts: int | None = None,
+    commit: bool = True,
+) -> Job:
+    now = datetime.utcnow()
+    job = Job(
+        job_type=job_type,
+        content_item_id=uuid.UUID(str(content_item_id)) if content_item_id else None,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or MAX_ATTEMPTS,
+        payload=payload,
+        run_after=run_after or now,
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(job)
+    if commit:
+        db.commit()
+        db.refresh(job)
+    return job
+
+
+def claim(
+    db: Session,
+    worker_id: str,
+    job_types: Iterable[str] | None = None,
+    lease_seconds: float = LEASE_SECONDS,
+) -> Job | None:
+    """
+    Claims the next runnable job with FOR UPDATE SKIP LOCKED.
+
+    Runnable = queued and due, or running with an expired lease (its worker died).
+    The claimer holds a lease until locked_until and must heartbeat() to keep it.
+    """
+    now = datetime.utcnow()
+    q = (
+        select(Job)
+        .where(
+            or_(
+                and_(Job.status == "queued", Job.run_after <= now),
+                and_(Job.status == "running", Job.locked_until < now, Job.attempts < Job.max_attempts),
+            )
+        )
+        .order_by(asc(Job.run_after))
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    if job_types:
+        q = q.where(Job.job_type.in_(list(job_types)))
+
+    job = db.execute(q).scalars().first()
+    if not job:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_by = worker_id
+    job.locked_until = now + timedelta(seconds=lease_seconds)
+    job.heartbeat_at = now
+    job.updated_at = now
+    db.commit()
+    return job
+
+
+def heartbeat(db: Session, job_id: uuid.UUID, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+    """
+    Extends the lease. Returns False if this worker no longer owns the job.
+    """
+    now = datetime.utcnow()
+    res = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+        .values(locked_until=now + timedelta(seconds=lease_seconds), heartbeat_at=now, updated_at=now)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+@contextmanager
+def keep_alive(job_id: uuid.UUID, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Iterator[None]:
+    """
+    Heartbeats the lease from a background thread while the block runs.
+    The thread uses its own session; the caller keeps the main one.
+    """
+    done = threading.Event()
+
+    def _loop():
+        while not done.wait(lease_seconds / 3):
+            db = SessionLocal()
+            try:
+                if not heartbeat(db, job_id, worker_id, lease_seconds):
+                    print(f"[{worker_id}] lost lease on job {job_id}", flush=True)
+                    return
+            except Exception as e:
+                print(f"[{worker_id}] heartbeat error: {e}", flush=True)
+            finally:
+                db.close()
+
+    t = threading.Thread(target=_loop, name=f"heartbeat-{job_id}", daemon=True)
+    t.start()
+    try:
+        yield
+    finally:
+        done.set()
+        t.join(timeout=5)
+
+
+def _settle(db: Session, job_id: uuid.UUID, worker_id: str, now: datetime, **values: Any) -> bool:
+    """
+    Writes a job outcome and releases the lease, but only while worker_id still
+    owns the running job. A worker whose lease expired and was reclaimed must
+    not overwrite the new owner's result. Returns False if the write was dropped.
+    """
+    res = db.execute(
+        update(Job)
+        .where(Job.id == job_id, Job.locked_by == worker_id, Job.status == "running")
+        .values(locked_by=None, locked_until=None, updated_at=now, **values)
+    )
+    db.commit()
+    if res.rowcount != 1:
+        print(f"[{worker_id}] no longer owns job {job_id}; outcome dropped", flush=True)
+        return False
+    return True
+
+
+def complete(db: Session, job: Job, worker_id: str, result: dict[str, Any] | None = None) -> bool:
+    now = datetime.utcnow()
+    values: dict[str, Any] = {"status": "done", "last_error": None, "finished_at": now}
+    if result is not None:
+        values["result"] = result
+    return _settle(db, job.id, worker_id, now, **values)
+
+
+def fail(db: Session, job: Job, worker_id: str, error: str, final: bool = False) -> bool:
+    """
+    Requeues with exponential backoff, or dead-letters once max_attempts is used
+    up (or right away with final=True).
+    """
+    now = datetime.utcnow()
+    attempts = job.attempts or 0
+
+    if final or attempts >= (job.max_attempts or MAX_ATTEMPTS):
+        return _settle(db, job.id, worker_id, now, status="dead", last_error=error, finished_at=now)
+
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** max(0, (attempts or 1) - 1)))
+    run_after = now + timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+    return _settle(db, job.id, worker_id, now, status="queued", last_error=error, run_after=run_after)
+
+
+def reap_expired(db: Session) -> int:
+    """
+    Dead-letters running jobs whose lease expired and that have no attempts left.
+    """
+    now = datetime.utcnow()
+    res = db.execute(
+        update(Job)
+        .where(Job.status == "running", Job.locked_until < now, Job.attempts >= Job.max_attempts)
+        .values(status="dead", last_error="Lease expired after final attempt", locked_by=None,
+                locked_until=None, finished_at=now, updated_at=now)
+    )
+    db.commit()
+    return res.rowcount
+
+
+def requeue(db: Session, job: Job) -> None:
+    """
+    Manually revives a dead (or finished) job with a fresh attempt budget.
+    """
+    now = datetime.utcnow()
+    job.status = "queued"
+    job.attempts = 0
+    job.run_after = now
+    job.finished_at = None
+    job.locked_by = None
+    job.locked_until = None
+    job.updated_at = now
+    db.commit()
+
+
+def run_job(db: Session, job: Job, worker_id: str) -> None:
+    """
+    Runs the registered handler for a job claimed by worker_id and records the outcome.
+    """
+    fn = HANDLERS.get(job.job_type)
+    if fn is None:
+        # no point retrying an unknown type
+        fail(db, job, worker_id, f"No handler registered for job_type={job.job_type}", final=True)
+        return
+
+    try:
+        result = fn(db, job)
+    except RetryLater as later:
+        now = datetime.utcnow()
+        values: dict[str, Any] = {
+            "status": "queued",
+            "attempts": max(0, (job.attempts or 1) - 1),
+            "run_after": now + timedelta(seconds=later.delay),
+        }
+        if later.result is not None:
+            values["result"] = later.result
+        _settle(db, job.id, worker_id, now, **values)
+        return
+    except Exception as e:
+        db.rollback()
+        fail(db, job, worker_id, str(e))
+        return
+
+    complete(db, job, worker_id, result)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+MEMORY_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_MAX_ENTRIES", "512"))
+DB_MAX_ROWS = int(os.getenv("LLM_CACHE_DB_MAX_ROWS", "50000"))
+# prune the table every N writes
+PRUNE_EVERY = 200
+
+# in-process front: key -> (output_text, expires_at), kept in LRU order
+_memory: "OrderedDict[str, tuple[str, datetime]]" = OrderedDict()
+_lock = threading.Lock()
+_writes = 0
+
+
+def fingerprint(instructions: str, user_input: str, model: str, prompt_version: str = "") -> str:
+    """
+    Content-addressed cache key for one model call.
+    """
+    h = hashlib.sha256()
+    for part in (model, prompt_version, instructions, user_input):
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def _memory_get(key: str) -> str | None:
+    with _lock:
+        hit = _memory.get(key)
+        if hit is None:
+            return None
+        value, expires_at = hit
+        if expires_at <= datetime.utcnow():
+            _memory.pop(key, None)
+            return None
+        _memory.move_to_end(key)
+        return value
+
+
+def _memory_put(key: str, value: str, expires_at: datetime) -> None:
+    with _lock:
+        _memory[key] = (value, expires_at)
+        _memory.move_to_end(key)
+        while len(_memory) > MEMORY_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def get(key: str) -> str | None:
+    """
+    Returns the cached output text for key, or None. Checks memory, then Postgres.
+    """
+    if not ENABLED:
+        return None
+
+    value = _memory_get(key)
+    if value is not None:
+        return value
+
+    from app.database import engine
+
+    try:
+        with engine.begin() as conn:
+            row = conn.execute(
+                text(
+                    "UPDATE llm_cache SET hit_count = hit_count + 1, last_hit_at = :now "
+                    "WHERE key = :k AND expires_at > :now RETURNING output_text, expires_at"
+                ),
+                {"k": key, "now": datetime.utcnow()},
+            ).first()
+    except Exception as e:
+        print(f"[llm_cache] lookup failed: {e}")
+        return None
+
+    if row is None:
+        return None
+    _memory_put(key, row[0], row[1])
+    return row[0]
+
+
+def put(key: str, model: str, output_text: str) -> None:
+    global _writes
+    if not ENABLED or not output_text:
+        return
+
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=TTL_SECONDS)
+    _memory_put(key, output_text, expires_at)
+
+    from app.database import engine
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(
+                text(
+                    "INSERT INTO llm_cache (key, model, output_text, hit_count, created_at, last_hit_at, expires_at) "
+                    "VALUES (:k, :m, :t, 0, :now, :now, :exp) "
+                    "ON CONFLICT (key) DO UPDATE SET output_text = EXCLUDED.output_text, "
+                    "last_hit_at = EXCLUDED.last_hit_at, expires_at = EXCLUDED.expires_at"
+                ),
+                {"k": key, "m": model, "t": output_text, "now": now, "exp": expires_at},
+            )
+    except Exception as e:
+        print(f"[llm_cache] store failed: {e}")
+        return
+
+    _writes += 1
+    if _writes % PRUNE_EVERY == 0:
+        try:
+            prune()
+        except Exception as e:
+            print(f"[llm_cache] prune failed: {e}")
+
+
+def prune() -> int:
+    """
+    Deletes expired rows, then the least recently hit rows beyond DB_MAX_ROWS.
+    """
+    from app.database import engine
+
+    with engine.begin() as conn:
+        expired = conn.execute(text("DELETE FROM llm_cache WHERE expires_at <= :now"), {"now": datetime.utcnow()}).rowcount
+        evicted = conn.execute(
+            text(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "  SELECT key FROM llm_cache ORDER BY last_hit_at DESC OFFSET :n"
+                ")"
+            ),
+            {"n": DB_MAX_ROWS},
+        ).rowcount
+    return (expired or 0) + (evicted or 0)
+
+
+async def get_async(key: str) -> str | None:
+    if not ENABLED:
+        return None
+    value = _memory_get(key)
+    if value is not None:
+        return value
+    return await asyncio.to_thread(get, key)
+
+
+async def put_async(key: str, model: str, output_text: str) -> None:
+    if not ENABLED or not output_text:
+        return
+    await asyncio.to_thread(put, key, model, output_text)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+ENABLED = os.getenv("LLM_METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+# rows are buffered and written in one INSERT every N calls or every few seconds
+FLUSH_EVERY = int(os.getenv("LLM_METRICS_FLUSH_EVERY", "50"))
+FLUSH_INTERVAL_SECONDS = float(os.getenv("LLM_METRICS_FLUSH_INTERVAL_SECONDS", "5"))
+
+_buffer: list[dict[str, Any]] = []
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+_INSERT = text(
+    "INSERT INTO llm_call_metrics (created_at, call_type, model, brand_id, platform, content_type, "
+    "prompt_version, input_tokens, output_tokens, latency_ms, cache_hit, ok) "
+    "VALUES (:created_at, :call_type, :model, :brand_id, :platform, :content_type, "
+    ":prompt_version, :input_tokens, :output_tokens, :latency_ms, :cache_hit, :ok)"
+)
+
+
+def usage_of(resp: Any) -> tuple[Optional[int], Optional[int]]:
+    """
+    (input_tokens, output_tokens) from a Responses API object or a raw JSON body.
+    """
+    usage = getattr(resp, "usage", None)
+    if usage is None and isinstance(resp, dict):
+        usage = resp.get("usage")
+    if usage is None:
+        return None, None
+    if isinstance(usage, dict):
+        return usage.get("input_tokens"), usage.get("output_tokens")
+    return getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+
+
+def record(
+    call_type: str,
+    model: str,
+    *,
+    brand_id: Optional[str] = None,
+    platform: Optional[str] = None,
+    content_type: Optional[str] = None,
+    prompt_version: Optional[str] = None,
+    input_tokens: Optional[int] = None,
+    output_tokens: Optional[int] = None,
+    latency_ms: Optional[float] = None,
+    cache_hit: bool = False,
+    ok: bool = True,
+) -> None:
+    """
+    Buffers one model call. Never raises: metrics must not break generation.
+    """
+    if not ENABLED:
+        return
+
+    row = {
+        "created_at": datetime.utcnow(),
+        "call_type": call_type,
+        "model": model,
+        "brand_id": brand_id,
+        "platform": platform,
+        "content_type": content_type,
+        "prompt_version": prompt_version,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency_ms": int(latency_ms) if latency_ms is not None else None,
+        "cache_hit": cache_hit,
+        "ok": ok,
+    }
+    with _lock:
+        _buffer.append(row)
+        due = len(_buffer) >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+    if due:
+        flush()
+
+
+def flush() -> int:
+    global _last_flush
+    with _lock:
+        rows = list(_buffer)
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    if not rows:
+        return 0
+
+    from app.database import engine
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(_INSERT, rows)
+    except Exception as e:
+        print(f"[llm_metrics] dropped {len(rows)} rows: {e}")
+        return 0
+    return len(rows)
+
+
+atexit.register(flush)
+
+
+# columns /stats/llm may group by
+GROUP_COLUMNS = ("call_type", "model", "prompt_version", "brand_id", "platform", "content_type", "cache_hit")
@@ -5,13 +5,13 @@ import uuid
 from datetime import datetime
 from typing import Any
 
-import httpx
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.models.content_item import ContentItem
+from app.services.clients import http_client
 
 router = APIRouter(prefix="/make", tags=["make"])
 
@@ -54,6 +54,9 @@ def send_to_make(payload: dict, db: Session = Depends(get_db)):
         if it.status != "QUEUED":
             skipped.append({"id": str(it.id), "status": it.status, "reason": "Only QUEUED items can be sent to Make"})
             continue
+        if it.publish_claimed_at is not None:
+            skipped.append({"id": str(it.id), "status": it.status, "reason": "Being published by the publisher worker"})
+            continue
 
         caption = (it.body_text or "").strip()
         if not caption and it.content_type == "text":
@@ -90,8 +93,7 @@ def send_to_make(payload: dict, db: Session = Depends(get_db)):
     }
 
     try:
-        with httpx.Client(timeout=30.0) as client:
-            r = client.post(make_webhook_url, json={"items": to_send}, headers=headers)
+        r = http_client().post(make_webhook_url, json={"items": to_send}, headers=headers, timeout=30.0)
     except Exception as e:
         raise HTTPException(status_code=502, detail=f"Failed to reach Make webhook: {e}")
 
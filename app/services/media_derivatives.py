@@ -0,0 +1,132 @@
+"""
+WebP derivatives for the UI, generated after media lands on an item.
+
+The approval queue and calendars used to load the full-size media_url for
+every card. This stage fetches the item's image (or the video's thumbnail
+image), builds a small card thumbnail and a preview size with Pillow on the
+shared render pool, uploads them under immutable keys with a year-long
+Cache-Control, and records them in preview_thumbnail_url / preview_url.
+media_url and thumbnail_url are left untouched for publishing.
+
+Runs as the media_derivatives job, queued by the media routes whenever an
+item gets new media; backfill with python -m app.scripts.backfill_media_derivatives.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.content_item import ContentItem
+from app.services.clients import http_client
+from app.services.object_storage import Upload, spaces_store
+
+JOB_TYPE = "media_derivatives"
+
+# name -> longest edge in px
+DERIVATIVES: Dict[str, int] = {
+    "thumb": int(os.getenv("MEDIA_THUMB_PX", "320")),
+    "preview": int(os.getenv("MEDIA_PREVIEW_PX", "960")),
+}
+WEBP_QUALITY = int(os.getenv("MEDIA_DERIVATIVE_WEBP_QUALITY", "80"))
+MAX_SOURCE_BYTES = int(os.getenv("MEDIA_DERIVATIVE_MAX_SOURCE_BYTES", str(40 * 1024 * 1024)))
+# keys embed the source hash, so the objects never change and can be cached for good
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def render_derivatives(data: bytes, sizes: Tuple[Tuple[str, int], ...]) -> Dict[str, bytes]:
+    """
+    Decodes once and encodes each size (largest first, each one downscaled
+    from the previous) to WebP. Top-level so it can run in a worker process.
+    """
+    from PIL import Image, ImageOps
+
+    img = Image.open(io.BytesIO(data))
+    # JPEG can decode straight at a reduced scale, far cheaper than full decode + resize
+    img.draft("RGB", (max(px for _, px in sizes),) * 2)
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+    out: Dict[str, bytes] = {}
+    for name, px in sorted(sizes, key=lambda s: s[1], reverse=True):
+        img.thumbnail((px, px), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+        out[name] = buf.getvalue()
+    return out
+
+
+def _source_url(it: ContentItem) -> Optional[str]:
+    media_type = (it.media_type or it.content_type or "").lower()
+    if media_type == "image" and it.media_url:
+        return it.media_url
+    # videos: derive from the poster image Make sent
+    return it.thumbnail_url or None
+
+
+def _fetch(url: str) -> bytes:
+    buf = bytearray()
+    with http_client().stream("GET", url, timeout=60.0, follow_redirects=True) as r:
+        r.raise_for_status()
+        for chunk in r.iter_bytes():
+            buf += chunk
+            if len(buf) > MAX_SOURCE_BYTES:
+                raise ValueError(f"source is larger than {MAX_SOURCE_BYTES} bytes")
+    return bytes(buf)
+
+
+def generate_for_item(db: Session, it: ContentItem, force: bool = False) -> Dict[str, Any]:
+    """
+    Builds and stores the item's derivatives (caller commits).
+    """
+    from app.services.image_generator import render_pool
+
+    if it.preview_url and not force:
+        return {"skipped": "already has derivatives"}
+    src = _source_url(it)
+    if not src:
+        return {"skipped": "no image source"}
+
+    data = _fetch(src)
+    rendered = render_pool().submit(render_derivatives, data, tuple(DERIVATIVES.items())).result()
+
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    names = list(rendered)
+    outcomes = spaces_store().upload_many(
+        Upload(
+            key=f"derived/{it.id}/{digest}-{name}.webp",
+            content_type="image/webp",
+            data=rendered[name],
+            cache_control=CACHE_CONTROL,
+        )
+        for name in names
+    )
+    urls = {}
+    for name, o in zip(names, outcomes):
+        if not o.ok:
+            raise RuntimeError(f"derivative upload failed ({name}): {o.error}")
+        urls[name] = o.url
+
+    it.preview_thumbnail_url = urls.get("thumb")
+    it.preview_url = urls.get("preview")
+    return {
+        "source": src,
+        "source_bytes": len(data),
+        "bytes": {name: len(b) for name, b in rendered.items()},
+        "urls": urls,
+    }
+
+
+def queue_for_item(db: Session, it: ContentItem) -> None:
+    """
+    Queues derivative generation for an item that just got media (caller commits).
+    """
+    from app.services.job_queue import enqueue
+
+    it.preview_url = None
+    it.preview_thumbnail_url = None
+    enqueue(db, JOB_TYPE, content_item_id=it.id, commit=False)
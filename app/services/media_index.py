@@ -0,0 +1,217 @@
+"""
+Content-addressed media storage with dedup.
+
+Objects are stored under cas/<h[:2]>/<sha256>.<ext> and media_objects maps
+each hash to its key, URL and refcount. Storing bytes we already have is one
+indexed UPDATE and no upload at all; new bytes are uploaded once and indexed.
+
+gc() recomputes refcounts from content_items (media_url, thumbnail_url and
+every URL in media_urls) and deletes objects that nothing references and nobody has stored again for
+GC_GRACE_HOURS. The grace period covers URLs that were handed out but not yet
+committed to an item.
+
+If the index is unreachable, uploads still go to the content-addressed key,
+so the worst case is a skipped dedup, never a failed upload.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import bindparam, text
+
+from app.services.object_storage import ObjectStore, Upload, UploadOutcome, spaces_store
+
+ENABLED = os.getenv("MEDIA_DEDUP_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+KEY_PREFIX = os.getenv("MEDIA_CAS_PREFIX", "cas").strip().strip("/")
+GC_GRACE_HOURS = float(os.getenv("MEDIA_GC_GRACE_HOURS", "72"))
+
+_CLAIM = text(
+    "UPDATE media_objects SET refcount = refcount + 1, last_used_at = :now "
+    "WHERE sha256 IN :hashes RETURNING sha256, key, url"
+).bindparams(bindparam("hashes", expanding=True))
+
+_RECORD = text(
+    "INSERT INTO media_objects (sha256, key, url, content_type, size, refcount, created_at, last_used_at) "
+    "VALUES (:sha256, :key, :url, :content_type, :size, 1, :now, :now) "
+    "ON CONFLICT (sha256) DO UPDATE SET refcount = media_objects.refcount + 1, last_used_at = EXCLUDED.last_used_at"
+)
+
+
+def digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def object_key(sha256: str, filename_ext: str) -> str:
+    return f"{KEY_PREFIX}/{sha256[:2]}/{sha256}.{(filename_ext or 'bin').lstrip('.')}"
+
+
+def _claim(hashes: list[str]) -> dict[str, tuple[str, str]]:
+    """
+    {sha256: (key, url)} for hashes already stored, bumping their refcount.
+    """
+    from app.database import engine
+
+    try:
+        with engine.begin() as conn:
+            return {h: (key, url) for h, key, url in conn.execute(_CLAIM, {"hashes": hashes, "now": datetime.utcnow()})}
+    except Exception as e:
+        print(f"[media_index] lookup failed: {e}")
+        return {}
+
+
+def _record(rows: list[dict[str, Any]]) -> None:
+    from app.database import engine
+
+    if not rows:
+        return
+    now = datetime.utcnow()
+    try:
+        with engine.begin() as conn:
+            conn.execute(_RECORD, [{**r, "now": now} for r in rows])
+    except Exception as e:
+        print(f"[media_index] could not index {len(rows)} objects: {e}")
+
+
+def put_bytes(content: bytes, content_type: str, filename_ext: str = "bin", store: Optional[ObjectStore] = None) -> str:
+    """
+    Stores bytes once and returns the public URL; known bytes skip the upload.
+    """
+    h = digest(content)
+    hit = _claim([h]).get(h)
+    if hit:
+        return hit[1]
+
+    store = store or spaces_store()
+    key = object_key(h, filename_ext)
+    url = store.put_bytes(key, content, content_type)
+    _record([{"sha256": h, "key": key, "url": url, "content_type": content_type, "size": len(content)}])
+    return url
+
+
+def put_many(
+    files: Iterable[dict[str, Any]],
+    store: Optional[ObjectStore] = None,
+    concurrency: Optional[int] = None,
+) -> list[UploadOutcome]:
+    """
+    Batch put_bytes: files are {"content", "content_type", "filename_ext"}.
+    One lookup for the whole batch, identical files in the batch are uploaded
+    once, and the misses go up in parallel. One outcome per file, in order.
+    """
+    files = list(files)
+    hashes = [digest(f["content"]) for f in files]
+    known = _claim(sorted(set(hashes)))
+
+    pending: dict[str, Upload] = {}
+    sizes: dict[str, int] = {}
+    for f, h in zip(files, hashes):
+        if h in known or h in pending:
+            continue
+        pending[h] = Upload(key=object_key(h, f.get("filename_ext") or "bin"), content_type=f["content_type"], data=f["content"])
+        sizes[h] = len(f["content"])
+
+    results: dict[str, UploadOutcome] = {}
+    if pending:
+        store = store or spaces_store()
+        uploads = list(pending.values())
+        outcomes = store.upload_many(uploads) if concurrency is None else store.upload_many(uploads, concurrency)
+        results = dict(zip(pending, outcomes))
+        _record([
+            {"sha256": h, "key": o.key, "url": o.url, "content_type": pending[h].content_type, "size": sizes[h]}
+            for h, o in results.items() if o.ok
+        ])
+
+    out = []
+    for h in hashes:
+        if h in known:
+            key, url = known[h]
+            out.append(UploadOutcome(key=key, url=url))
+        else:
+            out.append(results[h])
+    return out
+
+
+def gc(
+    grace_hours: float = GC_GRACE_HOURS,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    store: Optional[ObjectStore] = None,
+) -> dict[str, int]:
+    """
+    Garbage-collects orphaned objects:
+      1. refcount := number of references from content_items: media_url,
+         thumbnail_url and each entry of media_urls (JSON array or comma list)
+      2. rows with refcount 0 and last_used_at older than the grace period are
+         locked, their objects deleted from storage, then the rows deleted.
+    A concurrent put of the same bytes waits on the row lock and re-uploads
+    afterwards, so it never gets back a URL whose object is being deleted.
+    dry_run recounts inside a transaction that is rolled back.
+    """
+    from app.database import engine
+
+    refs = (
+        "SELECT media_url AS url, count(*) AS n FROM content_items WHERE media_url IS NOT NULL GROUP BY media_url "
+        "UNION ALL "
+        "SELECT thumbnail_url, count(*) FROM content_items WHERE thumbnail_url IS NOT NULL GROUP BY thumbnail_url "
+        "UNION ALL "
+        "SELECT l.url, count(*) FROM ("
+        "SELECT jsonb_array_elements_text(CAST(media_urls AS jsonb)) AS url "
+        "FROM content_items WHERE ltrim(media_urls) LIKE '[%' "
+        "UNION ALL "
+        "SELECT btrim(regexp_split_to_table(media_urls, ','), ' \"') "
+        "FROM content_items WHERE media_urls IS NOT NULL AND ltrim(media_urls) NOT LIKE '[%'"
+        ") l WHERE l.url <> '' GROUP BY l.url"
+    )
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+
+    with engine.connect() as conn, conn.begin() as trans:
+        recounted = conn.execute(text(
+            f"UPDATE media_objects m SET refcount = r.n "
+            f"FROM (SELECT url, sum(n) AS n FROM ({refs}) u GROUP BY url) r "
+            f"WHERE m.url = r.url AND m.refcount <> r.n"
+        )).rowcount
+        recounted += conn.execute(text(
+            f"UPDATE media_objects SET refcount = 0 "
+            f"WHERE refcount <> 0 AND url NOT IN (SELECT url FROM ({refs}) u)"
+        )).rowcount
+
+        if dry_run:
+            row = conn.execute(
+                text("SELECT count(*), coalesce(sum(size), 0) FROM media_objects WHERE refcount = 0 AND last_used_at < :cutoff"),
+                {"cutoff": cutoff},
+            ).one()
+            trans.rollback()
+            return {"recounted": recounted, "deleted": 0, "would_delete": int(row[0]), "bytes": int(row[1])}
+
+    store = store or spaces_store()
+    deleted = freed = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT sha256, key, size FROM media_objects "
+                    "WHERE refcount = 0 AND last_used_at < :cutoff "
+                    "ORDER BY last_used_at LIMIT :n FOR UPDATE SKIP LOCKED"
+                ),
+                {"cutoff": cutoff, "n": batch_size},
+            ).all()
+            if not rows:
+                break
+
+            failed = set(store.delete_many([r.key for r in rows]))
+            gone = [r for r in rows if r.key not in failed]
+            if gone:
+                conn.execute(
+                    text("DELETE FROM media_objects WHERE sha256 IN :hashes").bindparams(bindparam("hashes", expanding=True)),
+                    {"hashes": [r.sha256 for r in gone]},
+                )
+            deleted += len(gone)
+            freed += sum(int(r.size) for r in gone)
+            if failed:
+                # leave the rest for the next run rather than spinning on the same keys
+                break
+
+    return {"recounted": recounted, "deleted": deleted, "bytes": freed}
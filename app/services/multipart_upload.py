@@ -0,0 +1,410 @@
+"""
+Streaming S3 multipart uploads (DigitalOcean Spaces, AWS S3, MinIO).
+
+The source is read part by part into a small pool of part-size buffers and up
+to `concurrency` parts are uploaded in parallel, so memory stays at
+(concurrency + 1) * part_size whatever the file size. A source that fits in
+one part is sent with a single PUT.
+
+Sources: any file-like object with readinto()/read() (upload_fileobj), or an
+async iterator of bytes chunks such as httpx's aiter_bytes() (upload_aiter).
+
+If an upload fails part-way, the multipart upload stays open and
+UploadInterrupted carries its upload_id. Calling again with upload_id= and the
+same source and part_size resumes after the last part S3 already holds;
+abort() discards it.
+
+Any boto3-compatible client works, so this can be exercised against a local
+MinIO: python -m app.scripts.check_multipart_upload
+"""
+from __future__ import annotations
+
+import asyncio
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, BinaryIO, Optional
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+MAX_PARTS = 10000
+PART_SIZE = max(MIN_PART_SIZE, int(os.getenv("MULTIPART_PART_SIZE_BYTES", str(16 * 1024 * 1024))))
+CONCURRENCY = max(1, int(os.getenv("MULTIPART_CONCURRENCY", "4")))
+
+
+class UploadInterrupted(RuntimeError):
+    """
+    A multipart upload stopped part-way; pass upload_id back to resume it.
+    """
+
+    def __init__(self, key: str, upload_id: str, parts_done: int, cause: BaseException):
+        super().__init__(f"multipart upload of {key} stopped after {parts_done} parts: {cause}")
+        self.key = key
+        self.upload_id = upload_id
+        self.parts_done = parts_done
+        self.cause = cause
+
+
+@dataclass
+class UploadResult:
+    key: str
+    size: int
+    etag: str = ""
+    upload_id: Optional[str] = None  # None when sent as a single PUT
+    parts: int = 1
+    resumed_parts: int = 0
+
+
+class _PartBody(io.RawIOBase):
+    """
+    Seekable read-only view over one part buffer, so botocore can stream and
+    retry it without copying the bytes.
+    """
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+class BufferPool:
+    """
+    At most `count` reusable part buffers, allocated on demand; acquire()
+    blocks while all of them are in flight.
+    """
+
+    def __init__(self, count: int, size: int):
+        self.size = size
+        self._free: "queue.Queue[bytearray]" = queue.Queue()
+        self._left = count
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bytearray:
+        with self._lock:
+            if self._free.empty() and self._left > 0:
+                self._left -= 1
+                return bytearray(self.size)
+        return self._free.get()
+
+    def release(self, buf: bytearray) -> None:
+        self._free.put(buf)
+
+
+class _Upload:
+    """
+    The S3 calls for one object; shared by the sync and async drivers.
+    """
+
+    def __init__(self, client: Any, bucket: str, key: str, content_type: str, acl: Optional[str], part_size: int):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.acl = acl
+        self.part_size = part_size
+        self.upload_id: Optional[str] = None
+
+    def _extra(self) -> dict[str, Any]:
+        extra: dict[str, Any] = {"ContentType": self.content_type}
+        if self.acl:
+            extra["ACL"] = self.acl
+        return extra
+
+    def put_single(self, view: memoryview) -> UploadResult:
+        r = self.client.put_object(Bucket=self.bucket, Key=self.key, Body=_PartBody(view), **self._extra())
+        return UploadResult(key=self.key, size=len(view), etag=(r.get("ETag") or "").strip('"'))
+
+    def start(self) -> str:
+        r = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key, **self._extra())
+        self.upload_id = r["UploadId"]
+        return self.upload_id
+
+    def resume(self, upload_id: str) -> list[dict[str, Any]]:
+        """
+        Parts 1..n already stored with exactly part_size bytes; anything after
+        the first gap or odd-sized part is sent again.
+        """
+        self.upload_id = upload_id
+        stored: dict[int, dict[str, Any]] = {}
+        marker = 0
+        while True:
+            r = self.client.list_parts(Bucket=self.bucket, Key=self.key, UploadId=upload_id, PartNumberMarker=marker)
+            for p in r.get("Parts") or []:
+                stored[int(p["PartNumber"])] = p
+            if not r.get("IsTruncated"):
+                break
+            marker = int(r["NextPartNumberMarker"])
+
+        done = []
+        n = 1
+        while n in stored and int(stored[n].get("Size") or 0) == self.part_size:
+            done.append({"PartNumber": n, "ETag": stored[n]["ETag"]})
+            n += 1
+        return done
+
+    def put_part(self, part_no: int, view: memoryview) -> dict[str, Any]:
+        r = self.client.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=part_no,
+            Body=_PartBody(view),
+        )
+        return {"PartNumber": part_no, "ETag": r["ETag"]}
+
+    def complete(self, parts: list[dict[str, Any]], size: int, resumed: int) -> UploadResult:
+        parts = sorted(parts, key=lambda p: p["PartNumber"])
+        r = self.client.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+        return UploadResult(
+            key=self.key,
+            size=size,
+            etag=(r.get("ETag") or "").strip('"'),
+            upload_id=self.upload_id,
+            parts=len(parts),
+            resumed_parts=resumed,
+        )
+
+
+def _fill(src: BinaryIO, buf: bytearray) -> int:
+    """
+    Reads until buf is full or src is exhausted; returns the byte count.
+    """
+    view = memoryview(buf)
+    readinto = getattr(src, "readinto", None)
+    n = 0
+    while n < len(buf):
+        if readinto is not None:
+            got = readinto(view[n:]) or 0
+        else:
+            chunk = src.read(len(buf) - n)
+            got = len(chunk) if chunk else 0
+            view[n:n + got] = chunk or b""
+        if not got:
+            break
+        n += got
+    return n
+
+
+def _skip(src: BinaryIO, nbytes: int) -> None:
+    seekable = getattr(src, "seekable", None)
+    if seekable is not None and seekable():
+        src.seek(nbytes, io.SEEK_CUR)
+        return
+    while nbytes > 0:
+        chunk = src.read(min(nbytes, 1024 * 1024))
+        if not chunk:
+            raise ValueError("source ended before the already uploaded parts")
+        nbytes -= len(chunk)
+
+
+def upload_fileobj(
+    client: Any,
+    bucket: str,
+    key: str,
+    src: BinaryIO,
+    *,
+    content_type: str = "application/octet-stream",
+    acl: Optional[str] = "public-read",
+    part_size: int = PART_SIZE,
+    concurrency: int = CONCURRENCY,
+    upload_id: Optional[str] = None,
+) -> UploadResult:
+    """
+    Streams a file-like object to bucket/key. Raises UploadInterrupted if a
+    multipart upload fails after it was started.
+    """
+    up = _Upload(client, bucket, key, content_type, acl, part_size)
+    pool = BufferPool(concurrency + 1, part_size)
+
+    done: list[dict[str, Any]] = []
+    if upload_id:
+        done = up.resume(upload_id)
+        _skip(src, len(done) * part_size)
+    resumed = len(done)
+
+    buf = pool.acquire()
+    n = _fill(src, buf)
+    if upload_id is None and n < part_size:
+        return up.put_single(memoryview(buf)[:n])
+    if upload_id is None:
+        up.start()
+
+    size = resumed * part_size
+    part_no = resumed + 1
+    futures = []
+    failed = threading.Event()
+    error: Optional[BaseException] = None
+
+    def _released(fut, b):
+        pool.release(b)
+        if fut.exception() is not None:
+            failed.set()
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as ex:
+        try:
+            while n and not failed.is_set():
+                if part_no > MAX_PARTS:
+                    raise ValueError(f"more than {MAX_PARTS} parts; raise part_size")
+                fut = ex.submit(up.put_part, part_no, memoryview(buf)[:n])
+                fut.add_done_callback(lambda f, b=buf: _released(f, b))
+                futures.append(fut)
+                size += n
+                part_no += 1
+                buf = pool.acquire()
+                n = _fill(src, buf)
+            pool.release(buf)
+        except BaseException as e:
+            error = e
+        wait(futures)
+
+    for fut in futures:
+        if fut.exception() is not None:
+            error = error or fut.exception()
+        else:
+            done.append(fut.result())
+    if error is not None:
+        raise UploadInterrupted(key, up.upload_id, len(done), error) from error
+
+    return up.complete(done, size, resumed)
+
+
+async def upload_aiter(
+    client: Any,
+    bucket: str,
+    key: str,
+    chunks: AsyncIterator[bytes],
+    *,
+    content_type: str = "application/octet-stream",
+    acl: Optional[str] = "public-read",
+    part_size: int = PART_SIZE,
+    concurrency: int = CONCURRENCY,
+    upload_id: Optional[str] = None,
+) -> UploadResult:
+    """
+    Async variant for chunk streams. The blocking S3 calls run on worker
+    threads; at most concurrency + 1 part buffers exist at once.
+    """
+    up = _Upload(client, bucket, key, content_type, acl, part_size)
+    slots = asyncio.Semaphore(concurrency + 1)
+    free: list[bytearray] = []
+
+    done: list[dict[str, Any]] = []
+    skip = 0
+    if upload_id:
+        done = await asyncio.to_thread(up.resume, upload_id)
+        skip = len(done) * part_size
+    resumed = len(done)
+
+    async def _parts():
+        """
+        Yields (buffer, length) for each part-size slice of the stream.
+        """
+        nonlocal skip
+        await slots.acquire()
+        buf = free.pop() if free else bytearray(part_size)
+        n = 0
+        async for chunk in chunks:
+            view = memoryview(chunk)
+            if skip:
+                dropped = min(skip, len(view))
+                view = view[dropped:]
+                skip -= dropped
+            while view:
+                take = min(len(view), part_size - n)
+                buf[n:n + take] = view[:take]
+                n += take
+                view = view[take:]
+                if n == part_size:
+                    yield buf, n
+                    await slots.acquire()
+                    buf = free.pop() if free else bytearray(part_size)
+                    n = 0
+        if skip:
+            raise ValueError("source ended before the already uploaded parts")
+        yield buf, n
+
+    def _release(buf: bytearray):
+        free.append(buf)
+        slots.release()
+
+    async def _send(part_no: int, buf: bytearray, n: int):
+        try:
+            return await asyncio.to_thread(up.put_part, part_no, memoryview(buf)[:n])
+        finally:
+            _release(buf)
+
+    size = resumed * part_size
+    part_no = resumed + 1
+    tasks: list[asyncio.Task] = []
+    error: Optional[BaseException] = None
+    try:
+        async for buf, n in _parts():
+            if not n:
+                _release(buf)
+                break
+            if part_no == 1 and upload_id is None:
+                if n < part_size:
+                    try:
+                        return await asyncio.to_thread(up.put_single, memoryview(buf)[:n])
+                    finally:
+                        _release(buf)
+                await asyncio.to_thread(up.start)
+            if part_no > MAX_PARTS:
+                _release(buf)
+                raise ValueError(f"more than {MAX_PARTS} parts; raise part_size")
+            tasks.append(asyncio.create_task(_send(part_no, buf, n)))
+            size += n
+            part_no += 1
+            if any(t.done() and t.exception() is not None for t in tasks[-concurrency:]):
+                break
+    except Exception as e:
+        error = e
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for r in results:
+        if isinstance(r, BaseException):
+            error = error or r
+        else:
+            done.append(r)
+
+    if up.upload_id is None:
+        if error is not None:
+            raise error
+        # empty stream
+        return await asyncio.to_thread(up.put_single, memoryview(b""))
+    if error is not None:
+        raise UploadInterrupted(key, up.upload_id, len(done), error) from error
+
+    return await asyncio.to_thread(up.complete, done, size, resumed)
+
+
+def abort(client: Any, bucket: str, key: str, upload_id: str) -> None:
+    client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
@@ -0,0 +1,159 @@
+"""
+One storage layer for every upload path: Spaces (spaces_storage,
+image_generator) and the generic S3 bucket (storage.py).
+
+An ObjectStore pairs a cached, pooled boto3 client (clients.py) with its
+bucket and public URL base. upload_many() sends a batch of objects over that
+shared client from a thread pool, so uploading a set of generated assets is
+bounded by bandwidth rather than by one request (and handshake) at a time.
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Iterable, Optional
+
+from app.services import multipart_upload
+from app.services.clients import STORAGE_MAX_POOL_CONNECTIONS, s3_client, spaces_client
+
+UPLOAD_CONCURRENCY = max(1, int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "8")))
+
+
+def _required(name: str) -> str:
+    v = os.getenv(name, "").strip()
+    if not v:
+        raise RuntimeError(f"{name} is not set")
+    return v
+
+
+@dataclass
+class Upload:
+    """
+    One object for upload_many: exactly one of data / path / source.
+    """
+    key: str
+    content_type: Optional[str] = None
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+    source: Optional[BinaryIO] = None
+    cache_control: Optional[str] = None
+
+
+@dataclass
+class UploadOutcome:
+    key: str
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ObjectStore:
+    def __init__(self, client: Any, bucket: str, public_base: str, acl: Optional[str] = "public-read"):
+        self.client = client
+        self.bucket = bucket
+        self.public_base = public_base.rstrip("/")
+        self.acl = acl
+
+    def url(self, key: str) -> str:
+        return f"{self.public_base}/{key}"
+
+    def _extra(self, content_type: str, cache_control: Optional[str] = None) -> dict[str, Any]:
+        extra: dict[str, Any] = {"ContentType": content_type}
+        if self.acl:
+            extra["ACL"] = self.acl
+        if cache_control:
+            extra["CacheControl"] = cache_control
+        return extra
+
+    def put_bytes(self, key: str, data: bytes, content_type: str, cache_control: Optional[str] = None) -> str:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, **self._extra(content_type, cache_control))
+        return self.url(key)
+
+    def put_file(self, path: str, key: str, content_type: Optional[str] = None) -> str:
+        content_type = content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"
+        with open(path, "rb") as f:
+            return self.put_stream(f, key, content_type)
+
+    def put_stream(self, source: BinaryIO, key: str, content_type: str, upload_id: Optional[str] = None) -> str:
+        multipart_upload.upload_fileobj(
+            self.client, self.bucket, key, source, content_type=content_type, acl=self.acl, upload_id=upload_id,
+        )
+        return self.url(key)
+
+    def delete_many(self, keys: list[str]) -> list[str]:
+        """
+        Deletes objects, 1000 keys per request. Returns the keys that could not be deleted.
+        """
+        failed: list[str] = []
+        for i in range(0, len(keys), 1000):
+            chunk = keys[i:i + 1000]
+            try:
+                r = self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": k} for k in chunk], "Quiet": True},
+                )
+            except Exception as e:
+                print(f"[object_storage] delete of {len(chunk)} objects failed: {e}")
+                failed.extend(chunk)
+                continue
+            failed.extend(err["Key"] for err in r.get("Errors") or [])
+        return failed
+
+    def put(self, up: Upload) -> str:
+        if up.data is not None:
+            return self.put_bytes(up.key, up.data, up.content_type or "application/octet-stream", up.cache_control)
+        if up.path is not None:
+            return self.put_file(up.path, up.key, up.content_type)
+        if up.source is not None:
+            return self.put_stream(up.source, up.key, up.content_type or "application/octet-stream")
+        raise ValueError(f"upload {up.key} has no data, path or source")
+
+    def upload_many(
+        self,
+        uploads: Iterable[Upload],
+        concurrency: int = UPLOAD_CONCURRENCY,
+        on_done: Optional[Callable[[UploadOutcome], None]] = None,
+    ) -> list[UploadOutcome]:
+        """
+        Uploads objects in parallel over the shared client. Returns one outcome
+        per upload, in input order; a failed object does not stop the others.
+        """
+        uploads = list(uploads)
+        if not uploads:
+            return []
+
+        def _one(up: Upload) -> UploadOutcome:
+            try:
+                out = UploadOutcome(key=up.key, url=self.put(up))
+            except Exception as e:
+                out = UploadOutcome(key=up.key, error=str(e))
+            if on_done is not None:
+                on_done(out)
+            return out
+
+        if len(uploads) == 1:
+            return [_one(uploads[0])]
+
+        # more threads than pooled connections would just queue on the pool
+        workers = max(1, min(concurrency, len(uploads), STORAGE_MAX_POOL_CONNECTIONS))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="upload") as pool:
+            return list(pool.map(_one, uploads))
+
+
+def spaces_store() -> ObjectStore:
+    """
+    DigitalOcean Spaces (DO_SPACES_* env).
+    """
+    return ObjectStore(spaces_client(), _required("DO_SPACES_BUCKET"), _required("DO_SPACES_PUBLIC_BASE"))
+
+
+def s3_store() -> ObjectStore:
+    """
+    The generic S3 bucket (S3_* env).
+    """
+    return ObjectStore(s3_client(), _required("S3_BUCKET_NAME"), _required("S3_PUBLIC_URL"))
@@ -0,0 +1,101 @@
+"""
+Single-pass parser for labeled-block model output:
+
+    CAPTION:
+    ...
+    HASHTAGS:
+    ...
+    IMAGE_PROMPT: / VIDEO_CONCEPT: / THUMBNAIL_PROMPT:
+    ...
+
+Each label is located once and each block is sliced out once: a block runs
+from its label to the next *different* label (same rule as the old
+extract_block, which re-split and copied the whole text per label pair).
+
+Benchmark: python -m app.scripts.bench_output_parser
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, Iterator
+
+LABELS = ("CAPTION", "HASHTAGS", "IMAGE_PROMPT", "VIDEO_CONCEPT", "THUMBNAIL_PROMPT")
+_MARKERS = tuple((label, f"{label}:") for label in LABELS)
+
+# **bold**, then *italic*, then `code` -> inner text. Separate passes on purpose:
+# nested markup (***x***, **`x`**) relies on each pass seeing the previous one's output
+_MD_PASSES = (
+    re.compile(r"\*\*(.*?)\*\*"),
+    re.compile(r"\*(.*?)\*"),
+    re.compile(r"`(.*?)`"),
+)
+
+
+def strip_markdown(s: str) -> str:
+    if not s:
+        return s
+    for rx in _MD_PASSES:
+        s = rx.sub(r"\1", s)
+    return s
+
+
+def iter_blocks(text: str) -> Iterator[tuple[str, int, int]]:
+    """
+    Yields (label, start, end) spans of each label's body, in text order.
+    Only the first occurrence of a label counts; a block ends where the next
+    different label begins. Bounded str.find() calls, no intermediate copies.
+    """
+    text = text or ""
+    found = []
+    for label, marker in _MARKERS:
+        i = text.find(marker)
+        if i >= 0:
+            found.append((i, label, i + len(marker)))
+    found.sort()
+
+    n = len(text)
+    for _, label, start in found:
+        end = n
+        for other, marker in _MARKERS:
+            if other == label:
+                continue
+            j = text.find(marker, start, end)
+            if j >= 0:
+                end = j
+        yield label, start, end
+
+
+def split_blocks(text: str) -> Dict[str, str]:
+    """
+    {label: stripped body} for every label present in text.
+    """
+    text = (text or "").strip()
+    return {label: text[start:end].strip() for label, start, end in iter_blocks(text)}
+
+
+def parse_output(text: str, content_type: str = "text") -> Dict[str, str]:
+    """
+    Parses the labeled-block model output into body_text / hashtags / media_prompt.
+    """
+    blocks = split_blocks(text)
+
+    caption = blocks.get("CAPTION", "")
+    hashtags = blocks.get("HASHTAGS", "")
+
+    media_prompt = ""
+    if content_type == "image":
+        media_prompt = blocks.get("IMAGE_PROMPT", "")
+    elif content_type == "video":
+        concept = blocks.get("VIDEO_CONCEPT", "")
+        thumb = blocks.get("THUMBNAIL_PROMPT", "")
+        # keep as one field for now (frontend can display later)
+        media_prompt = f"VIDEO_CONCEPT: {concept}\nTHUMBNAIL_PROMPT: {thumb}".strip()
+
+    # Final cleanup
+    hashtags = " ".join(hashtags.split())
+
+    out: Dict[str, str] = {"body_text": caption, "hashtags": hashtags}
+    if media_prompt:
+        out["media_prompt"] = media_prompt
+
+    return out
@@ -0,0 +1,292 @@
+"""
+Versioned prompt templates for draft generation.
+
+A PromptTemplate holds every text block the generator sends. Instruction
+blocks are rendered once per (version, platform, brand, content_type) and
+brand context blocks are memoized per brand-profile hash (LRU), so a batch of
+items for the same brand does not rebuild or re-serialize them per item.
+
+The template version is part of the LLM cache key and of the metrics rows, so
+a new version never replays outputs of an older one and A/B runs can be compared.
+Add a new version by registering another PromptTemplate in TEMPLATES.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Optional
+
+DEFAULT_VERSION = os.getenv("PROMPT_TEMPLATE_VERSION", "v1").strip() or "v1"
+CONTEXT_CACHE_SIZE = int(os.getenv("PROMPT_CONTEXT_CACHE_SIZE", "256"))
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    version: str
+    base: str                              # {brand_id}
+    platform_styles: dict[str, str]
+    default_style: str
+    content_type_rules: dict[str, str]
+    default_rules: str
+    brand_context: str                     # {brand_id} {summary} {tone} {audiences} {services} {positioning} {cta} {colors}
+    user_input: str                        # {brand_ctx} {topic_text}
+    topic_note: str
+    topic_user_input: str                  # {brand_ctx} {topic_text} {sections}
+    variant_header: str                    # {platform} {content_type}
+    block_formats: dict[str, str] = field(default_factory=dict)
+
+
+_FB_IG_STYLE = """
+Facebook/Instagram style:
+- punchy, short-form
+- 60–150 words
+- strong first line hook
+- include 5–12 relevant hashtags at the end (not spam)
+""".strip()
+
+_TEXT_BLOCK = "CAPTION:\n<caption text>\n\nHASHTAGS:\n<hashtags line, either empty or starting with #>"
+
+V1 = PromptTemplate(
+    version="v1",
+    base="""
+You are a senior social media copywriter for {brand_id}.
+Write ORIGINAL, non-generic marketing content based on the topic and brand context.
+No fluff. Clear hook + value + CTA.
+Avoid vague claims. Be concrete.
+""".strip(),
+    platform_styles={
+        "linkedin": """
+LinkedIn style:
+- professional, insight-driven
+- 120–220 words
+- include 3–5 bullet points if helpful
+- no hashtags OR max 3 hashtags at the end
+""".strip(),
+        "facebook": _FB_IG_STYLE,
+        "instagram": _FB_IG_STYLE,
+    },
+    default_style="Generic social style. Keep it clear and direct.",
+    content_type_rules={
+        "text": """
+Content type: TEXT
+Return a caption and hashtags only.
+""".strip(),
+        "image": """
+Content type: IMAGE
+Return:
+1) caption
+2) hashtags
+3) IMAGE_PROMPT (a single detailed prompt for generating the image that matches the caption + brand style)
+""".strip(),
+        "video": """
+Content type: VIDEO
+Return:
+1) caption
+2) hashtags
+3) VIDEO_CONCEPT (short concept: scene + camera + on-screen text + duration)
+4) THUMBNAIL_PROMPT (prompt for a thumbnail image)
+""".strip(),
+    },
+    default_rules="Return caption and hashtags.",
+    brand_context="""
+BRAND CONTEXT (use this to avoid generic writing):
+Brand: {brand_id}
+
+Brand summary:
+{summary}
+
+Tone tags: {tone}
+Target audiences: {audiences}
+Products/Services: {services}
+Positioning / Value props: {positioning}
+CTA style/examples: {cta}
+Brand colors: {colors}
+""".strip(),
+    # ✅ Ask for a strict, parseable output (prevents messy splits)
+    user_input="""
+{brand_ctx}
+
+TOPIC:
+{topic_text}
+
+OUTPUT FORMAT (MUST FOLLOW EXACTLY):
+CAPTION:
+<caption text>
+
+HASHTAGS:
+<hashtags line, either empty or starting with #>
+
+IF IMAGE, ALSO INCLUDE:
+IMAGE_PROMPT:
+<prompt>
+
+IF VIDEO, ALSO INCLUDE:
+VIDEO_CONCEPT:
+<concept>
+THUMBNAIL_PROMPT:
+<prompt>
+""".strip(),
+    topic_note=(
+        "You are writing several variants of the same topic. Write each variant "
+        "separately, following the style of its platform and the rules of its content type."
+    ),
+    topic_user_input="""
+{brand_ctx}
+
+TOPIC:
+{topic_text}
+
+OUTPUT FORMAT (MUST FOLLOW EXACTLY):
+One section per variant, in this order. Start each section with its header line exactly as shown.
+
+{sections}
+""".strip(),
+    variant_header="=== VARIANT: {platform}/{content_type} ===",
+    block_formats={
+        "text": _TEXT_BLOCK,
+        "image": _TEXT_BLOCK + "\n\nIMAGE_PROMPT:\n<prompt>",
+        "video": _TEXT_BLOCK + "\n\nVIDEO_CONCEPT:\n<concept>\nTHUMBNAIL_PROMPT:\n<prompt>",
+    },
+)
+
+TEMPLATES: dict[str, PromptTemplate] = {V1.version: V1}
+
+
+def get_template(version: Optional[str] = None) -> PromptTemplate:
+    v = version or DEFAULT_VERSION
+    tpl = TEMPLATES.get(v)
+    if tpl is None:
+        raise ValueError(f"Unknown prompt template version: {v}")
+    return tpl
+
+
+@lru_cache(maxsize=1024)
+def instructions_for(platform: str, brand_id: str, content_type: str, version: Optional[str] = None) -> str:
+    tpl = get_template(version)
+    return "\n\n".join([
+        tpl.base.format(brand_id=brand_id),
+        tpl.platform_styles.get(platform, tpl.default_style),
+        tpl.content_type_rules.get(content_type, tpl.default_rules),
+    ]).strip()
+
+
+@lru_cache(maxsize=1024)
+def topic_instructions_for(brand_id: str, variants: tuple[tuple[str, str], ...], version: Optional[str] = None) -> str:
+    tpl = get_template(version)
+    platforms = list(dict.fromkeys(p for p, _ in variants))
+    ctypes = list(dict.fromkeys(ct for _, ct in variants))
+
+    parts = [tpl.base.format(brand_id=brand_id)]
+    parts += [tpl.platform_styles.get(p, tpl.default_style) for p in platforms]
+    parts += [tpl.content_type_rules.get(ct, tpl.default_rules) for ct in ctypes]
+    parts.append(tpl.topic_note)
+    return "\n\n".join(parts).strip()
+
+
+def topic_sections(variants: list[tuple[str, str]], version: Optional[str] = None) -> str:
+    tpl = get_template(version)
+    return "\n\n".join(
+        tpl.variant_header.format(platform=p, content_type=ct) + "\n" + tpl.block_formats.get(ct, tpl.block_formats["text"])
+        for p, ct in variants
+    )
+
+
+# ---------------------------------------------------------------------------
+# brand context blocks
+# ---------------------------------------------------------------------------
+
+_contexts: "OrderedDict[tuple[str, str], str]" = OrderedDict()
+_contexts_lock = threading.Lock()
+
+
+def _safe_list(x):
+    if not x:
+        return []
+    if isinstance(x, list):
+        return x
+    return [x]
+
+
+def profile_hash(
+    brand_id: str,
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+) -> str:
+    """
+    Version hash of a brand profile: changes whenever the summary or the JSON does.
+    """
+    h = hashlib.sha256()
+    h.update((brand_id or "").encode("utf-8"))
+    h.update(b"\x00")
+    h.update((brand_profile_summary or "").encode("utf-8"))
+    h.update(b"\x00")
+    h.update(json.dumps(brand_profile_json, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _render_brand_context(
+    tpl: PromptTemplate,
+    brand_id: str,
+    brand_profile_summary: Optional[str],
+    brand_profile_json: Optional[dict[str, Any]],
+) -> str:
+    tone_tags = []
+    services = []
+    audiences = []
+    positioning = []
+    cta_style = None
+    colors = []
+
+    if isinstance(brand_profile_json, dict):
+        tone_tags = _safe_list((brand_profile_json.get("tone") or {}).get("tags"))
+        services = _safe_list(brand_profile_json.get("products_services"))
+        audiences = _safe_list(brand_profile_json.get("audiences"))
+        positioning = _safe_list((brand_profile_json.get("positioning") or {}).get("value_props"))
+        cta_style = brand_profile_json.get("cta_style")
+        colors = _safe_list(brand_profile_json.get("colors"))
+
+    def _join(xs):
+        return ", ".join([str(x) for x in xs]) if xs else "(not provided)"
+
+    return tpl.brand_context.format(
+        brand_id=brand_id,
+        summary=brand_profile_summary or "(No summary provided)",
+        tone=_join(tone_tags),
+        audiences=_join(audiences),
+        services=_join(services),
+        positioning=_join(positioning),
+        cta=json.dumps(cta_style, ensure_ascii=False) if cta_style else "(not provided)",
+        colors=_join(colors),
+    ).strip()
+
+
+def brand_context_block(
+    brand_id: str,
+    brand_profile_summary: Optional[str] = None,
+    brand_profile_json: Optional[dict[str, Any]] = None,
+    version: Optional[str] = None,
+) -> str:
+    """
+    Short brand context block for the prompt, memoized per (version, profile hash).
+    """
+    tpl = get_template(version)
+    key = (tpl.version, profile_hash(brand_id, brand_profile_summary, brand_profile_json))
+
+    with _contexts_lock:
+        block = _contexts.get(key)
+        if block is not None:
+            _contexts.move_to_end(key)
+            return block
+
+    block = _render_brand_context(tpl, brand_id, brand_profile_summary, brand_profile_json)
+
+    with _contexts_lock:
+        _contexts[key] = block
+        while len(_contexts) > CONTEXT_CACHE_SIZE:
+            _contexts.popitem(last=False)
+    return block
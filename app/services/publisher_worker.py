@@ -1,12 +1,31 @@
-from datetime import datetime, timezone
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import select, asc
+from sqlalchemy import select, asc, or_
+import asyncio
 import os
+import random
+import uuid
 
 from app.models.content_item import ContentItem
-from app.services.buffer_client import create_update, BufferError
+from app.services.buffer_client import (
+    create_update, create_update_async, close_async_client, find_update, find_update_async, BufferError,
+)
+from app.services.state_machine import ensure_transition
+from app.services.due_scheduler import notify_due_changed
+from app.services.rate_limiter import acquire, acquire_async
 
 RETRY_LIMIT = 3
+BACKOFF_BASE_SECONDS = 60.0
+BACKOFF_MAX_SECONDS = 3600.0
+BACKOFF_FACTOR = 2.0
+
+# max in-flight Buffer calls per platform for the async path
+DEFAULT_CONCURRENCY = int(os.getenv("PUBLISHER_CONCURRENCY", "8"))
+
+# a claimed item not finished within this long is assumed orphaned (worker died) and rescheduled;
+# keep it well above the time one batch takes
+CLAIM_LEASE_SECONDS = float(os.getenv("PUBLISHER_CLAIM_LEASE_SECONDS", "900"))
 
 def buffer_profile_for_platform(platform_id: str) -> str | None:
     # platform_id is now FK -> 'facebook','instagram','linkedin' etc
@@ -19,58 +38,329 @@ def buffer_profile_for_platform(platform_id: str) -> str | None:
         return os.getenv("BUFFER_PROFILE_ID_INSTAGRAM")
     return None
 
-def fetch_due(db: Session, limit: int = 20):
+@dataclass(frozen=True)
+class RetryPolicy:
+    limit: int
+    base_seconds: float
+    max_seconds: float
+    factor: float
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """
+        Exponential backoff with jitter for the given (1-based) failed attempt:
+        half the capped delay is fixed, the other half is random.
+        """
+        delay = min(self.max_seconds, self.base_seconds * (self.factor ** max(0, attempt - 1)))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+def _env_for_platform(name: str, platform_id: str, default: float) -> float:
+    # PUBLISH_RETRY_LIMIT_LINKEDIN beats PUBLISH_RETRY_LIMIT beats the module default
+    for key in (f"{name}_{(platform_id or '').upper()}", name):
+        v = os.getenv(key)
+        if v:
+            try:
+                return float(v)
+            except ValueError:
+                pass
+    return default
+
+def retry_policy_for_platform(platform_id: str) -> RetryPolicy:
+    return RetryPolicy(
+        limit=max(1, int(_env_for_platform("PUBLISH_RETRY_LIMIT", platform_id, RETRY_LIMIT))),
+        base_seconds=_env_for_platform("PUBLISH_BACKOFF_BASE_SECONDS", platform_id, BACKOFF_BASE_SECONDS),
+        max_seconds=_env_for_platform("PUBLISH_BACKOFF_MAX_SECONDS", platform_id, BACKOFF_MAX_SECONDS),
+        factor=_env_for_platform("PUBLISH_BACKOFF_FACTOR", platform_id, BACKOFF_FACTOR),
+    )
+
+def concurrency_for_platform(platform_id: str) -> int:
+    # e.g. PUBLISHER_CONCURRENCY_LINKEDIN=2 overrides the default for one platform
+    v = os.getenv(f"PUBLISHER_CONCURRENCY_{(platform_id or '').upper()}")
+    try:
+        return max(1, int(v)) if v else DEFAULT_CONCURRENCY
+    except ValueError:
+        return DEFAULT_CONCURRENCY
+
+def _due_query(limit: int):
     now = datetime.now(timezone.utc)
-    q = (
+    return (
         select(ContentItem)
         .where(ContentItem.status == "SCHEDULED")
         .where(ContentItem.scheduled_at.isnot(None))
         .where(ContentItem.scheduled_at <= now)
+        .where(or_(ContentItem.next_attempt_at.is_(None), ContentItem.next_attempt_at <= now))
         .order_by(asc(ContentItem.scheduled_at))
         .limit(limit)
     )
-    return db.execute(q).scalars().all()
+
+def fetch_due(db: Session, limit: int = 20):
+    return db.execute(_due_query(limit)).scalars().all()
+
+def release_stale_claims(db: Session, lease_seconds: float = CLAIM_LEASE_SECONDS) -> int:
+    """
+    Moves items whose worker claim outlived the lease back to SCHEDULED (caller commits).
+
+    Only worker-claimed rows (publish_claimed_at set) are touched; manual / Make
+    hand-offs in QUEUED are left alone. publish_attempted_at is kept, so the
+    next claim reconciles with Buffer before sending again.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    q = (
+        select(ContentItem)
+        .where(ContentItem.status == "QUEUED")
+        .where(ContentItem.publish_claimed_at.isnot(None))
+        .where(ContentItem.publish_claimed_at < cutoff)
+        .with_for_update(skip_locked=True)
+    )
+    items = db.execute(q).scalars().all()
+
+    now = datetime.utcnow()
+    for it in items:
+        ensure_transition(it.status, "SCHEDULED")
+        it.status = "SCHEDULED"
+        it.publish_claimed_at = None
+        it.updated_at = now
+
+    if items:
+        print(f"[publisher] released {len(items)} stale claim(s)", flush=True)
+        notify_due_changed(db, items)
+    return len(items)
+
+
+def claim_due(db: Session, limit: int = 20) -> list[ContentItem]:
+    """
+    Claims a batch of due text items for this worker.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED and moved SCHEDULED -> QUEUED
+    (stamped with publish_claimed_at) in the same transaction, so concurrent
+    workers never see the same item. Claims left behind by a dead worker are
+    released first.
+    """
+    release_stale_claims(db)
+
+    # Text-first V1: only text items are published through Buffer
+    q = _due_query(limit).where(ContentItem.content_type == "text").with_for_update(skip_locked=True)
+    items = db.execute(q).scalars().all()
+
+    now = datetime.utcnow()
+    for it in items:
+        ensure_transition(it.status, "QUEUED")
+        it.status = "QUEUED"
+        it.publish_claimed_at = now
+        it.updated_at = now
+
+    db.commit()
+    return list(items)
+
+def _record_failure(it: ContentItem, error: str) -> None:
+    policy = retry_policy_for_platform(it.platform)
+    now = datetime.utcnow()
+
+    it.last_error = error
+    it.attempt_count = (it.attempt_count or 0) + 1
+    it.updated_at = now
+    it.publish_claimed_at = None
+
+    # QUEUED -> FAILED once out of retries, otherwise back to SCHEDULED after a backoff
+    if it.attempt_count >= policy.limit:
+        it.status = "FAILED"
+        it.next_attempt_at = None
+    else:
+        it.status = "SCHEDULED"
+        it.next_attempt_at = now + timedelta(seconds=policy.backoff_seconds(it.attempt_count))
+
+def _prepare(it: ContentItem) -> tuple[str, str]:
+    """
+    Returns (profile_id, text) for a claimed item, or raises BufferError.
+    """
+    profile_id = buffer_profile_for_platform(it.platform)
+    if not profile_id:
+        raise BufferError(f"No Buffer profile configured for platform={it.platform}")
+
+    text = (it.body_text or "").strip()
+    if not text:
+        raise BufferError("Empty body_text; cannot publish")
+
+    return profile_id, text
+
+def _begin_attempt(it: ContentItem) -> str:
+    """
+    Stores the idempotency key (stable across retries) and marks a send as in flight.
+    Caller must commit before making the outbound call.
+    """
+    if not it.publish_idempotency_key:
+        it.publish_idempotency_key = uuid.uuid4().hex
+    it.publish_attempted_at = datetime.utcnow()
+    return it.publish_idempotency_key
+
+def _reconcile(it: ContentItem, profile_id: str, text: str) -> dict | None:
+    """
+    If an earlier send may have landed, asks Buffer for a matching update first.
+    Returns a create_update-style response when a receipt is found.
+    """
+    if it.publish_attempted_at is None:
+        return None
+    try:
+        found = find_update(profile_id, text)
+    except Exception as e:
+        # can't tell whether the last send landed; back off rather than risk a duplicate
+        raise BufferError(f"Could not reconcile previous attempt: {e}")
+    return {"updates": [found]} if found else None
+
+async def _reconcile_async(it: ContentItem, profile_id: str, text: str) -> dict | None:
+    """
+    Async twin of _reconcile() over the pooled client.
+    """
+    if it.publish_attempted_at is None:
+        return None
+    try:
+        found = await find_update_async(profile_id, text)
+    except Exception as e:
+        raise BufferError(f"Could not reconcile previous attempt: {e}")
+    return {"updates": [found]} if found else None
+
+def _record_success(it: ContentItem, res: dict) -> None:
+    # Buffer returns update id
+    update_id = res.get("updates", [{}])[0].get("id") if isinstance(res.get("updates"), list) else None
+
+    it.buffer_update_id = update_id
+    it.status = "PUBLISHED"      # V1 assumption: Buffer accepted update
+    it.published_at = datetime.now(timezone.utc)
+    it.last_error = None
+    it.next_attempt_at = None
+    it.publish_attempted_at = None
+    it.publish_claimed_at = None
+
+def publish_item(db: Session, it: ContentItem) -> bool:
+    """
+    Publishes one claimed (QUEUED) item to Buffer and commits the result.
+    Returns True if Buffer accepted the update.
+    """
+    try:
+        profile_id, text = _prepare(it)
+
+        prior = _reconcile(it, profile_id, text)
+        if prior:
+            _record_success(it, prior)
+            db.commit()
+            return True
+
+        key = _begin_attempt(it)
+        scheduled_at_iso = it.scheduled_at.isoformat()
+        platform = it.platform
+        db.commit()
+
+        acquire("buffer", platform)
+        res = create_update(profile_id=profile_id, text=text, scheduled_at_iso=scheduled_at_iso, idempotency_key=key)
+        _record_success(it, res)
+        db.commit()
+        return True
+
+    except Exception as e:
+        _record_failure(it, str(e))
+        notify_due_changed(db, [it])
+        db.commit()
+        return False
 
 def publish_due(db: Session, limit: int = 20):
-    due_items = fetch_due(db, limit=limit)
+    due_items = claim_due(db, limit=limit)
     published = 0
     failed = 0
 
     for it in due_items:
-        # Text-first V1: skip image/video
-        if it.content_type != "text":
-            continue
-
-        profile_id = buffer_profile_for_platform(it.platform)
-        if not profile_id:
-            it.last_error = f"No Buffer profile configured for platform={it.platform}"
-            it.attempt_count = (it.attempt_count or 0) + 1
-            if it.attempt_count >= RETRY_LIMIT:
-                it.status = "FAILED"
+        if publish_item(db, it):
+            published += 1
+        else:
             failed += 1
-            continue
 
+    return {"due": len(due_items), "published": published, "failed": failed}
+
+async def publish_due_async(db: Session, limit: int = 100):
+    """
+    Claims a batch and sends it to Buffer concurrently over one pooled client.
+
+    In-flight calls are capped per platform (concurrency_for_platform). Only the
+    HTTP calls run concurrently; DB writes stay on this coroutine and are
+    committed per item as each call finishes.
+    """
+    due_items = claim_due(db, limit=limit)
+    if not due_items:
+        return {"due": 0, "published": 0, "failed": 0}
+
+    sems: dict[str, asyncio.Semaphore] = {}
+    for it in due_items:
+        if it.platform not in sems:
+            sems[it.platform] = asyncio.Semaphore(concurrency_for_platform(it.platform))
+
+    # items with an earlier unconfirmed send are checked against Buffer first,
+    # concurrently and under the same per-platform caps as the sends
+    async def _check(it: ContentItem):
         try:
-            text = (it.body_text or "").strip()
-            if not text:
-                raise BufferError("Empty body_text; cannot publish")
-
-            res = create_update(profile_id=profile_id, text=text, scheduled_at_iso=it.scheduled_at.isoformat())
-            # Buffer returns update id
-            update_id = res.get("updates", [{}])[0].get("id") if isinstance(res.get("updates"), list) else None
-
-            it.buffer_update_id = update_id
-            it.status = "PUBLISHED"      # V1 assumption: Buffer accepted update
-            it.published_at = datetime.now(timezone.utc)
-            it.last_error = None
-            published += 1
+            profile_id, text = _prepare(it)
+            if it.publish_attempted_at is None:
+                return it, profile_id, text, None, None
+            async with sems[it.platform]:
+                await acquire_async("buffer", it.platform)
+                return it, profile_id, text, await _reconcile_async(it, profile_id, text), None
+        except Exception as e:
+            return it, "", None, None, e
+
+    checked = await asyncio.gather(*(_check(it) for it in due_items))
 
+    # read everything we need up front; per-item commits below expire the ORM rows.
+    # Idempotency keys for the whole batch are stored in one commit before any send.
+    prepared: list[tuple] = []
+    already_published = 0
+    for it, profile_id, text, prior, err in checked:
+        platform = it.platform
+        if err is not None:
+            prepared.append((it, platform, "", None, None, None, err))
+            continue
+        if prior:
+            _record_success(it, prior)
+            already_published += 1
+            continue
+        key = _begin_attempt(it)
+        scheduled_at_iso = it.scheduled_at.isoformat() if it.scheduled_at else None
+        prepared.append((it, platform, profile_id, text, key, scheduled_at_iso, None))
+    db.commit()
+
+    async def _send(it: ContentItem, platform: str, profile_id: str, text: str | None, key: str | None, scheduled_at_iso: str | None, err: Exception | None):
+        if err is not None:
+            return it, None, err
+        try:
+            async with sems[platform]:
+                await acquire_async("buffer", platform)
+                res = await create_update_async(profile_id=profile_id, text=text, scheduled_at_iso=scheduled_at_iso, idempotency_key=key)
+            return it, res, None
         except Exception as e:
-            it.last_error = str(e)
-            it.attempt_count = (it.attempt_count or 0) + 1
-            if it.attempt_count >= RETRY_LIMIT:
-                it.status = "FAILED"
+            return it, None, e
+
+    sends = [_send(*row) for row in prepared]
+
+    published = already_published
+    failed = 0
+
+    for fut in asyncio.as_completed(sends):
+        it, res, err = await fut
+        if err is None:
+            _record_success(it, res)
+            published += 1
+        else:
+            _record_failure(it, str(err))
+            notify_due_changed(db, [it])
             failed += 1
+        db.commit()
 
-    db.commit()
     return {"due": len(due_items), "published": published, "failed": failed}
+
+def run_publish_due_async(db: Session, limit: int = 100):
+    """
+    Sync entrypoint for scripts: runs one async batch and closes the pooled client.
+    """
+    async def _run():
+        try:
+            return await publish_due_async(db, limit=limit)
+        finally:
+            await close_async_client()
+
+    return asyncio.run(_run())
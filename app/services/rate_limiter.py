@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+# provider -> (tokens per minute, burst size)
+DEFAULT_LIMITS: dict[str, tuple[float, float]] = {
+    "buffer": (60.0, 10.0),
+    "make": (30.0, 5.0),
+    "make_media": (30.0, 5.0),
+    "openai": (300.0, 20.0),
+}
+FALLBACK_LIMIT = (60.0, 10.0)
+
+# Buffer limits are per profile, i.e. per platform. OpenAI (one account) and each
+# Make webhook are one upstream limit, so they get one bucket whatever platform is passed.
+PER_PLATFORM_PROVIDERS = {"buffer"}
+
+# postgres (shared across processes) | memory (this process only) | off
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "postgres").strip().lower()
+MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "120"))
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+def _scope(provider: str, platform: str | None) -> str | None:
+    return platform if (provider or "").strip().lower() in PER_PLATFORM_PROVIDERS else None
+
+
+def bucket_key(provider: str, platform: str | None = None) -> str:
+    provider = (provider or "").strip().lower()
+    platform = (_scope(provider, platform) or "").strip().lower()
+    return f"{provider}:{platform}" if platform else provider
+
+
+def _env_float(name: str) -> float | None:
+    v = os.getenv(name)
+    if not v:
+        return None
+    try:
+        return float(v)
+    except ValueError:
+        return None
+
+
+def limits_for(provider: str, platform: str | None = None) -> tuple[float, float]:
+    """
+    Returns (tokens per second, burst) for a bucket.
+    Env overrides, most specific first:
+      RATE_LIMIT_<PROVIDER>_<PLATFORM>_PER_MINUTE / _BURST
+      RATE_LIMIT_<PROVIDER>_PER_MINUTE / _BURST
+    """
+    per_min, burst = DEFAULT_LIMITS.get((provider or "").lower(), FALLBACK_LIMIT)
+    platform = _scope(provider, platform)
+
+    prefixes = [f"RATE_LIMIT_{provider.upper()}"]
+    if platform:
+        prefixes.insert(0, f"RATE_LIMIT_{provider.upper()}_{platform.upper()}")
+
+    for prefix in reversed(prefixes):
+        per_min = _env_float(f"{prefix}_PER_MINUTE") or per_min
+        burst = _env_float(f"{prefix}_BURST") or burst
+
+    return max(per_min, 0.001) / 60.0, max(burst, 1.0)
+
+
+class TokenBucket:
+    """
+    In-process token bucket, used when Postgres isn't available or RATE_LIMIT_BACKEND=memory.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self, cost: float = 1.0) -> float:
+        """
+        Takes cost tokens if available and returns 0, otherwise returns seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= cost:
+                self.tokens -= cost
+                return 0.0
+            return (cost - self.tokens) / self.rate
+
+
+_local_buckets: dict[str, TokenBucket] = {}
+_local_lock = threading.Lock()
+_fallback_logged = False
+
+
+def _local_try_take(key: str, rate: float, burst: float, cost: float) -> float:
+    with _local_lock:
+        b = _local_buckets.get(key)
+        if b is None:
+            b = _local_buckets[key] = TokenBucket(rate, burst)
+    return b.try_take(cost)
+
+
+def _pg_try_take(key: str, rate: float, burst: float, cost: float) -> float:
+    # import here so the limiter stays usable (memory backend) without a DB configured
+    from app.database import engine
+
+    # advisory lock serializes all processes on this bucket for the length of the
+    # transaction; elapsed time comes from the DB clock so hosts can't disagree
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": key})
+        row = conn.execute(
+            text(
+                "SELECT tokens, EXTRACT(EPOCH FROM (clock_timestamp() AT TIME ZONE 'UTC' - updated_at)) "
+                "FROM rate_limit_buckets WHERE key = :k"
+            ),
+            {"k": key},
+        ).first()
+
+        if row is None:
+            tokens = burst
+        else:
+            tokens = min(burst, float(row[0]) + max(0.0, float(row[1] or 0)) * rate)
+
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+
+        conn.execute(
+            text(
+                "INSERT INTO rate_limit_buckets (key, tokens, updated_at) "
+                "VALUES (:k, :t, clock_timestamp() AT TIME ZONE 'UTC') "
+                "ON CONFLICT (key) DO UPDATE SET tokens = EXCLUDED.tokens, updated_at = EXCLUDED.updated_at"
+            ),
+            {"k": key, "t": tokens},
+        )
+    return wait
+
+
+def _try_take(key: str, rate: float, burst: float, cost: float) -> float:
+    global _fallback_logged
+    if BACKEND == "postgres":
+        try:
+            return _pg_try_take(key, rate, burst, cost)
+        except Exception as e:
+            # once per process, not once per call
+            if not _fallback_logged:
+                _fallback_logged = True
+                print(f"[rate_limiter] postgres bucket unavailable, using in-process fallback: {e}")
+    return _local_try_take(key, rate, burst, cost)
+
+
+def acquire(provider: str, platform: str | None = None, cost: float = 1.0, max_wait: float | None = None) -> None:
+    """
+    Blocks until a token is available for (provider, platform).
+    Raises RateLimitTimeout if that takes longer than max_wait seconds.
+    """
+    if BACKEND == "off":
+        return
+
+    key = bucket_key(provider, platform)
+    rate, burst = limits_for(provider, platform)
+    deadline = time.monotonic() + (MAX_WAIT_SECONDS if max_wait is None else max_wait)
+
+    while True:
+        wait = _try_take(key, rate, burst, cost)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(f"Rate limit wait for {key} exceeded")
+        time.sleep(wait)
+
+
+async def acquire_async(provider: str, platform: str | None = None, cost: float = 1.0, max_wait: float | None = None) -> None:
+    """
+    Async version of acquire(): the DB round-trip runs in a thread and waiting doesn't block the loop.
+    """
+    if BACKEND == "off":
+        return
+
+    key = bucket_key(provider, platform)
+    rate, burst = limits_for(provider, platform)
+    deadline = time.monotonic() + (MAX_WAIT_SECONDS if max_wait is None else max_wait)
+
+    while True:
+        wait = await asyncio.to_thread(_try_take, key, rate, burst, cost)
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise RateLimitTimeout(f"Rate limit wait for {key} exceeded")
+        await asyncio.sleep(wait)
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import os
 import uuid
-from typing import Optional
+from typing import Any, AsyncIterator, BinaryIO, Iterable, Optional
 
-import boto3
-from botocore.client import Config
+from app.services import media_index, multipart_upload
+from app.services.clients import spaces_client
+from app.services.object_storage import Upload, UploadOutcome, spaces_store
 
 
 def _required(name: str) -> str:
@@ -15,19 +16,20 @@ def _required(name: str) -> str:
     return v
 
 
+# lifetime of presigned upload URLs handed to Make
+PRESIGN_EXPIRES_SECONDS = int(os.getenv("DO_SPACES_PRESIGN_EXPIRES_SECONDS", "3600"))
+
+
 def _spaces_client():
-    key = _required("DO_SPACES_KEY")
-    secret = _required("DO_SPACES_SECRET")
-    endpoint = _required("DO_SPACES_ENDPOINT")
-
-    return boto3.client(
-        "s3",
-        region_name=os.getenv("DO_SPACES_REGION", "fra1"),
-        endpoint_url=endpoint,
-        aws_access_key_id=key,
-        aws_secret_access_key=secret,
-        config=Config(signature_version="s3v4"),
-    )
+    return spaces_client()
+
+
+def new_object_key(key_prefix: str = "content", filename_ext: str = "png") -> str:
+    return f"{key_prefix}/{uuid.uuid4().hex}.{filename_ext.lstrip('.')}"
+
+
+def public_url(obj_key: str) -> str:
+    return f"{_required('DO_SPACES_PUBLIC_BASE').rstrip('/')}/{obj_key}"
 
 
 def upload_bytes_to_spaces(
@@ -40,18 +42,161 @@ def upload_bytes_to_spaces(
     """
     Uploads bytes to DigitalOcean Spaces and returns PUBLIC URL.
     """
+    if media_index.ENABLED:
+        # content-addressed: bytes we already stored are not uploaded again (key_prefix is unused)
+        return media_index.put_bytes(content, content_type, filename_ext)
+    return spaces_store().put_bytes(new_object_key(key_prefix, filename_ext), content, content_type)
+
+
+def upload_many_to_spaces(files: Iterable[dict[str, Any]], concurrency: Optional[int] = None) -> list[UploadOutcome]:
+    """
+    Parallel upload_bytes_to_spaces for a batch of generated assets:
+      [{"content": b"...", "content_type": "image/png", "key_prefix": "content/image", "filename_ext": "png"}, ...]
+    Returns one UploadOutcome (url or error) per file, in order.
+    key_prefix is ignored while media dedup is enabled: keys are then
+    cas/<sha256> (media_index.object_key), whatever the caller asked for.
+    """
+    if media_index.ENABLED:
+        return media_index.put_many(files, concurrency=concurrency)
+
+    uploads = [
+        Upload(
+            key=new_object_key(f.get("key_prefix") or "content", f.get("filename_ext") or "png"),
+            content_type=f["content_type"],
+            data=f["content"],
+        )
+        for f in files
+    ]
+    store = spaces_store()
+    return store.upload_many(uploads) if concurrency is None else store.upload_many(uploads, concurrency)
+
+
+def upload_stream_to_spaces(
+    *,
+    source: BinaryIO,
+    content_type: str,
+    key_prefix: str = "content",
+    filename_ext: str = "bin",
+    obj_key: Optional[str] = None,
+    upload_id: Optional[str] = None,
+) -> str:
+    """
+    Streams a file-like object to Spaces (multipart, parallel parts, bounded
+    memory) and returns its PUBLIC URL. On multipart_upload.UploadInterrupted,
+    call again with obj_key=e.key, upload_id=e.upload_id and the same source to resume.
+    """
+    obj_key = obj_key or new_object_key(key_prefix, filename_ext)
+    return spaces_store().put_stream(source, obj_key, content_type, upload_id=upload_id)
+
+
+async def upload_aiter_to_spaces(
+    *,
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    key_prefix: str = "content",
+    filename_ext: str = "bin",
+    obj_key: Optional[str] = None,
+    upload_id: Optional[str] = None,
+) -> str:
+    """
+    upload_stream_to_spaces for an async chunk stream (e.g. httpx aiter_bytes()).
+    """
     bucket = _required("DO_SPACES_BUCKET")
-    public_base = _required("DO_SPACES_PUBLIC_BASE").rstrip("/")
+    obj_key = obj_key or new_object_key(key_prefix, filename_ext)
+    await multipart_upload.upload_aiter(
+        _spaces_client(), bucket, obj_key, chunks, content_type=content_type, upload_id=upload_id,
+    )
+    return public_url(obj_key)
+
 
-    obj_key = f"{key_prefix}/{uuid.uuid4().hex}.{filename_ext.lstrip('.')}"
+def presign_put(obj_key: str, content_type: str, expires_in: int = PRESIGN_EXPIRES_SECONDS) -> dict[str, Any]:
+    """
+    Presigned single-request PUT. The uploader must send the returned headers
+    as-is, since they are part of the signature.
+    """
+    url = _spaces_client().generate_presigned_url(
+        "put_object",
+        Params={
+            "Bucket": _required("DO_SPACES_BUCKET"),
+            "Key": obj_key,
+            "ACL": "public-read",
+            "ContentType": content_type,
+        },
+        ExpiresIn=expires_in,
+    )
+    return {
+        "method": "PUT",
+        "url": url,
+        "headers": {"Content-Type": content_type, "x-amz-acl": "public-read"},
+        "expires_in": expires_in,
+    }
+
+
+def presign_multipart(
+    obj_key: str,
+    content_type: str,
+    part_count: int,
+    expires_in: int = PRESIGN_EXPIRES_SECONDS,
+) -> dict[str, Any]:
+    """
+    Starts a multipart upload and presigns one UploadPart URL per part.
+    The uploader PUTs each part (5 MiB minimum except the last) and keeps
+    the ETag response header for complete_multipart().
+    """
+    bucket = _required("DO_SPACES_BUCKET")
     client = _spaces_client()
 
-    client.put_object(
+    upload_id = client.create_multipart_upload(
         Bucket=bucket,
         Key=obj_key,
-        Body=content,
         ACL="public-read",
         ContentType=content_type,
+    )["UploadId"]
+
+    part_urls = [
+        client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket, "Key": obj_key, "UploadId": upload_id, "PartNumber": n},
+            ExpiresIn=expires_in,
+        )
+        for n in range(1, part_count + 1)
+    ]
+    return {"method": "PUT", "upload_id": upload_id, "part_urls": part_urls, "expires_in": expires_in}
+
+
+def complete_multipart(obj_key: str, upload_id: str, parts: list[dict[str, Any]]) -> None:
+    """
+    parts: [{"PartNumber": 1, "ETag": "..."}, ...] as reported by the uploader.
+    """
+    _spaces_client().complete_multipart_upload(
+        Bucket=_required("DO_SPACES_BUCKET"),
+        Key=obj_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": sorted(parts, key=lambda p: p["PartNumber"])},
     )
 
-    return f"{public_base}/{obj_key}"
+
+def abort_multipart(obj_key: str, upload_id: str) -> None:
+    _spaces_client().abort_multipart_upload(
+        Bucket=_required("DO_SPACES_BUCKET"),
+        Key=obj_key,
+        UploadId=upload_id,
+    )
+
+
+def head_object(obj_key: str) -> Optional[dict[str, Any]]:
+    """
+    {"size", "content_type", "etag"} for an uploaded object, or None if it does not exist.
+    """
+    try:
+        r = _spaces_client().head_object(Bucket=_required("DO_SPACES_BUCKET"), Key=obj_key)
+    except Exception as e:
+        code = str(getattr(e, "response", {}).get("Error", {}).get("Code", ""))
+        if code in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return {
+        "size": int(r.get("ContentLength") or 0),
+        "content_type": r.get("ContentType") or "",
+        "etag": (r.get("ETag") or "").strip('"'),
+    }
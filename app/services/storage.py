@@ -1,5 +1,9 @@
 import os
-import boto3
+from typing import AsyncIterator, BinaryIO, Optional
+
+from app.services import multipart_upload
+from app.services.clients import s3_client
+from app.services.object_storage import s3_store
 
 # ---------- S3 / DigitalOcean Spaces (S3-compatible) ----------
 
@@ -9,17 +13,11 @@ S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL")
 S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY_ID")
 S3_SECRET_KEY = os.getenv("S3_SECRET_ACCESS_KEY")
 
-if not all([S3_BUCKET, S3_ENDPOINT, S3_PUBLIC_URL, S3_ACCESS_KEY, S3_SECRET_KEY]):
-    raise RuntimeError("Missing S3 environment variables")
-
-session = boto3.session.Session()
 
-s3 = session.client(
-    "s3",
-    endpoint_url=S3_ENDPOINT,
-    aws_access_key_id=S3_ACCESS_KEY,
-    aws_secret_access_key=S3_SECRET_KEY,
-)
+def _require_config() -> None:
+    # checked on first upload, not at import, so importing this module never fails
+    if not all([S3_BUCKET, S3_ENDPOINT, S3_PUBLIC_URL, S3_ACCESS_KEY, S3_SECRET_KEY]):
+        raise RuntimeError("Missing S3 environment variables")
 
 
 def upload_bytes(
@@ -33,12 +31,40 @@ def upload_bytes(
     and return a PUBLIC URL.
     """
 
-    s3.put_object(
-        Bucket=S3_BUCKET,
-        Key=key,
-        Body=data,
-        ACL="public-read",
-        ContentType=content_type,
+    _require_config()
+    return s3_store().put_bytes(key, data, content_type)
+
+
+def upload_stream(
+    *,
+    src: BinaryIO,
+    key: str,
+    content_type: str,
+    upload_id: Optional[str] = None,
+) -> str:
+    """
+    Streaming upload_bytes for large files: multipart with parallel parts and
+    bounded memory. Pass upload_id from multipart_upload.UploadInterrupted to resume.
+    """
+
+    _require_config()
+    return s3_store().put_stream(src, key, content_type, upload_id=upload_id)
+
+
+async def upload_aiter(
+    *,
+    chunks: AsyncIterator[bytes],
+    key: str,
+    content_type: str,
+    upload_id: Optional[str] = None,
+) -> str:
+    """
+    upload_stream for an async chunk stream.
+    """
+
+    _require_config()
+    await multipart_upload.upload_aiter(
+        s3_client(), S3_BUCKET, key, chunks, content_type=content_type, upload_id=upload_id,
     )
 
     return f"{S3_PUBLIC_URL}/{key}"
@@ -0,0 +1,212 @@
+"""
+Near-duplicate topic detection with MinHash + LSH.
+
+Each topic is normalized (lowercase, punctuation and stop words dropped) and
+shingled into character 4-grams; NUM_PERM MinHash values form its signature.
+Signatures are banded (BANDS x ROWS) into per-brand hash buckets, so a lookup
+only compares against topics that share at least one band, which keeps
+"similar topics" queries well under a millisecond for a few thousand topics.
+
+The index lives in-process per brand and is persisted in topic_fingerprints;
+it is loaded lazily and topped up from the table every REFRESH_SECONDS so
+topics ingested by other processes show up too. created_at is stamped before
+commit, so each top-up re-reads REFRESH_OVERLAP_SECONDS back to catch rows
+that committed late. Topics only enter the shared index once committed
+(publish()), so a rolled-back ingest never becomes a match.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.topic_fingerprint import TopicFingerprint
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+# estimated Jaccard similarity at or above which a topic counts as a near-duplicate
+THRESHOLD = float(os.getenv("TOPIC_DUP_THRESHOLD", "0.7"))
+REFRESH_SECONDS = float(os.getenv("TOPIC_INDEX_REFRESH_SECONDS", "30"))
+# must exceed the longest ingest transaction (plus clock skew between hosts)
+REFRESH_OVERLAP_SECONDS = float(os.getenv("TOPIC_INDEX_REFRESH_OVERLAP_SECONDS", "300"))
+
+_MERSENNE = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1337)  # fixed: signatures must be stable across processes and restarts
+_PERMS = [(_rng.randrange(1, _MERSENNE), _rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+_STOP_WORDS = frozenset(
+    "a an and are as at be by for from how in into is it its of on or our the this to vs what when why with your you".split()
+)
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+
+def normalize(text: str) -> str:
+    words = _NON_WORD.sub(" ", (text or "").lower()).split()
+    kept = [w for w in words if w not in _STOP_WORDS]
+    return " ".join(kept or words)
+
+
+def _shingles(norm: str) -> set[int]:
+    if len(norm) <= SHINGLE_SIZE:
+        grams = {norm}
+    else:
+        grams = {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+    return {int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=4).digest(), "little") for g in grams}
+
+
+def signature(text: str) -> tuple[int, ...]:
+    shingles = _shingles(normalize(text))
+    if not shingles:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    return tuple(
+        min(((a * h + b) % _MERSENNE) & _MAX_HASH for h in shingles)
+        for a, b in _PERMS
+    )
+
+
+def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """
+    Estimated Jaccard similarity of the two shingle sets.
+    """
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def pack(sig: tuple[int, ...]) -> bytes:
+    return array("Q", sig).tobytes()
+
+
+def unpack(raw: bytes) -> tuple[int, ...]:
+    a = array("Q")
+    a.frombytes(raw)
+    return tuple(a)
+
+
+def _bands(sig: tuple[int, ...]) -> list[tuple[int, ...]]:
+    return [sig[i * ROWS:(i + 1) * ROWS] for i in range(BANDS)]
+
+
+@dataclass
+class Match:
+    topic_id: uuid.UUID
+    topic_text: str
+    similarity: float
+
+
+class TopicIndex:
+    """
+    LSH index for one brand.
+    """
+
+    def __init__(self):
+        self.buckets: list[dict[tuple[int, ...], set[uuid.UUID]]] = [dict() for _ in range(BANDS)]
+        self.topics: dict[uuid.UUID, tuple[tuple[int, ...], str]] = {}
+        self.loaded_until: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, topic_id: uuid.UUID, sig: tuple[int, ...], text: str) -> None:
+        with self.lock:
+            if topic_id in self.topics:
+                return
+            self.topics[topic_id] = (sig, text)
+            for band, key in zip(self.buckets, _bands(sig)):
+                band.setdefault(key, set()).add(topic_id)
+
+    def query(self, sig: tuple[int, ...], threshold: float = THRESHOLD, limit: int = 5) -> list[Match]:
+        with self.lock:
+            candidates: set[uuid.UUID] = set()
+            for band, key in zip(self.buckets, _bands(sig)):
+                hit = band.get(key)
+                if hit:
+                    candidates |= hit
+            scored = []
+            for tid in candidates:
+                other, text = self.topics[tid]
+                s = similarity(sig, other)
+                if s >= threshold:
+                    scored.append(Match(tid, text, s))
+        scored.sort(key=lambda m: m.similarity, reverse=True)
+        return scored[:limit]
+
+
+_indexes: dict[str, TopicIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(db: Session, brand_id: str) -> TopicIndex:
+    """
+    The brand's index, loaded on first use and topped up from the table
+    at most every REFRESH_SECONDS.
+    """
+    with _indexes_lock:
+        idx = _indexes.get(brand_id)
+        if idx is None:
+            idx = _indexes[brand_id] = TopicIndex()
+
+    if time.monotonic() - idx.refreshed_at >= REFRESH_SECONDS:
+        q = select(TopicFingerprint.topic_id, TopicFingerprint.topic_text, TopicFingerprint.signature,
+                   TopicFingerprint.created_at).where(TopicFingerprint.brand_id == brand_id)
+        if idx.loaded_until is not None:
+            # add() skips known topics, so the overlap only costs the re-read
+            q = q.where(TopicFingerprint.created_at >= idx.loaded_until - timedelta(seconds=REFRESH_OVERLAP_SECONDS))
+        for tid, text, raw, created_at in db.execute(q.order_by(TopicFingerprint.created_at)):
+            idx.add(tid, unpack(raw), text)
+            if idx.loaded_until is None or created_at > idx.loaded_until:
+                idx.loaded_until = created_at
+        idx.refreshed_at = time.monotonic()
+    return idx
+
+
+def find_similar(db: Session, brand_id: str, text: str, threshold: float = THRESHOLD, limit: int = 5) -> list[Match]:
+    return get_index(db, brand_id).query(signature(text), threshold, limit)
+
+
+def register_topic(
+    db: Session,
+    brand_id: str,
+    topic_id: uuid.UUID,
+    text: str,
+    sig: Optional[tuple[int, ...]] = None,
+    duplicate_of: Optional[uuid.UUID] = None,
+) -> tuple[int, ...]:
+    """
+    Stages the topic's fingerprint row (caller commits, then publish()es).
+    Returns the signature.
+    """
+    sig = sig or signature(text)
+    db.add(TopicFingerprint(
+        topic_id=topic_id,
+        brand_id=brand_id,
+        topic_text=text[:1000],
+        signature=pack(sig),
+        duplicate_of=duplicate_of,
+        created_at=datetime.utcnow(),
+    ))
+    return sig
+
+
+def publish(brand_id: str, committed: TopicIndex) -> None:
+    """
+    Adds committed topics to the brand's shared index. If the index isn't
+    loaded in this process yet, its first load reads them from the table.
+    """
+    with _indexes_lock:
+        idx = _indexes.get(brand_id)
+    if idx is None:
+        return
+    for tid, (sig, text) in committed.topics.items():
+        idx.add(tid, sig, text)
@@ -0,0 +1,47 @@
+"""
+Helpers for streaming endpoints: the same events as Server-Sent Events
+(text/event-stream, the default) or as NDJSON (?format=ndjson or Accept: application/x-ndjson).
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterable, Iterable, Optional, Union
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+Event = tuple[str, dict[str, Any]]
+
+# stop proxies (nginx) from buffering the stream
+_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def wants_ndjson(request: Request, fmt: Optional[str] = None) -> bool:
+    if fmt:
+        return fmt.strip().lower() == "ndjson"
+    return "application/x-ndjson" in (request.headers.get("accept") or "")
+
+
+def encode_event(event: str, data: dict[str, Any], ndjson: bool = False) -> str:
+    if ndjson:
+        return json.dumps({"event": event, **data}, default=str) + "\n"
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def event_response(events: Union[Iterable[Event], AsyncIterable[Event]], ndjson: bool = False) -> StreamingResponse:
+    """
+    Wraps a (sync or async) iterable of (event, data) pairs in a StreamingResponse.
+    Sync iterables are run in Starlette's threadpool.
+    """
+    media_type = "application/x-ndjson" if ndjson else "text/event-stream"
+
+    if hasattr(events, "__aiter__"):
+        async def body():
+            async for event, data in events:
+                yield encode_event(event, data, ndjson)
+    else:
+        def body():
+            for event, data in events:
+                yield encode_event(event, data, ndjson)
+
+    return StreamingResponse(body(), media_type=media_type, headers=_HEADERS)